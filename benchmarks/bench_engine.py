@@ -0,0 +1,80 @@
+"""
+Benchmark the single-pass rewrite engine against the legacy replace loop.
+
+Usage:
+    python benchmarks/bench_engine.py [corpus_folder] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Tuple
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.converter import convert_script, manual_replace
+from modules.patterns import load_conversion_patterns
+
+
+def legacy_convert_script(script: str, patterns: List[Tuple[str, str]], direction: str) -> str:
+    """The previous implementation: one full str.replace pass per pattern."""
+    script = manual_replace(script, direction)
+    for old, new in patterns:
+        script = script.replace(old, new)
+    return script
+
+
+def load_corpus(folder: str) -> List[str]:
+    """Read every Lua file under the folder."""
+    corpus = []
+    for root, _, files in os.walk(folder):
+        for file in files:
+            if file.endswith(".lua"):
+                with open(os.path.join(root, file), "r", encoding="utf-8", errors="replace") as handle:
+                    corpus.append(handle.read())
+    return corpus
+
+
+def time_it(func, corpus: List[str], repeat: int) -> float:
+    """Return the best wall time, in seconds, of converting the whole corpus."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for script in corpus:
+            func(script)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Benchmark the conversion engine.")
+    parser.add_argument("corpus", nargs="?", default=os.path.join(root, "scripts"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    size_mb = sum(len(script.encode("utf-8")) for script in corpus) / (1024 * 1024)
+    patterns = load_conversion_patterns()
+    raw_patterns = load_conversion_patterns(compiled=False)
+    print(f"Corpus: {len(corpus)} files, {size_mb:.2f} MB")
+
+    for key, direction in (("ESX_to_QB_Core", "ESX to QB-Core"), ("QB_Core_to_ESX", "QB-Core to ESX")):
+        rules = patterns[key]
+        raw_rules = raw_patterns[key]
+        convert_script("", rules, direction=direction)  # compile outside the timed region
+        legacy = time_it(lambda s: legacy_convert_script(s, raw_rules, direction), corpus, args.repeat)
+        single = time_it(lambda s: convert_script(s, rules, direction=direction), corpus, args.repeat)
+        differing = sum(
+            legacy_convert_script(s, raw_rules, direction) != convert_script(s, rules, direction=direction)
+            for s in corpus
+        )
+        print(
+            f"{direction:>15}: legacy {legacy * 1000:8.2f} ms | single-pass {single * 1000:8.2f} ms | "
+            f"speedup {legacy / single:5.2f}x | files with different output {differing}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Converter benchmark suite.
+
+Measures convert_script, process_file and process_folder over the bundled
+``scripts/`` resources and over synthetic resource trees with a controlled
+density of ESX/QB-Core calls. Every case runs in a fresh process so its peak RSS
+is its own. Results are saved as JSON and can be compared with a baseline.
+
+Usage:
+    python benchmarks/bench_suite.py --synthetic 10000 --save results.json
+    python benchmarks/bench_suite.py --synthetic 10000 100000 --workers 4 --compare results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project root to the Python path
+sys.path.insert(0, ROOT)
+
+from modules.ast_engine import ENGINES
+from modules.converter import convert_script, process_file, process_folder
+from modules.metrics import STAGES, ConversionMetrics
+from modules.patterns import load_conversion_patterns
+
+DIRECTIONS = {"ESX to QB-Core": "ESX_to_QB_Core", "QB-Core to ESX": "QB_Core_to_ESX"}
+
+# Plain Lua lines used to fill synthetic files between framework calls
+_FILLER = (
+    "local {name} = {value}",
+    "if {name} ~= nil then print({name}) end",
+    "for i = 1, {value} do Wait(0) end",
+    "-- {name}: tuning value {value}",
+    "RegisterCommand('{name}', function(source, args) print(args[1]) end, false)",
+    "Citizen.CreateThread(function() while true do Wait({value}) end end)",
+)
+
+
+def generate_corpus(folder: str, files: int, density: float, lines: int = 120, seed: int = 1) -> str:
+    """
+    Generate a synthetic resource tree, reusing it if it already exists.
+
+    Args:
+        folder (str): Parent folder of the corpus.
+        files (int): Number of Lua files.
+        density (float): Fraction of lines that contain a framework call.
+        lines (int, optional): Lines per file. Defaults to 120.
+        seed (int, optional): Random seed, so corpora are reproducible. Defaults to 1.
+
+    Returns:
+        str: Path to the corpus.
+    """
+    path = os.path.join(folder, f"synthetic-{files}-{density:g}-{lines}-{seed}")
+    marker = os.path.join(path, ".complete")
+    if os.path.exists(marker):
+        return path
+    shutil.rmtree(path, ignore_errors=True)
+
+    rng = random.Random(seed)
+    patterns = load_conversion_patterns()
+    calls = [old for rules in patterns.values() for old, _ in rules]
+    for index in range(files):
+        # 50 files per folder, 20 folders per resource, like a real resources/ tree
+        resource = f"resource-{index // 1000:04d}"
+        sub = f"client-{(index // 50) % 20:02d}"
+        os.makedirs(os.path.join(path, resource, sub), exist_ok=True)
+        body = []
+        for line in range(lines):
+            if rng.random() < density:
+                body.append(f"local r{line} = {rng.choice(calls)}(source, {line})")
+            else:
+                body.append(rng.choice(_FILLER).format(name=f"v{line}", value=rng.randint(1, 1000)))
+        with open(os.path.join(path, resource, sub, f"file{index}.lua"), "w", encoding="utf-8") as file:
+            file.write("\n".join(body) + "\n")
+    open(marker, "w").close()
+    return path
+
+
+def _lua_files(folder: str) -> List[str]:
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(os.path.join(root, file) for file in files if file.endswith(".lua"))
+    return sorted(paths)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB, or None where unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(peak, children) / scale
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/max of latency samples, in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        cuts = ordered * 99
+    else:
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+    return {
+        "p50_ms": cuts[49] * 1000,
+        "p90_ms": cuts[89] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _throughput(files: int, size: int, elapsed: float) -> Dict[str, float]:
+    return {
+        "files": files,
+        "megabytes": size / (1024 * 1024),
+        "seconds": elapsed,
+        "files_per_s": files / elapsed if elapsed else 0.0,
+        "mb_per_s": size / (1024 * 1024) / elapsed if elapsed else 0.0,
+    }
+
+
+def bench_convert_script(corpus: str, direction: str, engine: str = "text", **_) -> Dict[str, object]:
+    """Time convert_script alone; files are read outside the timed region, one at a time."""
+    rules = load_conversion_patterns()[DIRECTIONS[direction]]
+    convert_script("", rules, direction=direction, engine=engine)
+    latencies = []
+    size = 0
+    for path in _lua_files(corpus):
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            script = file.read()
+        size += len(script.encode("utf-8"))
+        start = time.perf_counter()
+        convert_script(script, rules, direction=direction, engine=engine)
+        latencies.append(time.perf_counter() - start)
+    result = _throughput(len(latencies), size, sum(latencies))
+    result["latency"] = {"convert": _percentiles(latencies)}
+    return result
+
+
+def bench_process_file(corpus: str, direction: str, output: str, engine: str = "text", **_) -> Dict[str, object]:
+    """Time process_file per file, with read/convert/write stage latencies."""
+    rules = load_conversion_patterns()[DIRECTIONS[direction]]
+    metrics = ConversionMetrics()
+    size = 0
+    start = time.perf_counter()
+    for path in _lua_files(corpus):
+        size += os.path.getsize(path)
+        target = os.path.join(output, os.path.relpath(path, corpus))
+        process_file(path, target, rules, direction, False, [], metrics=metrics, engine=engine)
+    result = _throughput(len(metrics.files), size, time.perf_counter() - start)
+    result["latency"] = _stage_latencies(metrics)
+    return result
+
+
+def bench_process_folder(
+    corpus: str, direction: str, output: str, workers: int = 1, engine: str = "text", **_
+) -> Dict[str, object]:
+    """Time a whole process_folder run, including the walk and asset mirroring."""
+    rules = load_conversion_patterns()[DIRECTIONS[direction]]
+    metrics = ConversionMetrics()
+    size = sum(os.path.getsize(path) for path in _lua_files(corpus))
+    start = time.perf_counter()
+    stats = process_folder(
+        corpus, rules, direction, False, [], workers=workers, output_folder=output, metrics=metrics, engine=engine
+    )
+    result = _throughput(stats["total_files"], size, time.perf_counter() - start)
+    result["latency"] = _stage_latencies(metrics)
+    result["stats"] = stats
+    return result
+
+
+def _stage_latencies(metrics: ConversionMetrics) -> Dict[str, Dict[str, float]]:
+    latency = {stage: _percentiles([entry[stage] for entry in metrics.files.values()]) for stage in STAGES}
+    latency["total"] = _percentiles([entry["total"] for entry in metrics.files.values()])
+    return latency
+
+
+CASES = {
+    "convert_script": bench_convert_script,
+    "process_file": bench_process_file,
+    "process_folder": bench_process_folder,
+}
+
+
+def _run_case(case: str, kwargs: Dict[str, object]) -> Dict[str, object]:
+    """Run one case in the current (fresh) process and attach its peak RSS."""
+    output = tempfile.mkdtemp(prefix="bench-out-")
+    try:
+        result = CASES[case](output=output, **kwargs)
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def run_case_isolated(case: str, **kwargs) -> Dict[str, object]:
+    """Run one case in a freshly spawned process, so peak RSS and caches are not shared."""
+    # Executor workers are not daemonic, so process_folder can start its own pool
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_run_case, case, kwargs).result()
+
+
+def compare(results: Dict[str, object], baseline: Dict[str, object]):
+    """Print the throughput of every case relative to a baseline."""
+    print("\nComparison with baseline (files/s, higher is better):")
+    for name, result in results["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+        if not before or not before.get("files_per_s"):
+            print(f"  {name:<45} new")
+            continue
+        ratio = result["files_per_s"] / before["files_per_s"]
+        print(f"  {name:<45} {before['files_per_s']:>10.0f} -> {result['files_per_s']:>10.0f} ({ratio:5.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the converter.")
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "scripts"), help="Real corpus (default: scripts/).")
+    parser.add_argument(
+        "--synthetic", type=int, nargs="*", default=[10000],
+        help="Sizes, in Lua files, of the synthetic corpora (default: 10000). Pass no value to skip them."
+    )
+    parser.add_argument("--density", type=float, default=0.05, help="Fraction of lines with a framework call.")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "converter-bench"),
+                        help="Where synthetic corpora are generated and reused.")
+    parser.add_argument("--direction", choices=sorted(DIRECTIONS), default="ESX to QB-Core")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1],
+                        help="Worker counts for process_folder (default: 1).")
+    parser.add_argument("--cases", nargs="*", choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument("--engines", nargs="*", choices=ENGINES, default=["text"],
+                        help="Rewrite engines to benchmark (default: text).")
+    parser.add_argument("--save", help="Write the results as JSON to this file.")
+    parser.add_argument("--compare", help="Compare with a JSON baseline saved earlier.")
+    args = parser.parse_args()
+
+    corpora = {"scripts": args.corpus}
+    for files in args.synthetic:
+        print(f"Preparing synthetic corpus of {files} files...")
+        corpora[f"synthetic-{files}"] = generate_corpus(args.corpus_dir, files, args.density)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "direction": args.direction,
+        "density": args.density,
+        "cases": {},
+    }
+    for corpus_name, corpus in corpora.items():
+        for case in args.cases:
+            for engine in args.engines:
+                for workers in (args.workers if case == "process_folder" else [1]):
+                    name = f"{case}[{corpus_name}]" + (f"[workers={workers}]" if case == "process_folder" else "")
+                    if engine != "text":
+                        name += f"[engine={engine}]"
+                    result = run_case_isolated(
+                        case, corpus=corpus, direction=args.direction, workers=workers, engine=engine
+                    )
+                    results["cases"][name] = result
+                    total = result["latency"].get("total") or result["latency"].get("convert") or {}
+                    print(
+                        f"{name:<45} {result['files_per_s']:>10.0f} files/s {result['mb_per_s']:>8.2f} MB/s "
+                        f"p99 {total.get('p99_ms', 0):7.3f} ms  peak RSS {result['peak_rss_mb'] or 0:7.1f} MiB"
+                    )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
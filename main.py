@@ -13,8 +13,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import customtkinter as ctk
 
 from modules.banners import clear_and_print
-from modules.patterns import load_conversion_patterns
-from modules.converter import process_folder
+from modules.patterns import load_conversion_patterns, sql_patterns_for
+from modules.job import FINISHED, ConversionJob
+from modules.metrics import ConversionMetrics
 from modules.components import (
     FolderSelector,
     ConversionOptions,
@@ -42,6 +43,9 @@ class ConverterApp(ctk.CTk):
         # Load conversion patterns
         self.patterns = load_conversion_patterns()
 
+        # The running or last conversion
+        self._job = None
+
         # Set up the UI layout
         self._setup_ui()
 
@@ -96,6 +100,7 @@ class ConverterApp(ctk.CTk):
 
         direction = self.conversion_options.conversion_direction
         include_sql = self.conversion_options.include_sql_patterns
+        incremental = self.conversion_options.incremental
 
         # Clear and update output console
         self.output_console.clear()
@@ -111,32 +116,34 @@ class ConverterApp(ctk.CTk):
         else:
             selected_patterns = self.patterns['QB_Core_to_ESX']
 
-        sql_patterns = self.patterns.get('SQL_patterns', [])
-
-        # Define callback for progress updates
-        def update_progress(message: str):
-            if 'Converted:' in message:
-                self.output_console.add_message(message, 'success')
-            elif 'No changes needed:' in message:
-                self.output_console.add_message(message, 'info')
-            elif 'Error' in message:
-                self.output_console.add_message(message, 'error')
-            else:
-                self.output_console.add_message(message, 'info')
+        sql_patterns = sql_patterns_for(self.patterns, direction)
+
+        # Define handler for progress events
+        def update_progress(event):
+            if event.kind != FINISHED:
+                self.output_console.add_message(event.message, event.level)
+
+        metrics = ConversionMetrics() if self.conversion_options.collect_metrics else None
+        self._job = ConversionJob(
+            folder,
+            selected_patterns,
+            direction,
+            include_sql,
+            sql_patterns,
+            output_prefix="qb-",
+            incremental=incremental,
+            metrics=metrics
+        )
+        job = self._job
 
         # Run conversion in a separate thread to keep UI responsive
         def run_conversion():
             try:
                 # Process the folder
-                stats = process_folder(
-                    folder,
-                    selected_patterns,
-                    direction,
-                    include_sql,
-                    sql_patterns,
-                    update_progress,
-                    output_prefix="qb-"
-                )
+                stats = job.run(update_progress)
+                if job.cancelled:
+                    self.output_console.add_message('\nConversion cancelled.', 'warning')
+                    return
 
                 # Display summary
                 self.output_console.add_message('\n--- Conversion Summary ---', 'info')
@@ -149,12 +156,20 @@ class ConverterApp(ctk.CTk):
                 self.output_console.add_message(
                     f'Files skipped (no changes needed): {stats["skipped_files"]}', 'info'
                 )
+                if stats['unchanged_files'] > 0:
+                    self.output_console.add_message(
+                        f'Files unchanged since last run: {stats["unchanged_files"]}', 'info'
+                    )
 
                 if stats['error_files'] > 0:
                     self.output_console.add_message(
                         f'Files with errors: {stats["error_files"]}', 'error'
                     )
 
+                if metrics is not None:
+                    for line in metrics.summary_lines():
+                        self.output_console.add_message(line, 'info')
+
                 self.output_console.add_message(
                     '\nConversion completed successfully!', 'success'
                 )
@@ -174,7 +189,9 @@ class ConverterApp(ctk.CTk):
         conversion_thread.start()
 
     def _quit(self):
-        """Exit the application."""
+        """Exit the application, stopping a running conversion first."""
+        if self._job is not None:
+            self._job.cancel()
         self.destroy()
 
     def show_warning(self, message: str):
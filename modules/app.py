@@ -2,13 +2,25 @@
 Main application UI for the ESX/QB-Core Converter.
 """
 from typing import Dict, List, Tuple, Optional
-from nicegui import ui
+from nicegui import run, ui
 import sys
 import os
+import queue
+import threading
 
 from modules.components import FolderSelector, ConversionOptions, OutputConsole, ActionButtons
-from modules.patterns import load_conversion_patterns
-from modules.converter import process_folder
+from modules.patterns import load_conversion_patterns, sql_patterns_for
+from modules.job import FINISHED, ConversionJob, ProgressEvent
+from modules.metrics import ConversionMetrics
+
+# Conversions running at the same time on the server, across all clients
+MAX_CONCURRENT_CONVERSIONS = 2
+# Worker processes of each conversion
+CONVERSION_WORKERS = max(1, (os.cpu_count() or 1) // MAX_CONCURRENT_CONVERSIONS)
+# Interval between two progress refreshes of the page, in seconds
+PROGRESS_INTERVAL = 0.25
+
+_conversion_slots = threading.BoundedSemaphore(MAX_CONCURRENT_CONVERSIONS)
 
 
 class ConverterApp:
@@ -29,6 +41,11 @@ class ConverterApp:
         
         # Load conversion patterns
         self.patterns = load_conversion_patterns()
+
+        # The running conversion and its events, queued by the conversion thread
+        self._job: Optional[ConversionJob] = None
+        self._pending: "queue.SimpleQueue[ProgressEvent]" = queue.SimpleQueue()
+        self._last_event: Optional[ProgressEvent] = None
         
         # Set up the UI layout
         self._setup_ui()
@@ -64,15 +81,31 @@ class ConverterApp:
                 quit_callback=self._quit
             )
             
+            # Add progress bar, ETA and cancel button
+            with ui.row().classes('w-full items-center gap-4'):
+                self.progress_bar = ui.linear_progress(value=0, show_value=False).classes('flex-grow')
+                self.progress_label = ui.label('').classes('text-sm text-gray-600')
+                self.pause_button = ui.button('Pause', on_click=self._toggle_pause, color='warning')
+                self.pause_button.disable()
+                self.cancel_button = ui.button('Cancel', on_click=self._cancel_conversion, color='negative')
+                self.cancel_button.disable()
+
             # Add output console
             self.output_console = OutputConsole()
+
+            # Push the batched progress of the conversion thread to the page
+            ui.timer(PROGRESS_INTERVAL, self._refresh_progress)
         
         # Add footer
         with ui.footer().classes('bg-gray-100 text-gray-600 p-4'):
             ui.label('ESX/QB-Core Converter by dFuZe & densuz').classes('text-sm')
     
-    def _convert(self):
-        """Start the conversion process based on user input."""
+    async def _convert(self):
+        """Start the conversion process based on user input, off the event loop."""
+        if self._job is not None:
+            ui.notify('A conversion is already running', type='warning')
+            return
+
         folder = self.folder_selector.value
         if not folder:
             ui.notify('Please select a folder', type='negative')
@@ -84,6 +117,7 @@ class ConverterApp:
         
         direction = self.conversion_options.conversion_direction
         include_sql = self.conversion_options.include_sql_patterns
+        incremental = self.conversion_options.incremental
         
         # Clear and update output console
         self.output_console.clear()
@@ -99,39 +133,53 @@ class ConverterApp:
         else:
             selected_patterns = self.patterns["QB_Core_to_ESX"]
         
-        sql_patterns = self.patterns.get("SQL_patterns", [])
+        sql_patterns = sql_patterns_for(self.patterns, direction)
         
-        # Define callback for progress updates
-        def update_progress(message: str):
-            if "Converted:" in message:
-                self.output_console.add_message(message, 'success')
-            elif "No changes needed:" in message:
-                self.output_console.add_message(message, 'info')
-            elif "Error" in message:
-                self.output_console.add_message(message, 'error')
-            else:
-                self.output_console.add_message(message, 'info')
+        metrics = ConversionMetrics() if self.conversion_options.collect_metrics else None
+        job = ConversionJob(
+            folder,
+            selected_patterns,
+            direction,
+            include_sql,
+            sql_patterns,
+            output_prefix="qb-",
+            workers=CONVERSION_WORKERS,
+            incremental=incremental,
+            metrics=metrics
+        )
+
+        def run_conversion() -> Dict[str, int]:
+            # Waits for a free slot when other clients are converting
+            with _conversion_slots:
+                if job.cancelled:
+                    return job.stats
+                job.scan()
+                return job.run(self._pending.put)
         
+        self._start_progress(job)
         try:
-            # Process the folder
-            stats = process_folder(
-                folder,
-                selected_patterns,
-                direction,
-                include_sql,
-                sql_patterns,
-                update_progress,
-                output_prefix="qb-"
-            )
+            # Process the folder in a thread; files are converted in worker processes
+            stats = await run.io_bound(run_conversion)
+            self._refresh_progress()
+            if job.cancelled:
+                self.output_console.add_message("\nConversion cancelled.", 'warning')
+                ui.notify('Conversion cancelled', type='warning')
+                return
             
             # Display summary
             self.output_console.add_message("\n--- Conversion Summary ---", 'info')
             self.output_console.add_message(f"Total files processed: {stats['total_files']}", 'info')
             self.output_console.add_message(f"Files converted: {stats['converted_files']}", 'success')
             self.output_console.add_message(f"Files skipped (no changes needed): {stats['skipped_files']}", 'info')
+            if stats['unchanged_files'] > 0:
+                self.output_console.add_message(f"Files unchanged since last run: {stats['unchanged_files']}", 'info')
             
             if stats['error_files'] > 0:
                 self.output_console.add_message(f"Files with errors: {stats['error_files']}", 'error')
+
+            if metrics is not None:
+                for line in metrics.summary_lines():
+                    self.output_console.add_message(line, 'info')
             
             self.output_console.add_message("\nConversion completed successfully!", 'success')
             self.output_console.add_message(f"Output folder: qb-{os.path.basename(folder)}", 'info')
@@ -139,14 +187,70 @@ class ConverterApp:
             # Show success notification
             ui.notify('Conversion completed successfully!', type='positive')
         except Exception as e:
+            self._refresh_progress()
             self.output_console.add_message(f"\nAn error occurred: {str(e)}", 'error')
             ui.notify(f'Error: {str(e)}', type='negative')
+        finally:
+            self._job = None
+            self.pause_button.disable()
+            self.cancel_button.disable()
+
+    def _start_progress(self, job: ConversionJob):
+        """Reset the progress state before a conversion."""
+        self._job = job
+        self._pending = queue.SimpleQueue()
+        self._last_event = None
+        self.progress_bar.set_value(0)
+        self.progress_label.set_text('Scanning...')
+        self.pause_button.set_text('Pause')
+        self.pause_button.enable()
+        self.cancel_button.enable()
+
+    def _toggle_pause(self):
+        """Pause or resume the running conversion between two files."""
+        if self._job is None:
+            return
+        if self._job.paused:
+            self._job.resume()
+            self.pause_button.set_text('Pause')
+        else:
+            self._job.pause()
+            self.pause_button.set_text('Resume')
+            self.progress_label.set_text('Paused')
+
+    def _cancel_conversion(self):
+        """Ask the running conversion to stop after the current file."""
+        if self._job is not None:
+            self._job.cancel()
+            self.progress_label.set_text('Cancelling...')
+
+    def _refresh_progress(self):
+        """Flush the queued events and update the progress bar and ETA."""
+        try:
+            while True:
+                event = self._pending.get_nowait()
+                self._last_event = event
+                if event.kind != FINISHED:
+                    self.output_console.add_message(event.message, event.level)
+        except queue.Empty:
+            pass
+
+        event = self._last_event
+        if event is None or not event.total or (self._job is not None and self._job.paused):
+            return
+        self.progress_bar.set_value(event.done / event.total)
+        if event.eta is not None and event.done < event.total:
+            self.progress_label.set_text(f"{event.done}/{event.total} files, ETA {event.eta:.0f} s")
+        else:
+            self.progress_label.set_text(f"{event.done}/{event.total} files, {event.elapsed:.1f} s")
     
     def _quit(self):
         """Exit the application."""
         ui.notify('Exiting application...', type='info')
         sys.exit(0)
     
-    def run(self):
-        """Run the application."""
+    @classmethod
+    def run(cls):
+        """Run the application. Every client gets its own page and conversion state."""
+        ui.page('/')(cls)
         ui.run(title="ESX/QB-Core Converter")
@@ -0,0 +1,371 @@
+"""
+Syntax-aware rewrite engine.
+
+Scripts are parsed once into a syntax tree (see ``modules.lua_ast``) and every
+rule is applied in a single top-down walk of the tree:
+
+- Code rules replace an expression or statement whose source text is exactly the
+  rule's pattern, e.g. the ``ESX.GetPlayerFromId`` field chain, or matches the whole
+  source text for regex rules. Once a node is replaced its children are not
+  visited, so the longest pattern always wins.
+  Single names are never renamed, that would break the locals declaring them.
+- A string literal whose whole content is a pattern, such as the event name in
+  ``TriggerEvent('esx:playerLoaded')``, has its content replaced.
+- String rules (the SQL patterns) replace text inside string literals only.
+- Call rules rewrite a whole call and may reorder or add arguments, see
+  ``CALL_PATTERNS`` in ``modules.patterns``.
+
+Comments and other string contents are never touched. The replacements are applied
+as a patch over the original text, so formatting is preserved. Scripts that cannot
+be parsed are rewritten with the text engine instead.
+"""
+import mmap
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from modules.engine import REGEX_PREFIX, _trie_regex, compile_rules, is_regex_rule
+from modules.lua_ast import LuaSyntaxError, Node, parse_cached
+
+ENGINES = ("text", "ast")
+
+_PLACEHOLDER = re.compile(r"\{(receiver|args|[0-9]+)\}")
+# Nodes that are never matched against the code rules themselves
+_UNMATCHED_KINDS = frozenset(("Chunk", "Name", "FuncName", "String", "Number", "Constant", "Vararg"))
+
+# (start, end, replacement, rules applied): the rules include those applied inside rewritten calls
+Edit = Tuple[int, int, str, Tuple[str, ...]]
+
+
+class CallRule:
+    """A rule rewriting calls of a function, e.g. ``*.addInventoryItem`` -> ``exports[...]:AddItem(...)``."""
+
+    def __init__(self, pattern: str, template: str):
+        """
+        Parse a call rule.
+
+        Args:
+            pattern (str): The called function as a dotted path. A leading ``*.`` matches any
+                receiver, a name or a field chain such as ``xPlayer`` or ``data.player``.
+            template (str): The replacement of the whole call. ``{receiver}`` is the receiver
+                matched by ``*``, ``{args}`` the argument list as written and ``{1}``, ``{2}``, ...
+                single arguments. Without ``{args}``, the call must have exactly as many
+                arguments as the highest numbered placeholder, otherwise at least as many.
+        """
+        self.pattern = pattern
+        self.template = template
+        self.wildcard = pattern.startswith("*.")
+        self.path = tuple((pattern[2:] if self.wildcard else pattern).split("."))
+        placeholders = _PLACEHOLDER.findall(template)
+        self.arity = max([int(name) for name in placeholders if name.isdigit()], default=0)
+        self.variadic = "args" in placeholders
+
+    def receiver(self, chain: Sequence[Node]) -> Optional[Node]:
+        """
+        Match the callee of a call.
+
+        Args:
+            chain (Sequence[Node]): The callee's ``Name`` and ``Field`` nodes, outermost first.
+
+        Returns:
+            Optional[Node]: The node matched by ``*`` (the callee itself without a wildcard),
+            or None if the callee does not match.
+        """
+        size = len(self.path)
+        if len(chain) < size + self.wildcard or (not self.wildcard and len(chain) != size):
+            return None
+        for node, name in zip(chain, reversed(self.path)):
+            if node.value != name:
+                return None
+        return chain[size] if self.wildcard else chain[0]
+
+    def accepts(self, count: int) -> bool:
+        """Check whether a call with ``count`` arguments can be rewritten."""
+        return count >= self.arity if self.variadic else count == self.arity
+
+
+def _chain(node: Node) -> Optional[List[Node]]:
+    """Return the ``Field`` nodes of a ``a.b.c`` chain and its ``Name``, outermost first."""
+    chain = []
+    while node.kind == "Field":
+        chain.append(node)
+        node = node.children[0]
+    if node.kind != "Name":
+        return None
+    chain.append(node)
+    return chain
+
+
+def _string_content(raw: str) -> Tuple[int, int, str]:
+    """Return the offsets of the content of a string literal and its quote character."""
+    if raw[0] == "[":
+        level = raw.index("[", 1) + 1
+        return level, len(raw) - level, "]"
+    return 1, len(raw) - 1, raw[0]
+
+
+def apply_edits(text: str, start: int, end: int, edits: List[Edit]) -> str:
+    """
+    Apply non-overlapping edits to a span of a text.
+
+    Args:
+        text (str): The original text.
+        start (int): Start of the span.
+        end (int): End of the span.
+        edits (List[Edit]): Edits inside the span, in order.
+
+    Returns:
+        str: The patched span.
+    """
+    parts = []
+    position = start
+    for edit_start, edit_end, replacement, _ in edits:
+        parts.append(text[position:edit_start])
+        parts.append(replacement)
+        position = edit_end
+    parts.append(text[position:end])
+    return "".join(parts)
+
+
+class AstRewriter:
+    """A rewriter applying code, string and call rules in one walk of the syntax tree."""
+
+    def __init__(
+        self,
+        rules: Sequence[Tuple[str, str]],
+        call_rules: Sequence[Tuple[str, str]] = (),
+        string_rules: Sequence[Tuple[str, str]] = ()
+    ):
+        """
+        Compile the rewriter.
+
+        Args:
+            rules (Sequence[Tuple[str, str]]): Ordered ``(old, new)`` code rules, first occurrence wins.
+            call_rules (Sequence[Tuple[str, str]], optional): ``(pattern, template)`` call rules, see
+                ``CallRule``. Defaults to ().
+            string_rules (Sequence[Tuple[str, str]], optional): ``(old, new)`` rules applied inside
+                string literals. Defaults to ().
+        """
+        self.code = compile_rules(rules)
+        self.strings = compile_rules(string_rules)
+        self.calls: Dict[str, List[CallRule]] = {}
+        call_table: Dict[str, str] = {}
+        for pattern, template in call_rules:
+            if pattern in call_table:
+                continue
+            rule = CallRule(pattern, template)
+            call_table[pattern] = template
+            self.calls.setdefault(rule.path[-1], []).append(rule)
+        # The text engine over all rules, for scripts that cannot be parsed
+        self.fallback = compile_rules(list(rules) + list(string_rules))
+
+        self.table = {**self.code.table, **self.strings.table, **call_table}
+        # Regex rules without a literal leave the fallback, and so this rewriter, without anchors
+        self.anchors = () if self.fallback.table and not self.fallback.anchors else tuple(
+            dict.fromkeys(self.fallback.anchors + tuple(self.calls))
+        )
+        self._anchor_bytes = tuple(anchor.encode("utf-8") for anchor in self.anchors)
+        self._call_regex = re.compile(r"\b(?:" + _trie_regex(self.calls) + r")\s*[(\"'{\[]") if self.calls else None
+        self._lengths = frozenset(len(old) for old in self.code.table if not is_regex_rule(old))
+        # Regex code rules, matched against the whole source text of a node
+        self._code_regexes = [
+            (old, re.compile(old[len(REGEX_PREFIX):])) for old in self.code.table if is_regex_rule(old)
+        ]
+
+    def may_match(self, data: Union[bytes, mmap.mmap]) -> bool:
+        """
+        Check raw file content for any anchor without decoding it.
+
+        Args:
+            data (Union[bytes, mmap.mmap]): The raw, UTF-8 encoded content, or an mmap of it.
+
+        Returns:
+            bool: False if no rule can match the content, True otherwise.
+        """
+        if not self._anchor_bytes:
+            return bool(self.table)
+        return any(data.find(anchor) != -1 for anchor in self._anchor_bytes)
+
+    def _may_change(self, script: str) -> bool:
+        return bool(
+            (self.code.table and self.code.regex.search(script))
+            or (self.strings.table and self.strings.regex.search(script))
+            or (self._call_regex is not None and self._call_regex.search(script))
+        )
+
+    def edits(self, script: str) -> Optional[List[Edit]]:
+        """
+        Compute the edits of a script.
+
+        Args:
+            script (str): The original script content.
+
+        Returns:
+            Optional[List[Edit]]: The ``(start, end, replacement, rules)`` edits in source order,
+            or None if the script cannot be parsed.
+        """
+        if not self._may_change(script):
+            return []
+        try:
+            tree = parse_cached(script)
+        except (LuaSyntaxError, RecursionError):
+            return None
+        edits: List[Edit] = []
+        self._collect(tree, script, edits)
+        return edits
+
+    def sub(self, script: str, hits: Optional[Dict[str, int]] = None) -> str:
+        """
+        Rewrite the script.
+
+        Args:
+            script (str): The original script content.
+            hits (Optional[Dict[str, int]], optional): When given, the number of matches of
+                every rule is added to it. Defaults to None.
+
+        Returns:
+            str: The rewritten script content.
+        """
+        edits = self.edits(script)
+        if edits is None:
+            return self.fallback.sub(script, hits)
+        if hits is not None:
+            for *_, rules in edits:
+                for rule in rules:
+                    hits[rule] = hits.get(rule, 0) + 1
+        return apply_edits(script, 0, len(script), edits) if edits else script
+
+    def iter_edits(self, script: str) -> Iterator[Tuple[int, str, str]]:
+        """
+        Iterate over the replacements the rewriter would make in a script.
+
+        Args:
+            script (str): The original script content.
+
+        Yields:
+            Tuple[int, str, str]: The offset, the replaced text and its replacement.
+        """
+        edits = self.edits(script)
+        if edits is None:
+            yield from self.fallback.iter_edits(script)
+            return
+        for start, end, replacement, _ in edits:
+            yield start, script[start:end], replacement
+
+    def _collect(self, root: Node, text: str, edits: List[Edit]):
+        """Walk a subtree, appending the edits of its outermost matches in source order."""
+        table = self.code.table
+        lengths = self._lengths
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            kind = node.kind
+            if kind == "String":
+                self._collect_string(node, text, edits)
+                continue
+            if kind == "Call" and self.calls and self._collect_call(node, text, edits):
+                continue
+            if kind not in _UNMATCHED_KINDS and node.end - node.start in lengths:
+                source = text[node.start:node.end]
+                replacement = table.get(source)
+                if replacement is not None:
+                    edits.append((node.start, node.end, replacement, (source,)))
+                    continue
+            if self._code_regexes and kind not in _UNMATCHED_KINDS and self._collect_regex(node, text, edits):
+                continue
+            stack.extend(reversed(node.children))
+
+    def _collect_regex(self, node: Node, text: str, edits: List[Edit]) -> bool:
+        """Replace a node by the first regex code rule matching its whole source text."""
+        for old, regex in self._code_regexes:
+            match = regex.fullmatch(text, node.start, node.end)
+            if match is not None:
+                edits.append((node.start, node.end, match.expand(self.code.table[old]), (old,)))
+                return True
+        return False
+
+    def _collect_string(self, node: Node, text: str, edits: List[Edit]):
+        """Replace a string literal's whole content by a code rule, or parts of it by the string rules."""
+        head, tail, quote = _string_content(node.value)
+        start, end = node.start + head, node.start + tail
+        content = text[start:end]
+        replacement = self.code.table.get(content)
+        if replacement is not None and quote not in replacement and "\\" not in replacement and "\n" not in replacement:
+            edits.append((start, end, replacement, (content,)))
+            return
+        if not self.strings.table:
+            return
+        for match in self.strings.regex.finditer(content):
+            old, new = self.strings.replacement(match)
+            edits.append((start + match.start(), start + match.end(), new, (old,)))
+
+    def _collect_call(self, node: Node, text: str, edits: List[Edit]) -> bool:
+        """Rewrite a call by the first matching call rule; return False if none matched."""
+        callee = node.children[0]
+        if callee.kind != "Field":
+            return False
+        rules = self.calls.get(callee.value)
+        chain = _chain(callee) if rules else None
+        if chain is None:
+            return False
+        arguments = node.children[1:]
+        for rule in rules:
+            receiver = rule.receiver(chain)
+            if receiver is None or not rule.accepts(len(arguments)):
+                continue
+            args_start, args_end = node.value
+            applied = [rule.pattern]
+
+            def render(name: str) -> str:
+                if name == "receiver":
+                    return self._render([receiver], text, receiver.start, receiver.end, applied)
+                if name == "args":
+                    return self._render(arguments, text, args_start, args_end, applied)
+                argument = arguments[int(name) - 1]
+                return self._render([argument], text, argument.start, argument.end, applied)
+
+            replacement = _PLACEHOLDER.sub(lambda match: render(match.group(1)), rule.template)
+            edits.append((node.start, node.end, replacement, tuple(applied)))
+            return True
+        return False
+
+    def _render(self, nodes: Sequence[Node], text: str, start: int, end: int, applied: List[str]) -> str:
+        """Return a span of the text with the edits of the given nodes applied, adding their rules."""
+        edits: List[Edit] = []
+        for node in nodes:
+            self._collect(node, text, edits)
+        for *_, rules in edits:
+            applied.extend(rules)
+        return apply_edits(text, start, end, edits)
+
+
+@lru_cache(maxsize=32)
+def _compile_cached(
+    rules: Tuple[Tuple[str, str], ...],
+    call_rules: Tuple[Tuple[str, str], ...],
+    string_rules: Tuple[Tuple[str, str], ...]
+) -> AstRewriter:
+    return AstRewriter(rules, call_rules, string_rules)
+
+
+def compile_ast_rules(
+    rules: Sequence[Tuple[str, str]],
+    call_rules: Sequence[Tuple[str, str]] = (),
+    string_rules: Sequence[Tuple[str, str]] = ()
+) -> AstRewriter:
+    """
+    Compile rule lists into an AstRewriter, reusing earlier compilations.
+
+    Args:
+        rules (Sequence[Tuple[str, str]]): Ordered ``(old, new)`` code rules.
+        call_rules (Sequence[Tuple[str, str]], optional): ``(pattern, template)`` call rules. Defaults to ().
+        string_rules (Sequence[Tuple[str, str]], optional): ``(old, new)`` string rules. Defaults to ().
+
+    Returns:
+        AstRewriter: The compiled rewriter.
+    """
+    return _compile_cached(
+        tuple((old, new) for old, new in rules),
+        tuple((pattern, template) for pattern, template in call_rules),
+        tuple((old, new) for old, new in string_rules)
+    )
@@ -0,0 +1,86 @@
+"""
+On-disk cache of compiled rewriters.
+
+Compiling a pattern set means deduplicating the rules, building the combined
+expression and deriving the prefilter anchors. The result is stored as JSON in a
+cache file keyed by a hash of the rules, so later processes (the CLI, the GUIs and
+pool workers) only load it. The regular expression itself is compiled lazily on
+first use, which files rejected by the prefilter never trigger.
+
+The cache folder defaults to ``~/.cache/fivem-converter`` and can be changed with
+the ``CONVERTER_CACHE_DIR`` environment variable; an empty value disables it.
+"""
+import hashlib
+import json
+import os
+from typing import Optional, Sequence, Tuple
+
+from modules.engine import Rewriter
+
+CACHE_DIR_ENV = "CONVERTER_CACHE_DIR"
+# Bump when the layout of the cached state or the way it is derived changes
+CACHE_VERSION = 2
+
+
+def get_cache_dir() -> Optional[str]:
+    """
+    Get the cache folder.
+
+    Returns:
+        Optional[str]: The cache folder, or None if caching is disabled.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir is not None:
+        return cache_dir or None
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "fivem-converter")
+
+
+def rules_key(rules: Sequence[Tuple[str, str]]) -> str:
+    """
+    Hash an ordered rule list.
+
+    Args:
+        rules (Sequence[Tuple[str, str]]): Ordered ``(old, new)`` pairs.
+
+    Returns:
+        str: The hex digest identifying the rules.
+    """
+    payload = json.dumps([CACHE_VERSION, [list(rule) for rule in rules]], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def load_or_compile(rules: Sequence[Tuple[str, str]]) -> Rewriter:
+    """
+    Load the compiled rewriter of a rule list from the cache, compiling and storing it on a miss.
+
+    Cache failures are never fatal: unreadable or corrupt files are recompiled and
+    unwritable folders are ignored.
+
+    Args:
+        rules (Sequence[Tuple[str, str]]): Ordered ``(old, new)`` pairs.
+
+    Returns:
+        Rewriter: The rewriter.
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return Rewriter(rules)
+
+    path = os.path.join(cache_dir, f"rewriter-{rules_key(rules)}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return Rewriter.from_state(json.load(file))
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    rewriter = Rewriter(rules)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(rewriter.get_state(), file, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+    return rewriter
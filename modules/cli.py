@@ -0,0 +1,325 @@
+"""
+Headless command line interface for batch conversions.
+
+Runs a conversion without any GUI toolkit and prints the statistics as JSON,
+which makes it suitable for CI jobs and build machines:
+
+    python -m modules.cli path/to/resource --direction esx-to-qb --workers 4
+
+Add ``--dry-run`` to stream the changes as unified diffs (or ``--preview-format
+summary``) without writing an output folder, or ``--watch`` to keep the output
+in sync with the sources until interrupted.
+
+Exit codes: 0 on success, 1 if some files failed to convert, 2 on invalid
+arguments and 3 if the conversion could not run at all.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from modules.ast_engine import ENGINES
+from modules.converter import get_output_folder, process_folder
+from modules.metrics import ConversionMetrics
+from modules.mirror import MIRROR_MODES
+from modules.patterns import load_conversion_patterns, sql_patterns_for
+from modules.preview import PREVIEW_FORMATS, preview_folder
+from modules.tracing import start_tracing, stop_tracing
+
+if TYPE_CHECKING:
+    from modules.sinks import OutputSink
+
+EXIT_OK = 0
+EXIT_FILE_ERRORS = 1
+EXIT_USAGE = 2
+EXIT_FAILURE = 3
+
+# CLI direction name -> (direction label used by the converter, pattern table key)
+DIRECTIONS: Dict[str, Tuple[str, str]] = {
+    "esx-to-qb": ("ESX to QB-Core", "ESX_to_QB_Core"),
+    "qb-to-esx": ("QB-Core to ESX", "QB_Core_to_ESX"),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser of the command line interface."""
+    parser = argparse.ArgumentParser(
+        prog="python -m modules.cli",
+        description="Convert FiveM resources between ESX and QB-Core without a GUI."
+    )
+    parser.add_argument("folder", help="Folder containing the resource to convert.")
+    parser.add_argument(
+        "-d", "--direction", choices=sorted(DIRECTIONS), default="esx-to-qb",
+        help="Conversion direction (default: esx-to-qb)."
+    )
+    parser.add_argument(
+        "--sql", action="store_true",
+        help="Include SQL patterns in queries and convert the users and vehicles tables of SQL dumps (.sql files)."
+    )
+    parser.add_argument("-p", "--prefix", default="qb-", help="Prefix of the output folder (default: qb-).")
+    parser.add_argument("-o", "--output", help="Explicit output folder, overrides --prefix.")
+    parser.add_argument(
+        "--archive", metavar="PATH",
+        help="Write the output folder into a .zip, .tar, .tar.gz or .tar.zst archive instead of to disk."
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="Number of worker processes, 0 for one per CPU (default: 1)."
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Only convert files changed since the last run into the same output folder."
+    )
+    parser.add_argument(
+        "--resources", action="store_true",
+        help="Treat the folder as a resources/ directory: convert every resource in it on a shared pool."
+    )
+    parser.add_argument(
+        "--loaded-only", action="store_true",
+        help="Only convert the Lua files the resource manifests load; mirror the others unchanged."
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="After converting, keep reconverting changed files until interrupted with Ctrl+C."
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="text",
+        help="Rewrite engine: text replaces patterns anywhere, ast only rewrites code and calls (default: text)."
+    )
+    parser.add_argument(
+        "--rules", action="append", default=[], metavar="PATH",
+        help="YAML rule pack, or folder of packs, whose rules take precedence over the bundled ones. Repeatable."
+    )
+    parser.add_argument(
+        "--mirror", choices=MIRROR_MODES, default="auto",
+        help="How unchanged files are mirrored to the output (default: auto)."
+    )
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true",
+        help="Write nothing; stream the changes that would be made instead."
+    )
+    parser.add_argument(
+        "--preview-format", choices=PREVIEW_FORMATS, default="unified",
+        help="Dry-run output: unified diffs or a per-file summary of changed spans (default: unified)."
+    )
+    parser.add_argument(
+        "--preview-file",
+        help="Write the dry-run output to this file instead of stdout; the JSON statistics then go to stdout."
+    )
+    parser.add_argument("--stats-file", help="Also write the JSON statistics to this file.")
+    parser.add_argument(
+        "--metrics-file",
+        help="Collect per-rule hits and per-file read/convert/write timings and write them as JSON."
+    )
+    parser.add_argument(
+        "--trace-file",
+        help="Trace the conversion stages, with their peak memory, and write a Chrome trace-event JSON file."
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Print a progress line per file to stderr."
+    )
+    return parser
+
+
+def _preview(
+    args: argparse.Namespace,
+    patterns: Dict[str, List[Tuple[str, str]]],
+    direction: str,
+    pattern_key: str,
+    callback: Optional[Callable[[str], None]]
+) -> Dict[str, int]:
+    """Run a dry-run preview with the parsed arguments."""
+    if not args.preview_file:
+        return preview_folder(
+            args.folder, patterns[pattern_key], direction, args.sql, sql_patterns_for(patterns, direction),
+            sys.stdout, args.preview_format, callback, args.engine
+        )
+    with open(args.preview_file, "w", encoding="utf-8") as stream:
+        return preview_folder(
+            args.folder, patterns[pattern_key], direction, args.sql, sql_patterns_for(patterns, direction),
+            stream, args.preview_format, callback, args.engine
+        )
+
+
+def _discard_archive(sink: "OutputSink", path: str):
+    """Close the sink of a failed conversion and delete its incomplete archive."""
+    try:
+        sink.close()
+    except Exception:
+        # The archive is deleted anyway; the error of the conversion is the one reported
+        pass
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the command line interface.
+
+    Args:
+        argv (Optional[List[str]], optional): Command line arguments. Defaults to ``sys.argv[1:]``.
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_OK if e.code == 0 else EXIT_USAGE
+
+    if not os.path.isdir(args.folder):
+        print(f"Error: {args.folder} is not a valid directory", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.watch and args.dry_run:
+        print("Error: --watch cannot be combined with --dry-run", file=sys.stderr)
+        return EXIT_USAGE
+    if args.resources and (args.watch or args.dry_run):
+        print("Error: --resources cannot be combined with --watch or --dry-run", file=sys.stderr)
+        return EXIT_USAGE
+    if args.loaded_only and (args.watch or args.dry_run):
+        print("Error: --loaded-only cannot be combined with --watch or --dry-run", file=sys.stderr)
+        return EXIT_USAGE
+    if args.archive and (args.watch or args.dry_run or args.incremental):
+        print("Error: --archive cannot be combined with --watch, --dry-run or --incremental", file=sys.stderr)
+        return EXIT_USAGE
+
+    direction, pattern_key = DIRECTIONS[args.direction]
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    output_folder = args.output or get_output_folder(args.folder, args.prefix)
+
+    def report(message: str):
+        print(message, file=sys.stderr)
+
+    try:
+        patterns = load_conversion_patterns(rule_packs=args.rules)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return EXIT_USAGE
+
+    sink = None
+    if args.archive:
+        # Imported here so folder outputs do not load the archive modules
+        from modules.sinks import open_archive
+
+        try:
+            sink = open_archive(args.archive, output_folder)
+        except (OSError, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return EXIT_USAGE
+
+    metrics = ConversionMetrics() if args.metrics_file else None
+    if args.trace_file:
+        start_tracing()
+    start = time.perf_counter()
+    resources = None
+    completed = False
+    try:
+        if args.dry_run:
+            stats = _preview(args, patterns, direction, pattern_key, report if args.verbose else None)
+        elif args.resources:
+            # Imported here so single-folder runs do not pay for it
+            from modules.scheduler import convert_resources
+
+            resources = convert_resources(
+                args.folder,
+                patterns[pattern_key],
+                direction,
+                args.sql,
+                sql_patterns_for(patterns, direction),
+                report if args.verbose else None,
+                output_prefix=args.prefix,
+                workers=workers,
+                incremental=args.incremental,
+                mirror_mode=args.mirror,
+                output_folder=output_folder,
+                metrics=metrics,
+                loaded_only=args.loaded_only,
+                engine=args.engine,
+                sink=sink
+            )
+            stats = resources["total"]
+        else:
+            stats = process_folder(
+                args.folder,
+                patterns[pattern_key],
+                direction,
+                args.sql,
+                sql_patterns_for(patterns, direction),
+                report if args.verbose else None,
+                output_prefix=args.prefix,
+                workers=workers,
+                incremental=args.incremental or args.watch,
+                mirror_mode=args.mirror,
+                output_folder=output_folder,
+                metrics=metrics,
+                loaded_only=args.loaded_only,
+                engine=args.engine,
+                sink=sink
+            )
+        if sink is not None:
+            sink.close()
+        completed = True
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return EXIT_FAILURE
+    finally:
+        if sink is not None and not completed:
+            _discard_archive(sink, args.archive)
+        tracer = stop_tracing()
+        if tracer is not None:
+            try:
+                tracer.save(args.trace_file)
+            except OSError as e:
+                # Reported without replacing the outcome of the conversion
+                print(f"Error: could not write the trace: {str(e)}", file=sys.stderr)
+
+    result = {
+        "folder": os.path.abspath(args.folder),
+        "output_folder": os.path.abspath(output_folder),
+        "direction": direction,
+        "include_sql": args.sql,
+        "workers": workers,
+        "dry_run": args.dry_run,
+        "archive": os.path.abspath(args.archive) if args.archive else None,
+        "elapsed_seconds": round(time.perf_counter() - start, 6),
+        "stats": stats,
+    }
+    if resources is not None:
+        result["resources"] = resources["resources"]
+        result["order"] = resources["order"]
+        result["cpu_seconds"] = resources["cpu_seconds"]
+    payload = json.dumps(result, indent=2)
+    # A dry run streams its preview to stdout unless it goes to a file
+    print(payload, file=sys.stderr if args.dry_run and not args.preview_file else sys.stdout)
+    if args.stats_file:
+        with open(args.stats_file, "w", encoding="utf-8") as file:
+            file.write(payload + "\n")
+    if metrics is not None:
+        metrics.save(args.metrics_file)
+
+    if args.watch:
+        # Imported here so plain conversions do not require watchfiles
+        from modules.watch import watch_folder
+
+        try:
+            watch_folder(
+                args.folder, patterns[pattern_key], direction, args.sql, sql_patterns_for(patterns, direction),
+                report, output_folder=output_folder, mirror_mode=args.mirror, initial_sync=False,
+                engine=args.engine
+            )
+        except Exception as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return EXIT_FAILURE
+
+    return EXIT_FILE_ERRORS if stats["error_files"] or stats.get("failed_resources") else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
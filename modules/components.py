@@ -2,9 +2,12 @@
 UI components for the ESX/QB-Core Converter application.
 Desktop GUI using CustomTkinter.
 """
+import queue
+from collections import deque
+
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from typing import Callable
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
 
 class FolderSelector(ctk.CTkFrame):
@@ -86,6 +89,26 @@ class ConversionOptions(ctk.CTkFrame):
         )
         self.sql_checkbox.pack(pady=5)
 
+        # Incremental switch; off by default so every run is a full conversion
+        self.incremental_var = ctk.BooleanVar(value=False)
+        self.incremental_checkbox = ctk.CTkCheckBox(
+            self,
+            text="Skip Files Unchanged Since Last Run",
+            variable=self.incremental_var,
+            font=("Arial", 11)
+        )
+        self.incremental_checkbox.pack(pady=5)
+
+        # Metrics switch; collecting them slows the conversion down
+        self.metrics_var = ctk.BooleanVar(value=False)
+        self.metrics_checkbox = ctk.CTkCheckBox(
+            self,
+            text="Collect Conversion Metrics",
+            variable=self.metrics_var,
+            font=("Arial", 11)
+        )
+        self.metrics_checkbox.pack(pady=5)
+
     @property
     def conversion_direction(self) -> str:
         """Get the selected conversion direction."""
@@ -96,15 +119,60 @@ class ConversionOptions(ctk.CTkFrame):
         """Get whether to include SQL patterns."""
         return self.sql_var.get()
 
+    @property
+    def incremental(self) -> bool:
+        """Get whether to skip files unchanged since the last run."""
+        return self.incremental_var.get()
 
-class OutputConsole(ctk.CTkFrame):
-    """A component for displaying output messages."""
+    @property
+    def collect_metrics(self) -> bool:
+        """Get whether to collect per-rule and per-file conversion metrics."""
+        return self.metrics_var.get()
 
-    def __init__(self, master):
-        """Initialize the output console component."""
+
+class OutputConsole(ctk.CTkFrame):
+    """
+    A component for displaying output messages.
+
+    ``add_message`` only queues the message, so it is safe to call from any thread.
+    The queue is drained on the Tk thread every ``refresh_ms`` milliseconds, with one
+    insert per run of same-type messages, and only the last ``max_lines`` lines are
+    kept. Routine messages listed in ``COLLAPSED_PREFIXES`` are counted below the
+    text instead of being printed one per line.
+    """
+
+    COLORS = {
+        'info': '#2196F3',      # Blue
+        'success': '#4CAF50',   # Green
+        'error': '#F44336',     # Red
+        'warning': '#FF9800'    # Orange
+    }
+    COLLAPSED_PREFIXES = (
+        "No changes needed:", "Unchanged since last run:", "Up to date:", "Not loaded by the manifest:"
+    )
+
+    def __init__(self, master, max_lines: int = 5000, refresh_ms: int = 50, collapse_routine: bool = True):
+        """
+        Initialize the output console component.
+
+        Args:
+            master: The parent widget.
+            max_lines (int, optional): Number of lines kept in the console. Defaults to 5000.
+            refresh_ms (int, optional): Interval between two drains of the queue. Defaults to 50.
+            collapse_routine (bool, optional): Count routine messages instead of printing them.
+                Defaults to True.
+        """
         super().__init__(master)
         self.pack(pady=5, padx=5, fill="both", expand=True)
 
+        self.max_lines = max_lines
+        self.refresh_ms = refresh_ms
+        self.collapse_routine = collapse_routine
+        self._queue: "queue.SimpleQueue[Tuple[str, str]]" = queue.SimpleQueue()
+        self._history: Deque[str] = deque(maxlen=max_lines)
+        self._counters: Dict[str, int] = {}
+        self._line_count = 0
+
         self.label = ctk.CTkLabel(self, text="Conversion Output", font=("Arial", 12, "bold"))
         self.label.pack(pady=2)
 
@@ -119,11 +187,17 @@ class OutputConsole(ctk.CTkFrame):
             state="disabled"
         )
         self.textbox.pack(side="left", fill="both", expand=True)
+        for message_type, color in self.COLORS.items():
+            self.textbox.tag_config(message_type, foreground=color)
 
         self.scrollbar = ctk.CTkScrollbar(self.text_frame, command=self.textbox.yview)
         self.scrollbar.pack(side="right", fill="y")
         self.textbox.configure(yscrollcommand=self.scrollbar.set)
 
+        # Counters of collapsed routine messages
+        self.counter_label = ctk.CTkLabel(self, text="", font=("Arial", 11), text_color="gray")
+        self.counter_label.pack(pady=2)
+
         # Clear button
         self.clear_button = ctk.CTkButton(
             self,
@@ -136,35 +210,102 @@ class OutputConsole(ctk.CTkFrame):
         )
         self.clear_button.pack(pady=5)
 
-    def add_message(self, message: str, message_type: str = 'info'):
-        """Add a message to the output console."""
-        # Define colors for different message types
-        colors = {
-            'info': '#2196F3',      # Blue
-            'success': '#4CAF50',   # Green
-            'error': '#F44336',     # Red
-            'warning': '#FF9800'    # Orange
-        }
-
-        color = colors.get(message_type, colors['info'])
+        self._drain_job = self.after(self.refresh_ms, self._drain)
 
+    def add_message(self, message: str, message_type: str = 'info'):
+        """Queue a message for the output console. Safe to call from any thread."""
+        self._queue.put((message, message_type if message_type in self.COLORS else 'info'))
+
+    def _drain(self):
+        """Insert the queued messages on the Tk thread, then schedule the next drain."""
+        batch: List[Tuple[str, str]] = []
+        counters_changed = False
+        try:
+            # Bound the work per frame so a flood of messages cannot stall the UI
+            while len(batch) < 2000:
+                message, message_type = self._queue.get_nowait()
+                prefix = self._collapsed_prefix(message)
+                if prefix is not None:
+                    self._counters[prefix] = self._counters.get(prefix, 0) + 1
+                    counters_changed = True
+                    continue
+                batch.append((message, message_type))
+        except queue.Empty:
+            pass
+
+        if batch:
+            self._insert(batch)
+        if counters_changed:
+            self._update_counters()
+        self._drain_job = self.after(self.refresh_ms, self._drain)
+
+    def _collapsed_prefix(self, message: str) -> Optional[str]:
+        if self.collapse_routine:
+            for prefix in self.COLLAPSED_PREFIXES:
+                if message.startswith(prefix):
+                    return prefix
+        return None
+
+    def _insert(self, batch: List[Tuple[str, str]]):
+        """Insert a batch of messages, one insert per run of the same type, and trim old lines."""
         self.textbox.configure(state="normal")
-        self.textbox.insert("end", message + "\n")
-        self.textbox.tag_add(message_type, "end-2l", "end-1l")
-        self.textbox.tag_config(message_type, foreground=color)
+        run: List[str] = []
+        run_type = batch[0][1]
+        for message, message_type in batch:
+            if message_type != run_type:
+                self._insert_run(run, run_type)
+                run, run_type = [], message_type
+            run.append(message)
+        self._insert_run(run, run_type)
+
+        excess = self._line_count - self.max_lines
+        if excess > 0:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
+            self._line_count -= excess
         self.textbox.see("end")
         self.textbox.configure(state="disabled")
 
+    def _insert_run(self, messages: List[str], message_type: str):
+        text = "\n".join(messages) + "\n"
+        self.textbox.insert("end", text, message_type)
+        lines = text.splitlines()
+        self._history.extend(lines)
+        self._line_count += len(lines)
+
+    def _update_counters(self):
+        self.counter_label.configure(text="   ".join(
+            f"{prefix} {count}" for prefix, count in self._counters.items()
+        ))
+
     def clear(self):
-        """Clear all messages from the output console."""
+        """Clear all messages, pending ones and counters from the output console. Call from the Tk thread."""
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._history.clear()
+        self._counters.clear()
+        self._line_count = 0
+        self.counter_label.configure(text="")
         self.textbox.configure(state="normal")
         self.textbox.delete("1.0", "end")
         self.textbox.configure(state="disabled")
 
+    def destroy(self):
+        """Stop draining the queue and destroy the component."""
+        self.after_cancel(self._drain_job)
+        super().destroy()
+
     @property
     def value(self) -> str:
-        """Get the current output text."""
-        return self.textbox.get("1.0", "end-1c")
+        """Get the current output text, as of the last drain."""
+        return "\n".join(self._history)
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        """Get the number of collapsed messages per prefix."""
+        return dict(self._counters)
 
 
 class ActionButtons(ctk.CTkFrame):
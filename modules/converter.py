@@ -1,10 +1,39 @@
 """
 Core converter functionality for ESX to QB-Core and QB-Core to ESX conversions.
 """
+import io
+import mmap
 import os
-import re
-import shutil
-from typing import List, Tuple, Dict, Optional, Callable
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, List, Tuple, Dict, Deque, Iterator, Optional, Callable, Union
+
+from modules.ast_engine import ENGINES, AstRewriter, compile_ast_rules
+from modules.engine import Rewriter, chain_rules, compile_rules
+from modules.metrics import ConversionMetrics, new_file_record
+from modules.mirror import mirror_file, remove_file, scan_tree
+from modules.patterns import CALL_PATTERNS
+from modules.tracing import active_tracer, add_events, span, start_tracing, stop_tracing
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    from modules.sinks import OutputSink
+
+# Files at least this large are scanned for anchors through an mmap
+_MMAP_THRESHOLD = 1 << 20
+
+
+MANUAL_REPLACEMENTS: Dict[str, Dict[str, str]] = {
+    "ESX to QB-Core": {
+        "ESX = exports['es_extended']:getSharedObject()": "local QBCore = exports['qb-core']:GetCoreObject()",
+    },
+    "QB-Core to ESX": {
+        "local QBCore = exports['qb-core']:GetCoreObject()": "ESX = exports['es_extended']:getSharedObject()",
+        "QBCore = exports['qb-core']:GetCoreObject()": "ESX = exports['es_extended']:getSharedObject()",
+    },
+}
 
 
 def manual_replace(script: str, direction: str = "ESX to QB-Core") -> str:
@@ -18,20 +47,13 @@ def manual_replace(script: str, direction: str = "ESX to QB-Core") -> str:
     Returns:
         str: The modified script content.
     """
-    if direction == "ESX to QB-Core":
-        replacements = {
-            "ESX = exports['es_extended']:getSharedObject()": "local QBCore = exports['qb-core']:GetCoreObject()",
-        }
-    else:  # QB-Core to ESX
-        replacements = {
-            "local QBCore = exports['qb-core']:GetCoreObject()": "ESX = exports['es_extended']:getSharedObject()",
-            "QBCore = exports['qb-core']:GetCoreObject()": "ESX = exports['es_extended']:getSharedObject()",
-        }
+    return compile_rules(_manual_rules(direction)).sub(script)
 
-    for old, new in replacements.items():
-        script = script.replace(old, new)
 
-    return script
+def _manual_rules(direction: str) -> List[Tuple[str, str]]:
+    """Return the manual replacements for a direction as an ordered rule list."""
+    replacements = MANUAL_REPLACEMENTS.get(direction, MANUAL_REPLACEMENTS["QB-Core to ESX"])
+    return list(replacements.items())
 
 
 def convert_script(
@@ -39,33 +61,77 @@ def convert_script(
     patterns: List[Tuple[str, str]], 
     include_sql: bool = False, 
     sql_patterns: Optional[List[Tuple[str, str]]] = None,
-    direction: str = "ESX to QB-Core"
+    direction: str = "ESX to QB-Core",
+    metrics: Optional[ConversionMetrics] = None,
+    engine: str = "text"
 ) -> str:
     """
     Convert the script content based on the provided patterns.
 
+    The whole pattern set is applied in a single left-to-right scan where the
+    longest matching pattern wins at every position.
+
     Args:
         script (str): The original script content.
         patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
         include_sql (bool, optional): Flag to include SQL patterns. Defaults to False.
         sql_patterns (Optional[List[Tuple[str, str]]], optional): List of SQL pattern tuples. Defaults to None.
         direction (str, optional): Conversion direction. Defaults to "ESX to QB-Core".
+        metrics (Optional[ConversionMetrics], optional): Collects the hits of every rule. Defaults to None.
+        engine (str, optional): The rewrite engine, one of ``ENGINES``: "text" replaces patterns
+            anywhere in the text, "ast" parses the script and only rewrites code, whole string
+            literals and calls, see ``modules.ast_engine``. Defaults to "text".
 
     Returns:
         str: The converted script content.
     """
-    if sql_patterns is None:
-        sql_patterns = []
-        
-    script = manual_replace(script, direction)
-    for old, new in patterns:
-        script = script.replace(old, new)
-    
-    if include_sql:
-        for old, new in sql_patterns:
-            script = script.replace(old, new)
-            
-    return script
+    rewriter = get_rewriter(patterns, include_sql, sql_patterns, direction, engine)
+    if metrics is None:
+        with span("convert_script", bytes=len(script)):
+            return rewriter.sub(script)
+    hits: Dict[str, int] = {}
+    with span("convert_script", bytes=len(script)):
+        converted = rewriter.sub(script, hits)
+    metrics.set_rules(rewriter.table)
+    metrics.add_hits(hits)
+    return converted
+
+
+def get_rewriter(
+    patterns: List[Tuple[str, str]],
+    include_sql: bool = False,
+    sql_patterns: Optional[List[Tuple[str, str]]] = None,
+    direction: str = "ESX to QB-Core",
+    engine: str = "text"
+) -> Union[Rewriter, AstRewriter]:
+    """
+    Get the compiled single-pass rewriter for a pattern set.
+
+    Manual replacements come first, then the direction patterns, then the SQL
+    patterns when enabled. Rewriters are cached, so repeated calls with the same
+    pattern set do not recompile anything.
+
+    The "ast" engine also applies the call rules of the direction from ``CALL_PATTERNS``
+    and applies the SQL patterns inside string literals only.
+
+    Args:
+        patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
+        include_sql (bool, optional): Flag to include SQL patterns. Defaults to False.
+        sql_patterns (Optional[List[Tuple[str, str]]], optional): List of SQL pattern tuples. Defaults to None.
+        direction (str, optional): Conversion direction. Defaults to "ESX to QB-Core".
+        engine (str, optional): The rewrite engine, one of ``ENGINES``. Defaults to "text".
+
+    Returns:
+        Union[Rewriter, AstRewriter]: The compiled rewriter.
+    """
+    sql_rules = (sql_patterns or []) if include_sql else []
+    if engine == "ast":
+        return compile_ast_rules(
+            chain_rules(_manual_rules(direction), patterns), CALL_PATTERNS.get(direction, []), sql_rules
+        )
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    return compile_rules(chain_rules(_manual_rules(direction), patterns, sql_rules))
 
 
 def process_file(
@@ -74,7 +140,10 @@ def process_file(
     patterns: List[Tuple[str, str]], 
     direction: str, 
     include_sql: bool, 
-    sql_patterns: List[Tuple[str, str]]
+    sql_patterns: List[Tuple[str, str]],
+    mirror_mode: str = "auto",
+    metrics: Optional[ConversionMetrics] = None,
+    engine: str = "text"
 ) -> bool:
     """
     Process a single Lua script file, converting its content based on the patterns.
@@ -86,30 +155,454 @@ def process_file(
         direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
         include_sql (bool): Flag to include SQL patterns.
         sql_patterns (List[Tuple[str, str]]): List of SQL pattern tuples.
+        mirror_mode (str, optional): How an unchanged file is mirrored to the output,
+            one of ``MIRROR_MODES``. Defaults to "auto".
+        metrics (Optional[ConversionMetrics], optional): Collects rule hits, bytes and stage
+            timings of the file. Defaults to None.
+        engine (str, optional): The rewrite engine, one of ``ENGINES``. Defaults to "text".
 
     Returns:
         bool: True if changes were made, False otherwise
     """
+    record = new_file_record() if metrics is not None else None
     try:
-        with open(input_path, "r", encoding="utf-8") as file:
-            content = file.read()
+        status = _convert_file(
+            input_path, output_path, patterns, direction, include_sql, sql_patterns, mirror_mode, record, engine
+        )
+    except Exception as e:
+        print(f"Error processing {input_path}: {str(e)}")
+        status = "error"
+    if metrics is not None:
+        metrics.set_rules(get_rewriter(patterns, include_sql, sql_patterns, direction, engine).table)
+        metrics.add_file(input_path, status, record)
+    return status == "converted"
+
+
+def is_script(path: str, include_sql: bool = False) -> bool:
+    """
+    Check whether a file is converted rather than mirrored.
+
+    Args:
+        path (str): Path or name of the file.
+        include_sql (bool, optional): Whether SQL dumps (``.sql`` files) are converted too.
+            Defaults to False.
+
+    Returns:
+        bool: True for Lua scripts, and for SQL dumps with ``include_sql``.
+    """
+    return path.endswith(".lua") or (include_sql and path.endswith(".sql"))
+
+
+def _convert_dump(
+    input_path: str,
+    output_path: str,
+    direction: str,
+    mirror_mode: str,
+    record: Optional[Dict[str, object]]
+) -> str:
+    """Convert an SQL dump, streaming; its timings are all counted as converting."""
+    # Imported here so Lua-only conversions do not load the dump converter
+    from modules.sql_dump import convert_sql_file
+
+    start = time.perf_counter()
+    with span("convert_dump", path=input_path) as args:
+        status = args["status"] = convert_sql_file(
+            input_path, output_path, direction, mirror_mode, record["hits"] if record else None
+        )
+    if record is not None:
+        record["convert"] = time.perf_counter() - start
+        record["bytes_in"] = os.path.getsize(input_path)
+        record["bytes_out"] = os.path.getsize(output_path)
+    return status
+
+
+def _convert_dump_into(
+    input_path: str,
+    output_path: str,
+    direction: str,
+    sink: "OutputSink",
+    record: Optional[Dict[str, object]] = None
+) -> str:
+    """
+    Convert an SQL dump straight into an output sink, streaming.
+
+    Returns:
+        str: The status, as for ``_convert_file``.
+    """
+    # Imported here so Lua-only conversions do not load the dump converter
+    from modules.sql_dump import _mentions_tables, convert_sql_stream
 
-        converted = convert_script(content, patterns, include_sql, sql_patterns, direction)
+    start = time.perf_counter()
+    if not _mentions_tables(input_path, direction):
+        with span("sink_copy", path=input_path):
+            sink.copy(output_path, input_path)
+        status = "prefiltered"
+    else:
+        with span("convert_dump", path=input_path), sink.open(output_path, input_path) as stream, \
+                open(input_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as source:
+            target = io.TextIOWrapper(stream, encoding="utf-8", errors="surrogateescape", newline="")
+            hits = record["hits"] if record is not None else None
+            changed = convert_sql_stream(source, target, direction, hits)
+            # Leaves the stream to the sink, which finishes the file
+            target.detach()
+        status = "converted" if changed else "skipped"
+    if record is not None:
+        record["convert"] = time.perf_counter() - start
+        record["bytes_in"] = os.path.getsize(input_path)
+    return status
 
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        if content != converted:
-            with open(output_path, "w", encoding="utf-8") as file:
+
+@contextmanager
+def _open_source(input_path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Open a source file as bytes, or as a read-only mmap if it is large, so it is never copied."""
+    with open(input_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size >= _MMAP_THRESHOLD:
+            with span("read", mmap=True):
+                view = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            with view:
+                yield view
+        else:
+            with span("read"):
+                data = file.read()
+            yield data
+
+
+def _read_candidate(input_path: str, rewriter: Union[Rewriter, AstRewriter]) -> Optional[bytes]:
+    """
+    Read a source file if the rewriter can match anything in it.
+
+    The raw bytes are checked against the rewriter's anchors before anything is
+    decoded. Large files are scanned through an mmap so a file without anchors is
+    never copied into memory.
+
+    Returns:
+        Optional[bytes]: The raw content, or None if no rule can match it.
+    """
+    with _open_source(input_path) as data:
+        if not rewriter.may_match(data):
+            return None
+        return data if isinstance(data, bytes) else data[:]
+
+
+def rewrite_content(
+    rewriter: Union[Rewriter, AstRewriter],
+    raw: Union[bytes, mmap.mmap],
+    hits: Optional[Dict[str, int]] = None
+) -> bytes:
+    """
+    Rewrite the raw content of a script, keeping its encoding and line endings.
+
+    ASCII rule sets of the text engine rewrite the bytes directly, see ``Rewriter.sub_bytes``.
+    Otherwise the content is decoded as UTF-8, with bytes of other encodings such as Latin-1 or
+    CP1252 escaped, and encoded back so those bytes are written out unchanged.
+
+    Args:
+        rewriter (Union[Rewriter, AstRewriter]): The rewriter from ``get_rewriter``.
+        raw (Union[bytes, mmap.mmap]): The content of the script, or an mmap of it.
+        hits (Optional[Dict[str, int]], optional): When given, the number of matches of every
+            pattern is added to it. Defaults to None.
+
+    Returns:
+        bytes: The rewritten content.
+    """
+    if isinstance(rewriter, Rewriter) and rewriter.bytes_regex is not None:
+        return rewriter.sub_bytes(raw, hits)
+    content = raw[:].decode("utf-8", "surrogateescape")
+    return rewriter.sub(content, hits).encode("utf-8", "surrogateescape")
+
+
+def _convert_file(
+    input_path: str,
+    output_path: str,
+    patterns: List[Tuple[str, str]],
+    direction: str,
+    include_sql: bool,
+    sql_patterns: List[Tuple[str, str]],
+    mirror_mode: str = "auto",
+    record: Optional[Dict[str, object]] = None,
+    engine: str = "text"
+) -> str:
+    """
+    Convert a single file, raising on errors.
+
+    SQL dumps are converted by ``modules.sql_dump`` with the database schema of the direction;
+    the SQL patterns only apply to queries in scripts.
+
+    Args:
+        record (Optional[Dict[str, object]], optional): A record from ``new_file_record`` that
+            receives the stage timings, byte counts and rule hits. Defaults to None.
+        engine (str, optional): The rewrite engine, one of ``ENGINES``. Defaults to "text".
+
+    Returns:
+        str: "converted" if the content changed, "skipped" if no pattern matched, or
+        "prefiltered" if the file contains no anchor and was mirrored without decoding.
+    """
+    if input_path.endswith(".sql"):
+        return _convert_dump(input_path, output_path, direction, mirror_mode, record)
+
+    rewriter = get_rewriter(patterns, include_sql, sql_patterns, direction, engine)
+
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    status, converted = _rewrite_source(input_path, rewriter, record)
+    start = time.perf_counter() if record is not None else 0.0
+    if converted is not None:
+        with span("write", bytes=len(converted)):
+            # Replace rather than overwrite, the output may be a hard link to the source
+            remove_file(output_path)
+            with open(output_path, "wb") as file:
                 file.write(converted)
-            return True
+    else:
+        # Mirror file even if no changes
+        with span("mirror"):
+            mirror_file(input_path, output_path, mirror_mode)
+
+    if record is not None:
+        record["write"] = time.perf_counter() - start
+        record["bytes_out"] = record["bytes_in"] if converted is None else len(converted)
+    return status
+
+
+def _rewrite_source(
+    input_path: str,
+    rewriter: Union[Rewriter, AstRewriter],
+    record: Optional[Dict[str, object]] = None
+) -> Tuple[str, Optional[bytes]]:
+    """
+    Convert a script in memory, without writing anything.
+
+    Args:
+        input_path (str): Path to the script.
+        rewriter (Union[Rewriter, AstRewriter]): The rewriter from ``get_rewriter``.
+        record (Optional[Dict[str, object]], optional): Receives the read and convert timings,
+            the input size and the rule hits. Defaults to None.
+
+    Returns:
+        Tuple[str, Optional[bytes]]: "converted" with the new content, or "skipped" or
+        "prefiltered" (see ``_convert_file``) with None.
+    """
+    timer = time.perf_counter if record is not None else None
+    start = timer() if timer else 0.0
+    with _open_source(input_path) as raw:
+        with span("prefilter", bytes=len(raw)):
+            candidate = rewriter.may_match(raw)
+        if timer:
+            record["read"] = timer() - start
+            record["bytes_in"] = len(raw)
+            start = timer()
+        if not candidate:
+            return "prefiltered", None
+        with span("convert", bytes=len(raw)):
+            converted = rewrite_content(rewriter, raw, record["hits"] if record is not None else None)
+            with memoryview(raw) as view:
+                changed = view != converted
+    if timer:
+        record["convert"] = timer() - start
+    return ("converted", converted) if changed else ("skipped", None)
+
+
+# The status, error message, metrics record and captured content of a converted file
+_TaskResult = Tuple[str, Optional[str], Optional[Dict[str, object]], Optional[bytes]]
+
+# Per-process conversion settings, set once by _init_worker in pool workers.
+_WORKER_SETTINGS: Optional[Tuple[List[Tuple[str, str]], str, bool, List[Tuple[str, str]], str, bool, str, bool]] = None
+
+
+def _init_worker(
+    patterns: List[Tuple[str, str]],
+    direction: str,
+    include_sql: bool,
+    sql_patterns: List[Tuple[str, str]],
+    mirror_mode: str,
+    collect_metrics: bool = False,
+    engine: str = "text",
+    capture: bool = False
+):
+    """
+    Initialize a pool worker with the conversion settings.
+
+    The patterns are pickled once per worker here instead of once per file, and
+    the rewriter is compiled eagerly so the first file does not pay for it.
+    """
+    global _WORKER_SETTINGS
+    _WORKER_SETTINGS = (patterns, direction, include_sql, sql_patterns, mirror_mode, collect_metrics, engine, capture)
+    get_rewriter(patterns, include_sql, sql_patterns, direction, engine)
+
+
+def _run_task(
+    task: Tuple[str, str],
+    settings: Tuple[List[Tuple[str, str]], str, bool, List[Tuple[str, str]], str, bool, str, bool]
+) -> _TaskResult:
+    """
+    Convert one ``(input_path, output_path)`` task with the given settings.
+
+    With ``capture`` set, the last setting, nothing is written: the content of a converted script
+    is returned instead, for an output sink (see ``modules.sinks``). SQL dumps cannot be captured.
+
+    Returns:
+        _TaskResult: The conversion status, an error message if it failed, the metrics record if
+        metrics are collected, and the converted content if it is captured.
+    """
+    patterns, direction, include_sql, sql_patterns, mirror_mode, collect_metrics, engine, capture = settings
+    record = new_file_record() if collect_metrics else None
+    converted = None
+    with span("file", path=task[0]) as args:
+        try:
+            if capture:
+                rewriter = get_rewriter(patterns, include_sql, sql_patterns, direction, engine)
+                status, converted = _rewrite_source(task[0], rewriter, record)
+            else:
+                status = _convert_file(
+                    task[0], task[1], patterns, direction, include_sql, sql_patterns, mirror_mode, record, engine
+                )
+        except Exception as e:
+            args["status"] = "error"
+            return "error", str(e), record, None
+        args["status"] = status
+    return status, None, record, converted
+
+
+def _convert_chunk(
+    tasks: List[Tuple[str, str]], trace: bool = False, trace_memory: bool = False
+) -> Tuple[List[_TaskResult], List[Dict[str, object]]]:
+    """
+    Convert a chunk of files inside a pool worker.
+
+    Returns:
+        Tuple[List[_TaskResult], List[Dict[str, object]]]: The results, and the trace events of the
+        chunk if ``trace`` is set (see ``modules.tracing``).
+    """
+    tracer = active_tracer()
+    if tracer is not None and (not trace or tracer.memory != trace_memory):
+        # The pool is shared by runs with other tracing settings
+        stop_tracing()
+        tracer = None
+    if not trace:
+        return [_run_task(task, _WORKER_SETTINGS) for task in tasks], []
+    tracer = tracer or start_tracing(trace_memory, "worker")
+    return [_run_task(task, _WORKER_SETTINGS) for task in tasks], tracer.drain()
+
+
+def create_pool(
+    workers: int,
+    patterns: List[Tuple[str, str]],
+    direction: str,
+    include_sql: bool,
+    sql_patterns: List[Tuple[str, str]],
+    mirror_mode: str = "auto",
+    collect_metrics: bool = False,
+    engine: str = "text",
+    capture: bool = False
+) -> "ProcessPoolExecutor":
+    """
+    Create a process pool whose workers are initialized with the conversion settings.
+
+    The pool can be shared by several conversions with the same settings, see the
+    ``executor`` argument of ``ConversionJob``.
+
+    Args:
+        workers (int): Number of worker processes.
+        patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
+        direction (str): Conversion direction.
+        include_sql (bool): Flag to include SQL patterns.
+        sql_patterns (List[Tuple[str, str]]): List of SQL pattern tuples.
+        mirror_mode (str, optional): How unchanged files are mirrored. Defaults to "auto".
+        collect_metrics (bool, optional): Return a metrics record per file. Defaults to False.
+        engine (str, optional): The rewrite engine, one of ``ENGINES``. Defaults to "text".
+        capture (bool, optional): Return converted scripts instead of writing them, for an
+            output sink. Defaults to False.
+
+    Returns:
+        ProcessPoolExecutor: The pool. The caller shuts it down.
+    """
+    # Imported here so sequential runs and the CLI do not pay for multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            list(patterns), direction, include_sql, list(sql_patterns or []), mirror_mode, collect_metrics,
+            engine, capture
+        )
+    )
+
+
+def _iter_conversions(
+    tasks: List[Tuple[str, str]],
+    patterns: List[Tuple[str, str]],
+    direction: str,
+    include_sql: bool,
+    sql_patterns: List[Tuple[str, str]],
+    workers: int,
+    mirror_mode: str = "auto",
+    collect_metrics: bool = False,
+    executor: Optional["ProcessPoolExecutor"] = None,
+    engine: str = "text",
+    capture: bool = False
+) -> Iterator[_TaskResult]:
+    """
+    Convert the given ``(input_path, output_path)`` tasks, yielding results in task order.
+
+    Args:
+        tasks (List[Tuple[str, str]]): Files to convert.
+        patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
+        direction (str): Conversion direction.
+        include_sql (bool): Flag to include SQL patterns.
+        sql_patterns (List[Tuple[str, str]]): List of SQL pattern tuples.
+        workers (int): Number of worker processes. 1 converts in the calling process.
+        mirror_mode (str, optional): How unchanged files are mirrored. Defaults to "auto".
+        collect_metrics (bool, optional): Return a metrics record per file. Defaults to False.
+        executor (Optional[ProcessPoolExecutor], optional): A pool from ``create_pool`` with the
+            same settings, used instead of a private pool and left running. Defaults to None.
+        engine (str, optional): The rewrite engine, one of ``ENGINES``. Defaults to "text".
+        capture (bool, optional): Return converted scripts instead of writing them, see ``_run_task``.
+            Defaults to False.
+
+    Yields:
+        _TaskResult: The conversion status, an error message if it failed, the metrics record if
+        requested, and the converted content if captured.
+    """
+    settings = (
+        list(patterns), direction, include_sql, list(sql_patterns or []), mirror_mode, collect_metrics,
+        engine, capture
+    )
+    if executor is None and (workers <= 1 or len(tasks) < 2):
+        for task in tasks:
+            yield _run_task(task, settings)
+        return
+
+    # Small chunks keep pauses and cancellations prompt; 64 files amortize the IPC well
+    chunksize = max(1, min(64, len(tasks) // (workers * 4)))
+    own_executor = executor is None
+    if own_executor:
+        executor = create_pool(workers, *settings)
+    pending: Deque["Future[Tuple[List[_TaskResult], List[Dict[str, object]]]]"] = deque()
+    tracer = active_tracer()
+    trace_options = (True, tracer.memory) if tracer is not None else (False, False)
+
+    def next_results() -> List[_TaskResult]:
+        results, events = pending.popleft().result()
+        add_events(events)
+        return results
+
+    try:
+        # Chunks are submitted as results are consumed, so a paused consumer pauses the pool,
+        # and results are yielded in submission order, which keeps callbacks deterministic
+        for start in range(0, len(tasks), chunksize):
+            pending.append(executor.submit(_convert_chunk, tasks[start:start + chunksize], *trace_options))
+            if len(pending) >= workers * 2:
+                yield from next_results()
+        while pending:
+            yield from next_results()
+    finally:
+        # Drop the queued tasks if the caller stops early, e.g. when a callback raises
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
         else:
-            # Copy file even if no changes
-            shutil.copy2(input_path, output_path)
-            return False
-    except Exception as e:
-        print(f"Error processing {input_path}: {str(e)}")
-        return False
+            for future in pending:
+                future.cancel()
 
 
 def process_folder(
@@ -119,7 +612,15 @@ def process_folder(
     include_sql: bool, 
     sql_patterns: List[Tuple[str, str]],
     callback: Optional[Callable[[str], None]] = None,
-    output_prefix: str = "qb-"
+    output_prefix: str = "qb-",
+    workers: int = 1,
+    incremental: bool = False,
+    mirror_mode: str = "auto",
+    output_folder: Optional[str] = None,
+    metrics: Optional[ConversionMetrics] = None,
+    loaded_only: bool = False,
+    engine: str = "text",
+    sink: Optional["OutputSink"] = None
 ) -> Dict[str, int]:
     """
     Recursively process all Lua script files in the specified folder.
@@ -132,64 +633,138 @@ def process_folder(
         sql_patterns (List[Tuple[str, str]]): List of SQL pattern tuples.
         callback (Optional[Callable[[str], None]], optional): Callback function for progress updates. Defaults to None.
         output_prefix (str, optional): Prefix for the output folder. Defaults to "qb-".
+        workers (int, optional): Number of worker processes used to convert files. Values above 1
+            convert in a process pool; progress messages keep the same order as a sequential run.
+            Defaults to 1.
+        incremental (bool, optional): Keep a manifest in the output folder and only convert files
+            that are new or changed since the last run with the same settings. Outputs whose
+            sources are gone are deleted. Defaults to False.
+        mirror_mode (str, optional): How unchanged scripts and non-Lua files are mirrored to the
+            output, one of ``MIRROR_MODES``: "hardlink", "reflink", "copy_file_range", "sendfile",
+            "copy" or "auto". Files already up to date at the destination are skipped.
+            Defaults to "auto".
+        output_folder (Optional[str], optional): Explicit output folder. Defaults to the input
+            folder's name with ``output_prefix``, next to the input folder.
+        metrics (Optional[ConversionMetrics], optional): Collects rule hits, bytes and per-file
+            read, convert and write timings, also from pool workers. Defaults to None.
+        loaded_only (bool, optional): Only convert the Lua files that the ``fxmanifest.lua`` or
+            ``__resource.lua`` of their resource loads; other files of a resource, such as
+            examples and dead code, are mirrored unchanged. Lua files outside of any resource
+            are still converted. Defaults to False.
+        engine (str, optional): The rewrite engine, one of ``ENGINES``: "text" or the syntax-aware
+            "ast" engine. Defaults to "text".
+        sink (Optional[OutputSink], optional): Write the output into this sink, e.g. a zip archive
+            from ``modules.sinks.open_archive``, instead of the output folder. The output folder
+            then only names the files. Cannot be combined with ``incremental``. Defaults to None.
+
+    Returns:
+        Dict[str, int]: Statistics about the conversion process. ``prefiltered_files`` counts the
+        skipped files that contained none of the pattern set's anchors and were never decoded,
+        ``unloaded_files`` the skipped files mirrored because of ``loaded_only``.
+
+    Use ``modules.job.ConversionJob`` directly for typed progress events with an ETA, and to
+    pause or cancel the conversion.
+    """
+    # Imported here to avoid a circular import, jobs are built on this module
+    from modules.job import FINISHED, ConversionJob
+
+    job = ConversionJob(
+        folder_path, patterns, direction, include_sql, sql_patterns, output_prefix, workers,
+        incremental, mirror_mode, output_folder, metrics, loaded_only=loaded_only, engine=engine,
+        sink=sink
+    )
+
+    def report(event):
+        if event.kind != FINISHED:
+            callback(event.message)
+
+    return job.run(report if callback else None)
+
+
+def get_output_folder(folder_path: str, output_prefix: str = "qb-") -> str:
+    """
+    Get the default output folder of a conversion.
+
+    Args:
+        folder_path (str): Path to the input folder.
+        output_prefix (str, optional): Prefix for the output folder. Defaults to "qb-".
 
     Returns:
-        Dict[str, int]: Statistics about the conversion process
+        str: The output folder, a sibling of the input folder named with the prefix.
     """
-    stats = {
-        "total_files": 0,
-        "converted_files": 0,
-        "skipped_files": 0,
-        "error_files": 0
-    }
-    
-    # Create output folder path with prefix
+    folder_path = os.path.abspath(folder_path)
     parent_dir = os.path.dirname(folder_path)
     folder_name = os.path.basename(folder_path)
-    output_folder = os.path.join(parent_dir, f"{output_prefix}{folder_name}")
-    
-    # Create output folder
-    os.makedirs(output_folder, exist_ok=True)
-    
-    for root, dirs, files in os.walk(folder_path):
-        # Calculate relative path from input folder
-        rel_path = os.path.relpath(root, folder_path)
-        
-        # Create corresponding output directory
-        if rel_path != ".":
-            output_dir = os.path.join(output_folder, rel_path)
-            os.makedirs(output_dir, exist_ok=True)
-        else:
-            output_dir = output_folder
-        
-        for file in files:
-            if file.endswith(".lua"):
-                input_path = os.path.join(root, file)
-                output_path = os.path.join(output_dir, file)
-                stats["total_files"] += 1
-                
-                try:
-                    was_converted = process_file(input_path, output_path, patterns, direction, include_sql, sql_patterns)
-                    if was_converted:
-                        stats["converted_files"] += 1
-                        if callback:
-                            callback(f"Converted: {output_path}")
-                    else:
-                        stats["skipped_files"] += 1
-                        if callback:
-                            callback(f"No changes needed: {output_path}")
-                except Exception as e:
-                    stats["error_files"] += 1
-                    if callback:
-                        callback(f"Error processing {input_path}: {str(e)}")
-    
-    # Copy non-lua files as well
-    copy_non_lua_files(folder_path, output_folder, callback)
-    
-    return stats
-
-
-def copy_non_lua_files(src_folder: str, dst_folder: str, callback: Optional[Callable[[str], None]] = None):
+    return os.path.join(parent_dir, f"{output_prefix}{folder_name}")
+
+
+def _manifest_key(base_folder: str, path: str) -> str:
+    """Return the portable relative path used as a manifest key."""
+    return os.path.relpath(path, base_folder).replace(os.sep, "/")
+
+
+def _remove_output(output_folder: str, rel_path: str) -> bool:
+    """
+    Delete an output file whose source is gone, along with directories it leaves empty.
+
+    Args:
+        output_folder (str): The output folder of the conversion.
+        rel_path (str): Path of the output relative to the output folder.
+
+    Returns:
+        bool: True if the file was deleted, False if it did not exist.
+
+    Raises:
+        OSError: If the file could not be deleted.
+    """
+    output_path = os.path.join(output_folder, *rel_path.split("/"))
+    try:
+        os.remove(output_path)
+    except FileNotFoundError:
+        return False
+
+    directory = os.path.dirname(output_path)
+    while os.path.normpath(directory) != os.path.normpath(output_folder):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+    return True
+
+
+def _mirror_assets(
+    assets: List[Tuple[str, str]],
+    callback: Optional[Callable[[str], None]] = None,
+    mirror_mode: str = "auto"
+) -> List[str]:
+    """
+    Mirror ``(input_path, output_path)`` pairs of non-Lua files.
+
+    Returns:
+        List[str]: Paths of the files present in the destination afterwards.
+    """
+    mirrored: List[str] = []
+    for input_path, output_path in assets:
+        try:
+            if mirror_file(input_path, output_path, mirror_mode):
+                if callback:
+                    callback(f"Copied: {output_path}")
+            elif callback:
+                callback(f"Up to date: {output_path}")
+            mirrored.append(output_path)
+        except Exception as e:
+            if callback:
+                callback(f"Error copying {input_path}: {str(e)}")
+    return mirrored
+
+
+def copy_non_lua_files(
+    src_folder: str,
+    dst_folder: str,
+    callback: Optional[Callable[[str], None]] = None,
+    mirror_mode: str = "auto"
+) -> List[str]:
     """
     Copy all non-Lua files from source to destination folder.
 
@@ -197,25 +772,22 @@ def copy_non_lua_files(src_folder: str, dst_folder: str, callback: Optional[Call
         src_folder (str): Source folder path.
         dst_folder (str): Destination folder path.
         callback (Optional[Callable[[str], None]], optional): Callback function for progress updates.
+        mirror_mode (str, optional): How files are mirrored, one of ``MIRROR_MODES``.
+            Files already up to date at the destination are skipped. Defaults to "auto".
+
+    Returns:
+        List[str]: Paths of the files mirrored to the destination folder.
     """
-    for root, dirs, files in os.walk(src_folder):
-        rel_path = os.path.relpath(root, src_folder)
-        
-        if rel_path != ".":
-            output_dir = os.path.join(dst_folder, rel_path)
-        else:
-            output_dir = dst_folder
-        
-        for file in files:
-            if not file.endswith(".lua"):
-                input_path = os.path.join(root, file)
-                output_path = os.path.join(output_dir, file)
-                
-                try:
-                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                    shutil.copy2(input_path, output_path)
-                    if callback:
-                        callback(f"Copied: {output_path}")
-                except Exception as e:
-                    if callback:
-                        callback(f"Error copying {input_path}: {str(e)}")
+    assets: List[Tuple[str, str]] = []
+    created_dirs = set()
+    with span("copy_non_lua_files", folder=src_folder) as args:
+        for rel_dir, entry in scan_tree(src_folder):
+            if entry.name.endswith(".lua"):
+                continue
+            output_dir = os.path.join(dst_folder, rel_dir) if rel_dir else dst_folder
+            if output_dir not in created_dirs:
+                os.makedirs(output_dir, exist_ok=True)
+                created_dirs.add(output_dir)
+            assets.append((entry.path, os.path.join(output_dir, entry.name)))
+        args["files"] = len(assets)
+        return _mirror_assets(assets, callback, mirror_mode)
@@ -0,0 +1,523 @@
+"""
+Single-pass rewrite engine for ESX to QB-Core and QB-Core to ESX conversions.
+
+All replacement rules of a pattern set are compiled once into a single regular
+expression that scans the script from left to right. At every position the
+longest matching rule wins, so ``QBCore.Functions.GetPlayerByCitizenId`` is never
+clobbered by the shorter ``QBCore.Functions.GetPlayer`` rule, and replaced text is
+never matched again by a later rule.
+
+Rules whose pattern starts with ``REGEX_PREFIX`` are regular expressions, e.g.
+``("regex:(?P<player>\\w+)\\.getMoney\\(\\)", "\\g<player>.PlayerData.money.cash")``.
+They are alternatives of the same combined expression, tried at every position
+before the literal rules, and their replacements are ``re`` templates. Prefer
+expressions starting with a literal, they are rejected fastest.
+
+Rule sets written in ASCII, like the bundled ones, also rewrite raw file content with
+``sub_bytes``: ASCII bytes mean the same characters in UTF-8, Latin-1 and the Windows
+code pages, so files keep their encoding and line endings byte for byte and are never
+decoded. In that mode the ``\\w``, ``\\d`` and ``\\s`` classes of regex rules match ASCII only.
+"""
+import mmap
+import re
+from functools import lru_cache
+from typing import AnyStr, Dict, Iterable, Iterator, List, Optional, Pattern, Sequence, Tuple, Union
+
+# Identifier-like runs inside a rule, candidates for prefilter anchors
+_ANCHOR_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+# Marks a rule whose pattern is a regular expression
+REGEX_PREFIX = "regex:"
+# Backreferences and conditionals would refer to the wrong groups in the combined expression
+_UNSUPPORTED_REGEX = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+_GLOBAL_FLAGS = re.compile(r"\(\?([imsx]+)\)")
+_REPEATS = ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+_ZERO_WIDTH = ("AT", "ASSERT", "ASSERT_NOT")
+_CATEGORIES = {
+    "CATEGORY_WORD": r"\w", "CATEGORY_NOT_WORD": r"\W",
+    "CATEGORY_DIGIT": r"\d", "CATEGORY_NOT_DIGIT": r"\D",
+    "CATEGORY_SPACE": r"\s", "CATEGORY_NOT_SPACE": r"\S",
+}
+
+
+class _TrieNode:
+    """A node of the prefix tree used to build the combined expression."""
+
+    __slots__ = ("children", "terminal")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.terminal = False
+
+
+def _trie_regex(keys: Iterable[str]) -> str:
+    """
+    Build a regular expression source matching any of the given literals.
+
+    Shared prefixes are factored out so the regex engine does not have to retry
+    every alternative at every position. Longer continuations are always tried
+    before a shorter terminal, which gives longest-match-wins semantics.
+
+    Args:
+        keys (Iterable[str]): The literal strings to match.
+
+    Returns:
+        str: The regular expression source.
+    """
+    root = _TrieNode()
+    for key in keys:
+        node = root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+        node.terminal = True
+
+    def build(node: _TrieNode) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.children.items())]
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            body = branches[0]
+            if not node.terminal:
+                return body
+            return f"(?:{body})?" if len(body) > 1 else f"{body}?"
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if node.terminal else body
+
+    return build(root)
+
+
+def derive_anchors(keys: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Derive a small set of anchor substrings covering every rule.
+
+    Every key contains at least one anchor, so text without any anchor cannot
+    match a rule. Anchors are picked greedily among the identifiers found in the
+    keys, preferring the ones shared by the most rules, then the longest.
+
+    Args:
+        keys (Iterable[str]): The literal strings matched by the rules.
+
+    Returns:
+        Tuple[str, ...]: The anchors, in the order they were picked.
+    """
+    tokens = {key: set(_ANCHOR_TOKEN.findall(key)) or {key} for key in keys}
+    uncovered = set(tokens)
+    anchors: List[str] = []
+    while uncovered:
+        counts: Dict[str, int] = {}
+        for key in uncovered:
+            for token in tokens[key]:
+                counts[token] = counts.get(token, 0) + 1
+        best = max(sorted(counts), key=lambda token: (counts[token], len(token)))
+        anchors.append(best)
+        uncovered = {key for key in uncovered if best not in key}
+    return tuple(anchors)
+
+
+def regex_rule(pattern: str, template: str) -> Tuple[str, str]:
+    """
+    Build a regular expression rule.
+
+    Args:
+        pattern (str): The regular expression, with named or numbered groups.
+        template (str): The replacement, with ``\\g<name>`` or ``\\1`` references to the groups.
+
+    Returns:
+        Tuple[str, str]: The rule, usable wherever ``(old, new)`` pairs are.
+    """
+    return REGEX_PREFIX + pattern, template
+
+
+def is_regex_rule(old: str) -> bool:
+    """Check whether a rule's pattern is a regular expression."""
+    return old.startswith(REGEX_PREFIX)
+
+
+def check_regex(pattern: str) -> Pattern[str]:
+    """
+    Compile the regular expression of a rule and check it can be combined with other rules.
+
+    Args:
+        pattern (str): The regular expression, without ``REGEX_PREFIX``.
+
+    Returns:
+        Pattern[str]: The compiled expression.
+
+    Raises:
+        ValueError: If the expression is invalid, matches the empty string or uses
+            backreferences or conditionals.
+    """
+    if _UNSUPPORTED_REGEX.search(pattern):
+        raise ValueError(f"Backreferences are not supported in regex rules: {pattern!r}")
+    try:
+        compiled = re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regex rule {pattern!r}: {e}") from e
+    if compiled.match("") is not None:
+        raise ValueError(f"Regex rule matches the empty string: {pattern!r}")
+    return compiled
+
+
+def _combinable(pattern: str) -> str:
+    """Rewrite a rule's expression to be an alternative of the combined expression."""
+    flags = _GLOBAL_FLAGS.match(pattern)
+    if flags:
+        # Leading global flags only apply to this rule
+        pattern = f"(?{flags.group(1)}:{pattern[flags.end():]})"
+    # Group names may repeat across rules; the groups are read from the rule's own expression
+    return re.sub(r"(?<!\\)\(\?P<\w+>", "(", pattern)
+
+
+def _parse_regex(pattern: str):
+    """Parse a regular expression into the syntax tree of the ``re`` module."""
+    try:
+        from re import _parser as sre_parse
+    except ImportError:  # Python < 3.11
+        import sre_parse
+
+    return sre_parse.parse(pattern)
+
+
+def regex_first_chars(pattern: str) -> Optional[str]:
+    """
+    Find the characters a match of a regular expression can start with.
+
+    Args:
+        pattern (str): The regular expression.
+
+    Returns:
+        Optional[str]: The body of a character class, e.g. ``"T\\w"``, or None if it cannot
+        be told, e.g. for expressions starting with an optional part or ignoring case.
+    """
+    parsed = _parse_regex(pattern)
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+
+    def first(items) -> Optional[str]:
+        for op, value in items:
+            name = str(op)
+            if name in _ZERO_WIDTH:
+                continue
+            if name == "LITERAL":
+                return re.escape(chr(value))
+            if name == "IN":
+                parts = []
+                for item_op, item in value:
+                    item_name = str(item_op)
+                    if item_name == "LITERAL":
+                        parts.append(re.escape(chr(item)))
+                    elif item_name == "RANGE":
+                        parts.append(f"{re.escape(chr(item[0]))}-{re.escape(chr(item[1]))}")
+                    elif item_name == "CATEGORY" and str(item) in _CATEGORIES:
+                        parts.append(_CATEGORIES[str(item)])
+                    else:
+                        return None
+                return "".join(parts)
+            if name == "SUBPATTERN":
+                return None if value[1] & re.IGNORECASE else first(value[-1])
+            if name == "BRANCH":
+                branches = [first(branch) for branch in value[1]]
+                return None if None in branches else "".join(branches)
+            if name in _REPEATS and value[0] >= 1:
+                return first(value[2])
+            return None
+        return None
+
+    return first(parsed)
+
+
+def regex_anchor(pattern: str) -> Optional[str]:
+    """
+    Find the longest literal that every match of a regular expression contains.
+
+    Args:
+        pattern (str): The regular expression.
+
+    Returns:
+        Optional[str]: A literal of at least three characters, or None if the expression
+        has none, or ignores case.
+    """
+    parsed = _parse_regex(pattern)
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    def walk(items):
+        for op, value in items:
+            name = str(op)
+            if name == "LITERAL":
+                current.append(chr(value))
+            elif name == "SUBPATTERN" and not value[1] & re.IGNORECASE:
+                walk(value[-1])
+            elif name in _REPEATS and value[0] >= 1:
+                flush()
+                walk(value[2])
+                flush()
+            else:
+                flush()
+
+    walk(parsed)
+    flush()
+    anchor = max(runs, key=len, default="")
+    return anchor if len(anchor) >= 3 else None
+
+
+class Rewriter:
+    """A compiled, single-pass multi-pattern rewriter."""
+
+    def __init__(self, rules: Sequence[Tuple[str, str]]):
+        """
+        Compile the rewriter.
+
+        Args:
+            rules (Sequence[Tuple[str, str]]): Ordered ``(old, new)`` pairs. When the same
+                ``old`` string appears more than once, the first occurrence wins.
+        """
+        table: Dict[str, str] = {}
+        for old, new in rules:
+            if old and old not in table:
+                table[old] = new
+        literals = [old for old in table if not is_regex_rule(old)]
+        expressions = [old[len(REGEX_PREFIX):] for old in table if is_regex_rule(old)]
+
+        branches = []
+        regex_anchors: List[Optional[str]] = []
+        first_chars: List[Optional[str]] = []
+        for index, pattern in enumerate(expressions):
+            check_regex(pattern)
+            branches.append(f"(?P<_r{index}>{_combinable(pattern)})")
+            regex_anchors.append(regex_anchor(pattern))
+            first_chars.append(regex_first_chars(pattern))
+        if literals:
+            branches.append(_trie_regex(literals))
+        if expressions and None not in first_chars:
+            # Lets the scan skip positions no rule can start at, which regex
+            # alternatives otherwise prevent
+            first_chars.extend(re.escape(char) for char in sorted({old[0] for old in literals}))
+            branches = [f"(?=[{''.join(first_chars)}])(?:{'|'.join(branches)})"]
+        anchors: Tuple[str, ...] = ()
+        # Without an anchor for every regex rule there is no prefilter
+        if None not in regex_anchors:
+            anchors = derive_anchors(literals)
+            for anchor in regex_anchors:
+                if not any(other in anchor for other in anchors):
+                    anchors += (anchor,)
+        self._set_state(table, "|".join(branches) if branches else r"(?!)", anchors)
+
+    def _set_state(self, table: Dict[str, str], source: str, anchors: Sequence[str]):
+        self.table = table
+        self.source = source
+        self.anchors = tuple(anchors)
+        self._anchor_bytes = tuple(anchor.encode("utf-8") for anchor in self.anchors)
+        self._regex: Optional[Pattern[str]] = None
+        self._bytes_regex: Optional[Pattern[bytes]] = None
+        self._bytes_checked = False
+        self._regex_rules = [old for old in table if is_regex_rule(old)]
+        self._rule_regexes: Dict[Tuple[str, bool], Pattern] = {}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, object]) -> "Rewriter":
+        """
+        Rebuild a rewriter from the output of ``get_state`` without recompiling the rules.
+
+        Args:
+            state (Dict[str, object]): The serialized state.
+
+        Returns:
+            Rewriter: The rewriter.
+        """
+        rewriter = cls.__new__(cls)
+        rewriter._set_state(dict(state["table"]), state["source"], state["anchors"])
+        return rewriter
+
+    def get_state(self) -> Dict[str, object]:
+        """
+        Get a JSON-serializable state of the compiled rewriter.
+
+        Returns:
+            Dict[str, object]: The rule table, regular expression source and anchors.
+        """
+        return {"table": list(self.table.items()), "source": self.source, "anchors": list(self.anchors)}
+
+    @property
+    def regex(self) -> Pattern[str]:
+        """The combined expression, compiled on first use."""
+        if self._regex is None:
+            self._regex = re.compile(self.source)
+        return self._regex
+
+    @property
+    def bytes_regex(self) -> Optional[Pattern[bytes]]:
+        """The combined expression for raw content, or None if the rules are not all ASCII."""
+        if not self._bytes_checked:
+            self._bytes_checked = True
+            if all(old.isascii() and new.isascii() for old, new in self.table.items()):
+                try:
+                    self._bytes_regex = re.compile(self.source.encode("ascii"))
+                except re.error:
+                    # Flags such as (?u) only exist for str expressions
+                    self._bytes_regex = None
+        return self._bytes_regex
+
+    def _replace(self, match: "re.Match[AnyStr]") -> AnyStr:
+        return self.replacement(match)[1]
+
+    def replacement(self, match: "re.Match[AnyStr]") -> Tuple[str, AnyStr]:
+        """
+        Get the rule and replacement of a match of ``regex`` or ``bytes_regex``.
+
+        Args:
+            match (re.Match[AnyStr]): A match of the combined expression.
+
+        Returns:
+            Tuple[str, AnyStr]: The pattern of the matching rule, and the replacement text,
+            as bytes for a match of ``bytes_regex``.
+        """
+        binary = not isinstance(match.string, str)
+        group = match.lastgroup
+        if group is None or not group.startswith("_r"):
+            old = match.group(0).decode("ascii") if binary else match.group(0)
+            new = self.table[old]
+            return old, new.encode("ascii") if binary else new
+        old = self._regex_rules[int(group[2:])]
+        template = self.table[old]
+        rule_regex = self._rule_regexes.get((old, binary))
+        if rule_regex is None:
+            pattern = old[len(REGEX_PREFIX):]
+            rule_regex = self._rule_regexes[old, binary] = re.compile(pattern.encode("ascii") if binary else pattern)
+        # The rule's own expression matches the same text, with its own groups
+        return old, rule_regex.match(match.string, match.start()).expand(
+            template.encode("ascii") if binary else template
+        )
+
+    def may_match(self, data: Union[bytes, mmap.mmap]) -> bool:
+        """
+        Check raw file content for any anchor without decoding it.
+
+        Args:
+            data (Union[bytes, mmap.mmap]): The raw, UTF-8 encoded content, or an mmap of it.
+
+        Returns:
+            bool: False if no rule can match the content, True otherwise. Rewriters with
+            regex rules lacking a literal have no anchors and accept all content.
+        """
+        if not self._anchor_bytes:
+            return bool(self.table)
+        return any(data.find(anchor) != -1 for anchor in self._anchor_bytes)
+
+    def iter_edits(self, script: str) -> Iterator[Tuple[int, str, str]]:
+        """
+        Iterate over the replacements the rewriter would make in a script.
+
+        Args:
+            script (str): The original script content.
+
+        Yields:
+            Tuple[int, str, str]: The offset, the matched text and its replacement.
+        """
+        if not self.table:
+            return
+        for match in self.regex.finditer(script):
+            yield match.start(), match.group(0), self.replacement(match)[1]
+
+    def sub(self, script: str, hits: Optional[Dict[str, int]] = None) -> str:
+        """
+        Rewrite the script in a single left-to-right scan.
+
+        Args:
+            script (str): The original script content.
+            hits (Optional[Dict[str, int]], optional): When given, the number of matches of
+                every pattern is added to it. Defaults to None.
+
+        Returns:
+            str: The rewritten script content.
+        """
+        if not self.table:
+            return script
+        if hits is None:
+            return self.regex.sub(self._replace, script)
+
+        replacement = self.replacement
+
+        def replace_counting(match: "re.Match[str]") -> str:
+            old, new = replacement(match)
+            hits[old] = hits.get(old, 0) + 1
+            return new
+
+        return self.regex.sub(replace_counting, script)
+
+    def sub_bytes(self, data: Union[bytes, mmap.mmap], hits: Optional[Dict[str, int]] = None) -> bytes:
+        """
+        Rewrite raw file content in a single scan, without decoding it.
+
+        Args:
+            data (Union[bytes, mmap.mmap]): The raw content in any ASCII-compatible encoding,
+                or an mmap of it.
+            hits (Optional[Dict[str, int]], optional): When given, the number of matches of
+                every pattern is added to it. Defaults to None.
+
+        Returns:
+            bytes: The rewritten content; bytes outside of matches are kept as they are.
+
+        Raises:
+            ValueError: If the rules are not all ASCII, see ``bytes_regex``.
+        """
+        regex = self.bytes_regex
+        if regex is None:
+            raise ValueError("Only rule sets written in ASCII can rewrite raw content")
+        if hits is None:
+            return regex.sub(self._replace, data)
+
+        replacement = self.replacement
+
+        def replace_counting(match: "re.Match[bytes]") -> bytes:
+            old, new = replacement(match)
+            hits[old] = hits.get(old, 0) + 1
+            return new
+
+        return regex.sub(replace_counting, data)
+
+
+@lru_cache(maxsize=32)
+def _compile_cached(rules: Tuple[Tuple[str, str], ...]) -> Rewriter:
+    # Imported here to avoid a circular import, the cache module builds Rewriters
+    from modules.cache import load_or_compile
+
+    return load_or_compile(rules)
+
+
+def compile_rules(rules: Sequence[Tuple[str, str]]) -> Rewriter:
+    """
+    Compile an ordered rule list into a Rewriter, reusing earlier compilations.
+
+    Compilations are reused from memory first, then from the on-disk cache.
+
+    Args:
+        rules (Sequence[Tuple[str, str]]): Ordered ``(old, new)`` pairs.
+
+    Returns:
+        Rewriter: The compiled rewriter.
+    """
+    return _compile_cached(tuple((old, new) for old, new in rules))
+
+
+def chain_rules(*rule_lists: Sequence[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Concatenate several rule lists, keeping their relative priority.
+
+    Args:
+        *rule_lists (Sequence[Tuple[str, str]]): Rule lists, highest priority first.
+
+    Returns:
+        List[Tuple[str, str]]: The combined rule list.
+    """
+    combined: List[Tuple[str, str]] = []
+    for rules in rule_lists:
+        combined.extend(rules)
+    return combined
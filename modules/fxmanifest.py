@@ -0,0 +1,259 @@
+"""
+Resource manifest parsing.
+
+Reads the script entries of ``fxmanifest.lua`` and ``__resource.lua`` files
+(``client_scripts``, ``server_scripts``, ``shared_scripts`` and ``files``, in
+their singular and plural forms) to find the Lua files a resource actually
+loads. Entries may be globs (``client/*.lua``, ``modules/**/server.lua``) or
+``@resource/path`` references to another resource, which are resolved against
+the resources bundled in the same tree. Parses are cached by file size and
+modification time.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+RESOURCE_MANIFESTS = ("fxmanifest.lua", "__resource.lua")
+
+# Manifest directives listing files that are loaded as Lua code, by kind
+SCRIPT_DIRECTIVES: Dict[str, str] = {
+    "client_script": "client",
+    "client_scripts": "client",
+    "server_script": "server",
+    "server_scripts": "server",
+    "shared_script": "shared",
+    "shared_scripts": "shared",
+    # Lua files shipped with "files" are loaded with require/LoadResourceFile
+    "file": "files",
+    "files": "files",
+}
+
+# Strings are matched first so comment markers inside them are kept
+_COMMENT = re.compile(
+    r"""("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')"""
+    r"""|--\[(=*)\[.*?\]\2\]"""
+    r"""|--[^\n]*""",
+    re.DOTALL
+)
+_DIRECTIVE = re.compile(
+    r"""\b([A-Za-z_][A-Za-z0-9_]*)\s*\(?\s*(\{[^{}]*\}|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|\[(=*)\[.*?\]\3\])""",
+    re.DOTALL
+)
+_STRING = re.compile(r""""((?:\\.|[^"\\])*)"|'((?:\\.|[^'\\])*)'|\[(=*)\[(.*?)\]\3\]""", re.DOTALL)
+
+
+def _strip_comments(text: str) -> str:
+    return _COMMENT.sub(lambda match: match.group(1) or " ", text)
+
+
+def _strings(value: str) -> List[str]:
+    return [match.group(1) or match.group(2) or match.group(4) or "" for match in _STRING.finditer(value)]
+
+
+def parse_manifest_text(text: str) -> Dict[str, List[str]]:
+    """
+    Extract the script entries of a resource manifest.
+
+    Args:
+        text (str): The content of the manifest.
+
+    Returns:
+        Dict[str, List[str]]: The entries by kind ("client", "server", "shared" and "files"),
+        in manifest order.
+    """
+    entries: Dict[str, List[str]] = {}
+    for match in _DIRECTIVE.finditer(_strip_comments(text)):
+        kind = SCRIPT_DIRECTIVES.get(match.group(1))
+        if kind is not None:
+            entries.setdefault(kind, []).extend(entry for entry in _strings(match.group(2)) if entry)
+    return entries
+
+
+@lru_cache(maxsize=256)
+def _parse_cached(path: str, size: int, mtime_ns: int) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        entries = parse_manifest_text(file.read())
+    return tuple((kind, tuple(values)) for kind, values in entries.items())
+
+
+def parse_manifest(path: str) -> Dict[str, List[str]]:
+    """
+    Parse a resource manifest, reusing the previous parse if the file did not change.
+
+    Args:
+        path (str): Path to the manifest.
+
+    Returns:
+        Dict[str, List[str]]: The entries by kind, see ``parse_manifest_text``.
+    """
+    stat = os.stat(path)
+    return {kind: list(values) for kind, values in _parse_cached(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)}
+
+
+def find_manifest(folder: str) -> Optional[str]:
+    """Return the path of the manifest of a resource folder, or None if it has none."""
+    for name in RESOURCE_MANIFESTS:
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=1024)
+def glob_regex(pattern: str) -> Pattern[str]:
+    """
+    Compile a manifest glob: ``*`` and ``?`` stay within a folder, ``**`` spans folders.
+
+    Matching ignores case, like the file system of most servers' hosts.
+
+    Args:
+        pattern (str): The glob, relative to the resource folder, with ``/`` separators.
+
+    Returns:
+        Pattern[str]: The compiled expression, matching whole relative paths.
+    """
+    parts: List[str] = []
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            parts.append("(?:[^/]*/)*")
+            index += 3
+        elif pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+        elif pattern[index] == "*":
+            parts.append("[^/]*")
+            index += 1
+        elif pattern[index] == "?":
+            parts.append("[^/]")
+            index += 1
+        else:
+            parts.append(re.escape(pattern[index]))
+            index += 1
+    return re.compile("".join(parts) + r"\Z", re.IGNORECASE)
+
+
+def _normalize(entry: str) -> str:
+    entry = entry.replace("\\", "/")
+    while entry.startswith("./"):
+        entry = entry[2:]
+    return entry
+
+
+def find_resources(root: str) -> List[str]:
+    """
+    Find the resources below a folder.
+
+    A resource is a folder holding a resource manifest. Resources are not searched for
+    nested resources, the server does not load those either.
+
+    Args:
+        root (str): The folder to search, e.g. a server's ``resources/`` folder.
+
+    Returns:
+        List[str]: Paths of the resource folders relative to ``root``, sorted; ``"."`` if
+        ``root`` itself is a resource.
+    """
+    resources: List[str] = []
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        directory = os.path.join(root, rel_dir) if rel_dir else root
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        names = {entry.name for entry in entries if entry.is_file()}
+        if any(manifest in names for manifest in RESOURCE_MANIFESTS):
+            resources.append(rel_dir or ".")
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                stack.append(os.path.join(rel_dir, entry.name) if rel_dir else entry.name)
+    return sorted(resources)
+
+
+def loaded_scripts(resources: Dict[str, str], lua_files: Iterable[str]) -> Set[str]:
+    """
+    Find the Lua files loaded by the manifests of a set of resources.
+
+    Args:
+        resources (Dict[str, str]): The manifest path of every top-level resource, by the
+            resource's relative folder (``""`` for the root folder, ``/`` separators).
+        lua_files (Iterable[str]): Relative paths of all Lua files, with ``/`` separators.
+
+    Returns:
+        Set[str]: The relative paths of the loaded Lua files. ``@name/file.lua`` references
+        resolve to a resource, or a folder holding a manifest, named ``name`` in the same tree.
+    """
+    lua_files = list(lua_files)
+    by_path: Dict[str, List[str]] = {}
+    by_name: Dict[str, List[str]] = {}
+    for rel_path in lua_files:
+        by_path.setdefault(rel_path.lower(), []).append(rel_path)
+        rel_dir, _, name = rel_path.rpartition("/")
+        if name in RESOURCE_MANIFESTS:
+            by_name.setdefault(rel_dir.rpartition("/")[2].lower(), []).append(rel_dir)
+    for rel_dir in resources:
+        if rel_dir.rpartition("/")[2].lower() not in by_name:
+            by_name[rel_dir.rpartition("/")[2].lower()] = [rel_dir]
+
+    # Lua files below each folder, for glob entries
+    below: Dict[str, List[str]] = {}
+
+    def files_below(base: str) -> List[str]:
+        if base not in below:
+            prefix = base.lower() + "/" if base else ""
+            below[base] = [rel_path for rel_path in lua_files if rel_path.lower().startswith(prefix)]
+        return below[base]
+
+    loaded: Set[str] = set()
+    for rel_dir, manifest_path in resources.items():
+        for values in parse_manifest(manifest_path).values():
+            for entry in values:
+                entry = _normalize(entry)
+                if entry.startswith("@"):
+                    name, _, entry = entry[1:].partition("/")
+                    bases = by_name.get(name.lower(), [])
+                else:
+                    bases = [rel_dir]
+                for base in bases:
+                    path = f"{base}/{entry}" if base else entry
+                    if "*" not in path and "?" not in path:
+                        loaded.update(by_path.get(path.lower(), []))
+                        continue
+                    regex = glob_regex(path)
+                    loaded.update(rel_path for rel_path in files_below(base) if regex.match(rel_path))
+    return loaded
+
+
+def unloaded_scripts(root: str, lua_files: Iterable[str]) -> Set[str]:
+    """
+    Find the Lua files of the resources below a folder that their manifests do not load.
+
+    Files outside of every resource are not included, nothing is known about how they are used.
+
+    Args:
+        root (str): The folder holding the files, a resource or a folder of resources.
+        lua_files (Iterable[str]): Paths of all Lua files relative to ``root``, with ``/`` separators.
+
+    Returns:
+        Set[str]: The relative paths of the Lua files no manifest loads, manifests included.
+    """
+    lua_files = list(lua_files)
+    resources: Dict[str, str] = {}
+    for rel_dir in find_resources(root):
+        manifest_path = find_manifest(os.path.join(root, rel_dir))
+        if manifest_path is not None:
+            resources["" if rel_dir == "." else rel_dir.replace(os.sep, "/")] = manifest_path
+    if not resources:
+        return set()
+
+    loaded = loaded_scripts(resources, lua_files)
+    prefixes = tuple(rel_dir + "/" for rel_dir in resources)
+    return {
+        rel_path for rel_path in lua_files
+        if rel_path not in loaded and ("" in resources or rel_path.startswith(prefixes))
+    }
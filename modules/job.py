@@ -0,0 +1,470 @@
+"""
+Conversion jobs with typed progress events.
+
+A ``ConversionJob`` converts a folder like ``process_folder`` but reports its
+progress as ``ProgressEvent`` tuples instead of strings. The folder is scanned
+first, so the number of files and bytes to convert is known before the first
+event, and every event carries the elapsed time and an ETA. A job can be paused,
+resumed and cancelled from another thread; it stops between two files.
+"""
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from modules.converter import (
+    _TaskResult, _convert_dump_into, _iter_conversions, _manifest_key, _remove_output, get_output_folder,
+    get_rewriter, is_script
+)
+from modules.fxmanifest import unloaded_scripts
+from modules.manifest import ConversionManifest, settings_fingerprint
+from modules.metrics import ConversionMetrics, new_file_record
+from modules.mirror import mirror_file, scan_tree
+from modules.tracing import span
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from modules.sinks import OutputSink
+
+# Event kinds
+FILE = "file"
+ASSET = "asset"
+REMOVED = "removed"
+FINISHED = "finished"
+
+
+class ProgressEvent(NamedTuple):
+    """
+    One step of a conversion job.
+
+    Attributes:
+        kind: ``FILE`` for a Lua file or, with SQL, an SQL dump, ``ASSET`` for another file, ``REMOVED`` for a stale
+            output and ``FINISHED`` once at the end.
+        status: For files "converted", "skipped", "prefiltered", "unloaded", "unchanged" or "error"; for
+            assets "copied", "up_to_date" or "error"; for removals "removed" or "error"; when
+            finished "completed" or "cancelled".
+        path: The input file, or the output file for removals.
+        output_path: The output file.
+        bytes: Size of the input file.
+        done: Lua files handled so far.
+        total: Lua files found by the scan.
+        elapsed: Seconds spent converting, pauses excluded.
+        eta: Estimated seconds until all Lua files are handled, None until it can be estimated.
+        error: The error message if the status is "error".
+    """
+
+    kind: str
+    status: str
+    path: str
+    output_path: str
+    bytes: int
+    done: int
+    total: int
+    elapsed: float
+    eta: Optional[float]
+    error: Optional[str] = None
+
+    @property
+    def message(self) -> str:
+        """The progress message ``process_folder`` passes to its callback for this event."""
+        if self.kind == FILE:
+            if self.status == "error":
+                return f"Error processing {self.path}: {self.error}"
+            if self.status == "converted":
+                return f"Converted: {self.output_path}"
+            if self.status == "unchanged":
+                return f"Unchanged since last run: {self.output_path}"
+            if self.status == "unloaded":
+                return f"Not loaded by the manifest: {self.output_path}"
+            return f"No changes needed: {self.output_path}"
+        if self.kind == ASSET:
+            if self.status == "error":
+                return f"Error copying {self.path}: {self.error}"
+            if self.status == "copied":
+                return f"Copied: {self.output_path}"
+            return f"Up to date: {self.output_path}"
+        if self.kind == REMOVED:
+            if self.status == "error":
+                return f"Error removing {self.output_path}: {self.error}"
+            return f"Removed: {self.output_path}"
+        return f"Conversion {self.status}"
+
+    @property
+    def level(self) -> str:
+        """The message type of the event for the output consoles: "success", "error" or "info"."""
+        if self.status == "error":
+            return "error"
+        if self.status in ("converted", "completed"):
+            return "success"
+        return "info"
+
+
+class ConversionJob:
+    """A folder conversion that can be observed, paused, resumed and cancelled."""
+
+    def __init__(
+        self,
+        folder_path: str,
+        patterns: List[Tuple[str, str]],
+        direction: str,
+        include_sql: bool,
+        sql_patterns: List[Tuple[str, str]],
+        output_prefix: str = "qb-",
+        workers: int = 1,
+        incremental: bool = False,
+        mirror_mode: str = "auto",
+        output_folder: Optional[str] = None,
+        metrics: Optional[ConversionMetrics] = None,
+        executor: Optional["ProcessPoolExecutor"] = None,
+        loaded_only: bool = False,
+        engine: str = "text",
+        sink: Optional["OutputSink"] = None
+    ):
+        """
+        Prepare the job. Nothing is read or written until ``scan`` or ``run`` is called.
+
+        The arguments are those of ``process_folder``, plus ``executor``: a pool from
+        ``create_pool`` with the same settings, shared with other jobs. ``workers`` then
+        sizes how many chunks the job keeps queued in it. With a ``sink``, the pool must be
+        created with ``capture``.
+
+        Raises:
+            ValueError: If ``sink`` is combined with ``incremental``.
+        """
+        if sink is not None and incremental:
+            raise ValueError("Incremental conversions need an output folder, not a sink")
+        self.folder_path = folder_path
+        self.patterns = patterns
+        self.direction = direction
+        self.include_sql = include_sql
+        self.sql_patterns = sql_patterns
+        self.workers = workers
+        self.incremental = incremental
+        self.mirror_mode = mirror_mode
+        self.output_folder = output_folder or get_output_folder(folder_path, output_prefix)
+        self.metrics = metrics
+        self.executor = executor
+        self.loaded_only = loaded_only
+        self.engine = engine
+        self.sink = sink
+
+        self.stats = {
+            "total_files": 0,
+            "converted_files": 0,
+            "skipped_files": 0,
+            "error_files": 0,
+            "unchanged_files": 0,
+            "prefiltered_files": 0,
+            "unloaded_files": 0
+        }
+        self.total_files = 0
+        self.total_bytes = 0
+        # Bytes of the Lua files that need converting, known after scan()
+        self.work_bytes = 0
+
+        # Filled by scan(): (input_path, output_path, relative path, up to date, size) per Lua file
+        self._entries: Optional[List[Tuple[str, str, str, bool, int]]] = None
+        # (input_path, output_path, size) for every other file
+        self._assets: List[Tuple[str, str, int]] = []
+        self._dirs: List[str] = []
+        # Relative paths of the Lua files that are mirrored instead of converted
+        self._unloaded: Set[str] = set()
+        self._manifest: Optional[ConversionManifest] = None
+
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancelled = threading.Event()
+        self._done = 0
+        self._done_bytes = 0
+        self._started = 0.0
+        self._paused_time = 0.0
+
+    def scan(self) -> int:
+        """
+        Walk the input folder and find the files to convert.
+
+        With ``incremental``, files unchanged since the last run are identified here;
+        only files touched since then are read, to compare their hashes. With
+        ``loaded_only``, the resource manifests are parsed here.
+
+        Returns:
+            int: The number of Lua files found.
+        """
+        with span("walk", folder=self.folder_path):
+            tree = list(scan_tree(self.folder_path))
+        self._unloaded = set()
+        scope = None
+        if self.loaded_only:
+            lua_files = [
+                _manifest_key(self.folder_path, entry.path) for _, entry in tree if entry.name.endswith(".lua")
+            ]
+            with span("parse_manifests"):
+                self._unloaded = unloaded_scripts(self.folder_path, lua_files)
+            scope = [rel_file for rel_file in lua_files if rel_file not in self._unloaded]
+        if self.incremental:
+            self._manifest = ConversionManifest(
+                self.output_folder,
+                settings_fingerprint(
+                    self.patterns, self.direction, self.include_sql, self.sql_patterns, scope, self.engine
+                )
+            )
+
+        entries: List[Tuple[str, str, str, bool, int]] = []
+        self._assets = []
+        self._dirs = []
+        seen_dirs = set()
+        with span("classify", incremental=self.incremental):
+            for rel_dir, entry in tree:
+                if rel_dir not in seen_dirs:
+                    self._dirs.append(rel_dir)
+                    seen_dirs.add(rel_dir)
+
+                input_path = entry.path
+                output_path = os.path.join(self.output_folder, rel_dir, entry.name)
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    # Broken links fail later, with an error event
+                    size = 0
+                if is_script(entry.name, self.include_sql):
+                    rel_file = _manifest_key(self.folder_path, input_path)
+                    up_to_date = self._manifest is not None and self._manifest.is_unchanged(
+                        rel_file, input_path, output_path
+                    )
+                    entries.append((input_path, output_path, rel_file, up_to_date, size))
+                else:
+                    self._assets.append((input_path, output_path, size))
+
+        self._entries = entries
+        self.total_files = len(entries)
+        self.total_bytes = sum(size for *_, size in entries)
+        self.work_bytes = sum(
+            size for _, _, rel_file, up_to_date, size in entries
+            if not up_to_date and rel_file not in self._unloaded
+        )
+        return self.total_files
+
+    def pause(self):
+        """Pause the job before its next file. Safe to call from any thread."""
+        self._resume.clear()
+
+    def resume(self):
+        """Resume a paused job. Safe to call from any thread."""
+        self._resume.set()
+
+    def cancel(self):
+        """Stop the job before its next file. Safe to call from any thread."""
+        self._cancelled.set()
+        self._resume.set()
+
+    @property
+    def paused(self) -> bool:
+        """Whether the job is paused."""
+        return not self._resume.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job was cancelled."""
+        return self._cancelled.is_set()
+
+    def _checkpoint(self) -> bool:
+        """Wait while paused; return False if the job was cancelled."""
+        if not self._resume.is_set():
+            paused_at = time.monotonic()
+            self._resume.wait()
+            self._paused_time += time.monotonic() - paused_at
+        return not self._cancelled.is_set()
+
+    def _event(
+        self, kind: str, status: str, path: str, output_path: str, size: int, error: Optional[str] = None
+    ) -> ProgressEvent:
+        elapsed = time.monotonic() - self._started - self._paused_time
+        eta = None
+        if self._done_bytes and self.work_bytes:
+            eta = max(0.0, elapsed / self._done_bytes * (self.work_bytes - self._done_bytes))
+        elif self._done >= self.total_files:
+            eta = 0.0
+        return ProgressEvent(kind, status, path, output_path, size, self._done, self.total_files, elapsed, eta, error)
+
+    def _mirror_unloaded(
+        self, input_path: str, output_path: str, rel_file: str, size: int, emit: Callable[[ProgressEvent], None]
+    ):
+        """Copy a Lua file no manifest loads to the output as is."""
+        try:
+            if self.sink is not None:
+                self.sink.copy(output_path, input_path)
+            else:
+                mirror_file(input_path, output_path, self.mirror_mode)
+        except Exception as e:
+            self.stats["error_files"] += 1
+            if self._manifest is not None:
+                self._manifest.forget(rel_file)
+            emit(self._event(FILE, "error", input_path, output_path, size, str(e)))
+            return
+        if self._manifest is not None:
+            self._manifest.record(rel_file, input_path, False)
+        self.stats["skipped_files"] += 1
+        self.stats["unloaded_files"] += 1
+        emit(self._event(FILE, "unloaded", input_path, output_path, size))
+
+    def _convert_into_sink(
+        self, input_path: str, output_path: str, results: Iterator[_TaskResult]
+    ) -> Tuple[str, Optional[str], Optional[Dict[str, object]]]:
+        """Convert the next file into the sink: a dump here, a script with the next result of the workers."""
+        if input_path.endswith(".sql"):
+            record = new_file_record() if self.metrics is not None else None
+            try:
+                return _convert_dump_into(input_path, output_path, self.direction, self.sink, record), None, record
+            except Exception as e:
+                return "error", str(e), record
+
+        status, error, record, converted = next(results)
+        if error is not None:
+            return status, error, record
+        start = time.perf_counter()
+        try:
+            with span("sink_write", path=input_path):
+                if converted is not None:
+                    self.sink.write(output_path, converted, input_path)
+                else:
+                    self.sink.copy(output_path, input_path)
+        except Exception as e:
+            return "error", str(e), record
+        if record is not None:
+            record["write"] = time.perf_counter() - start
+            record["bytes_out"] = record["bytes_in"] if converted is None else len(converted)
+        return status, None, record
+
+    def run(self, on_event: Optional[Callable[[ProgressEvent], None]] = None) -> Dict[str, int]:
+        """
+        Run the conversion, scanning the folder first if ``scan`` was not called.
+
+        A cancelled job keeps the files converted so far but leaves the manifest of an
+        incremental run untouched, and does not mirror the remaining files.
+
+        Args:
+            on_event (Optional[Callable[[ProgressEvent], None]], optional): Called with every
+                progress event, in the calling thread. Defaults to None.
+
+        Returns:
+            Dict[str, int]: Statistics with the keys of ``process_folder``.
+        """
+        if self._entries is None:
+            self.scan()
+        emit = on_event or (lambda event: None)
+        self._started = time.monotonic()
+
+        sink = self.sink
+        if sink is None:
+            os.makedirs(self.output_folder, exist_ok=True)
+            for rel_dir in self._dirs:
+                if rel_dir:
+                    os.makedirs(os.path.join(self.output_folder, rel_dir), exist_ok=True)
+
+        manifest = self._manifest
+        metrics = self.metrics
+        unloaded = self._unloaded
+        # Dumps are streamed into a sink by this thread, the workers can only return whole files
+        tasks = [
+            (input_path, output_path)
+            for input_path, output_path, rel_file, up_to_date, _ in self._entries
+            if not up_to_date and rel_file not in unloaded and not (sink is not None and input_path.endswith(".sql"))
+        ]
+        if metrics is not None:
+            metrics.set_rules(
+                get_rewriter(self.patterns, self.include_sql, self.sql_patterns, self.direction, self.engine).table
+            )
+        results = _iter_conversions(
+            tasks, self.patterns, self.direction, self.include_sql, self.sql_patterns,
+            self.workers, self.mirror_mode, metrics is not None, self.executor, self.engine, sink is not None
+        )
+        stats = self.stats
+        with span("convert_files", files=len(tasks)):
+            try:
+                for input_path, output_path, rel_file, up_to_date, size in self._entries:
+                    if not self._checkpoint():
+                        break
+                    stats["total_files"] += 1
+                    self._done += 1
+                    if up_to_date:
+                        stats["unchanged_files"] += 1
+                        emit(self._event(FILE, "unchanged", input_path, output_path, size))
+                        continue
+                    if rel_file in unloaded:
+                        self._mirror_unloaded(input_path, output_path, rel_file, size, emit)
+                        continue
+
+                    if sink is not None:
+                        status, error, record = self._convert_into_sink(input_path, output_path, results)
+                    else:
+                        status, error, record, _ = next(results)
+                    self._done_bytes += size
+                    if metrics is not None:
+                        metrics.add_file(input_path, status, record)
+                    if error is not None:
+                        stats["error_files"] += 1
+                        if manifest is not None:
+                            manifest.forget(rel_file)
+                        emit(self._event(FILE, "error", input_path, output_path, size, error))
+                        continue
+
+                    if manifest is not None:
+                        manifest.record(rel_file, input_path, status == "converted")
+                    if status == "prefiltered":
+                        stats["prefiltered_files"] += 1
+                    if status == "converted":
+                        stats["converted_files"] += 1
+                    else:
+                        stats["skipped_files"] += 1
+                    emit(self._event(FILE, status, input_path, output_path, size))
+            finally:
+                # Stops the pool without waiting for queued files on cancel or if a callback raised
+                results.close()
+
+        # Mirror non-lua files as well
+        with span("mirror_assets", files=len(self._assets)):
+            mirrored: List[str] = []
+            failed: List[str] = []
+            for input_path, output_path, size in self._assets:
+                if not self._checkpoint():
+                    break
+                try:
+                    if sink is not None:
+                        sink.copy(output_path, input_path)
+                        copied = True
+                    else:
+                        copied = mirror_file(input_path, output_path, self.mirror_mode)
+                except Exception as e:
+                    emit(self._event(ASSET, "error", input_path, output_path, size, str(e)))
+                    failed.append(output_path)
+                    continue
+                mirrored.append(output_path)
+                emit(self._event(ASSET, "copied" if copied else "up_to_date", input_path, output_path, size))
+
+        if self.cancelled:
+            emit(self._event(FINISHED, "cancelled", self.folder_path, self.output_folder, 0))
+            return stats
+
+        with span("manifest"):
+            if manifest is not None:
+                # An asset that failed to mirror keeps its previous output and entry
+                manifest.assets = [_manifest_key(self.output_folder, path) for path in mirrored] + [
+                    key for key in (_manifest_key(self.output_folder, path) for path in failed)
+                    if key in manifest.previous_assets
+                ]
+                sources = [rel_file for _, _, rel_file, _, _ in self._entries] + [
+                    _manifest_key(self.output_folder, output_path) for _, output_path, _ in self._assets
+                ]
+                for stale in manifest.stale_outputs(sources):
+                    output_path = os.path.join(self.output_folder, *stale.split("/"))
+                    try:
+                        if _remove_output(self.output_folder, stale):
+                            emit(self._event(REMOVED, "removed", output_path, output_path, 0))
+                    except OSError as e:
+                        emit(self._event(REMOVED, "error", output_path, output_path, 0, str(e)))
+                manifest.prune(sources)
+                manifest.save()
+
+        emit(self._event(FINISHED, "completed", self.folder_path, self.output_folder, 0))
+        return stats
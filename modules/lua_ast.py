@@ -0,0 +1,546 @@
+"""
+Lua 5.4 parser producing a syntax tree with source positions.
+
+The tree is deliberately small: every node has a ``kind``, the ``start`` and
+``end`` offsets of its source text, its child nodes in source order and a
+kind-specific ``value``. Source text is never reformatted; rewriters read the
+original text through the node spans and patch it, so everything they do not
+touch keeps its exact formatting.
+
+The CfxLua extensions found in FiveM resources are accepted as well: compound
+assignments (``+=``, ``-=``, ...), safe navigation (``a?.b``, ``a?[b]``), backtick
+hash strings and ``/* */`` comments.
+
+Trees are cached by a hash of the content, see ``parse_cached``.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# Token kinds besides keywords and operators, which are their own kind
+NAME = "name"
+NUMBER = "number"
+STRING = "string"
+EOF = "eof"
+
+KEYWORDS = frozenset((
+    "and", "break", "do", "else", "elseif", "end", "false", "for", "function", "goto", "if", "in",
+    "local", "nil", "not", "or", "repeat", "return", "then", "true", "until", "while",
+))
+
+_TOKEN = re.compile(
+    r"""\s*(?:(?P<comment>--\[(?P<comment_level>=*)\[.*?\](?P=comment_level)\]|--[^\n]*|/\*.*?\*/)"""
+    r"""|(?P<string>\[(?P<string_level>=*)\[.*?\](?P=string_level)\]"""
+    r"""|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`[^`\n]*`)"""
+    r"""|(?P<number>0[xX](?:[0-9a-fA-F]+\.?[0-9a-fA-F]*|\.[0-9a-fA-F]+)(?:[pP][+-]?[0-9]+)?"""
+    r"""|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)"""
+    r"""|(?P<name>[A-Za-z_][A-Za-z0-9_]*)"""
+    r"""|(?P<op>\.\.\.|\.\.=|<<=|>>=|//=|\?\.|\?\[|\.\.|==|~=|<=|>=|<<|>>|//|::|[-+*/%^&|]="""
+    r"""|[-+*/%^#&~|<>=(){}\[\];:,.])|\s+\Z)""",
+    re.DOTALL
+)
+
+_COMPOUND_ASSIGNMENTS = frozenset(("+=", "-=", "*=", "/=", "//=", "%=", "^=", "&=", "|=", "<<=", ">>=", "..="))
+_UNARY_OPERATORS = frozenset(("not", "-", "#", "~"))
+_UNARY_PRIORITY = 12
+# (left, right) binding power of the binary operators, as in the reference implementation
+_BINARY_PRIORITY = {
+    "or": (1, 1), "and": (2, 2),
+    "<": (3, 3), ">": (3, 3), "<=": (3, 3), ">=": (3, 3), "~=": (3, 3), "==": (3, 3),
+    "|": (4, 4), "~": (5, 5), "&": (6, 6), "<<": (7, 7), ">>": (7, 7),
+    "..": (9, 8), "+": (10, 10), "-": (10, 10),
+    "*": (11, 11), "/": (11, 11), "//": (11, 11), "%": (11, 11),
+    "^": (14, 13),
+}
+_BLOCK_END = frozenset(("end", "else", "elseif", "until", EOF))
+
+Token = Tuple[str, int, int]
+
+
+class LuaSyntaxError(ValueError):
+    """Raised when a script cannot be parsed."""
+
+    def __init__(self, message: str, position: int, text: str):
+        self.position = position
+        self.line = text.count("\n", 0, position) + 1
+        super().__init__(f"line {self.line}: {message}")
+
+
+class Node:
+    """
+    A node of the syntax tree.
+
+    Kinds and values:
+
+    - Statements: ``Local`` (value: the declared names), ``Assign`` (children: targets then
+      values, value: the number of targets), ``CompoundAssign`` (value: the operator),
+      ``Function`` and ``LocalFunction`` (children: the name, then the body statements,
+      value: the parameters), ``Return``, ``If``, ``While``, ``Repeat``, ``NumericFor``,
+      ``GenericFor`` and ``Do`` (children: conditions, expressions and statements in source
+      order), ``Label``, ``Goto`` and ``Break``. Calls used as statements are ``Call`` and
+      ``Invoke`` nodes.
+    - Expressions: ``Name`` (value: the name), ``Field`` (``a.b`` or ``a?.b``, value: ``b``),
+      ``Index`` (``a[b]`` or ``a?[b]``), ``Call`` (children: the callee then the arguments,
+      value: the span of the argument list), ``Invoke`` (``a:b(...)``, value: ``(b, start, end)``
+      with the span of the argument list), ``String`` (value: the raw literal), ``Number``, ``Constant`` (``nil``,
+      ``true``, ``false``), ``Vararg``, ``FunctionExpr`` (value: the parameters), ``Table``,
+      ``Paren``, ``Unop`` and ``Binop`` (value: the operator).
+    - ``FuncName``: the name of a function statement, never rewritten. ``Chunk``: the root.
+
+    The span of an argument list covers the text between the parentheses, or the
+    literal for ``f"str"`` and ``f{table}`` calls.
+    """
+
+    __slots__ = ("kind", "start", "end", "children", "value")
+
+    def __init__(self, kind: str, start: int, end: int, children: Optional[List["Node"]] = None, value=None):
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.children = children or []
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"Node({self.kind!r}, {self.start}, {self.end}, {len(self.children)} children, {self.value!r})"
+
+
+def tokenize(text: str) -> List[Token]:
+    """
+    Split a script into ``(kind, start, end)`` tokens, without whitespace and comments.
+
+    Args:
+        text (str): The script.
+
+    Returns:
+        List[Token]: The tokens, ending with an ``EOF`` token.
+
+    Raises:
+        LuaSyntaxError: On a character that cannot start a token, e.g. an unterminated string.
+    """
+    tokens: List[Token] = []
+    append = tokens.append
+    position = 0
+    for found in _TOKEN.finditer(text):
+        if found.start() != position:
+            break
+        position = found.end()
+        group = found.lastgroup
+        if group == "name":
+            start = found.start(group)
+            word = text[start:position]
+            append((word if word in KEYWORDS else NAME, start, position))
+        elif group == "op":
+            start = found.start(group)
+            append((text[start:position], start, position))
+        elif group in (STRING, NUMBER):
+            append((group, found.start(group), position))
+    length = len(text)
+    if position != length:
+        position = length - len(text[position:].lstrip())
+        raise LuaSyntaxError(f"unexpected character {text[position]!r}", position, text)
+    append((EOF, length, length))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser following the grammar of the Lua 5.4 reference manual."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+        self.kind, self.start, self.end = self.tokens[0]
+        self.last_end = 0
+
+    def _advance(self) -> Token:
+        token = self.tokens[self.index]
+        self.last_end = token[2]
+        self.index += 1
+        self.kind, self.start, self.end = self.tokens[self.index] if self.index < len(self.tokens) else token
+        return token
+
+    def _peek(self, offset: int = 1) -> str:
+        index = min(self.index + offset, len(self.tokens) - 1)
+        return self.tokens[index][0]
+
+    def _error(self, message: str):
+        found = "end of file" if self.kind == EOF else repr(self.text[self.start:self.end])
+        raise LuaSyntaxError(f"{message}, found {found}", self.start, self.text)
+
+    def _expect(self, kind: str) -> Token:
+        if self.kind != kind:
+            self._error(f"expected {kind!r}")
+        return self._advance()
+
+    def _name(self) -> str:
+        _, start, end = self._expect(NAME)
+        return self.text[start:end]
+
+    def chunk(self) -> Node:
+        statements = self._block()
+        if self.kind != EOF:
+            self._error("expected end of file")
+        return Node("Chunk", 0, len(self.text), statements)
+
+    def _block(self) -> List[Node]:
+        statements: List[Node] = []
+        while self.kind not in _BLOCK_END:
+            if self.kind == "return":
+                statements.append(self._return())
+                break
+            statement = self._statement()
+            if statement is not None:
+                statements.append(statement)
+        return statements
+
+    def _return(self) -> Node:
+        start = self._advance()[1]
+        values = [] if self.kind in _BLOCK_END or self.kind == ";" else self._expressions()
+        if self.kind == ";":
+            self._advance()
+        return Node("Return", start, self.last_end, values)
+
+    def _statement(self) -> Optional[Node]:
+        kind, start = self.kind, self.start
+        if kind == ";":
+            self._advance()
+            return None
+        if kind == "::":
+            self._advance()
+            name = self._name()
+            self._expect("::")
+            return Node("Label", start, self.last_end, value=name)
+        if kind == "break":
+            self._advance()
+            return Node("Break", start, self.last_end)
+        if kind == "goto":
+            self._advance()
+            name = self._name()
+            return Node("Goto", start, self.last_end, value=name)
+        if kind == "do":
+            self._advance()
+            body = self._block()
+            self._expect("end")
+            return Node("Do", start, self.last_end, body)
+        if kind == "while":
+            self._advance()
+            condition = self._expression()
+            self._expect("do")
+            body = self._block()
+            self._expect("end")
+            return Node("While", start, self.last_end, [condition] + body)
+        if kind == "repeat":
+            self._advance()
+            body = self._block()
+            self._expect("until")
+            condition = self._expression()
+            return Node("Repeat", start, self.last_end, body + [condition])
+        if kind == "if":
+            return self._if()
+        if kind == "for":
+            return self._for()
+        if kind == "function":
+            self._advance()
+            name = self._function_name()
+            params, body = self._function_body()
+            return Node("Function", start, self.last_end, [name] + body, params)
+        if kind == "local":
+            self._advance()
+            if self.kind == "function":
+                self._advance()
+                name_start = self.start
+                name = Node("FuncName", name_start, self.end, value=self._name())
+                params, body = self._function_body()
+                return Node("LocalFunction", start, self.last_end, [name] + body, params)
+            names = [self._attribute_name()]
+            while self.kind == ",":
+                self._advance()
+                names.append(self._attribute_name())
+            values = []
+            if self.kind == "=":
+                self._advance()
+                values = self._expressions()
+            return Node("Local", start, self.last_end, values, names)
+        return self._expression_statement()
+
+    def _attribute_name(self) -> str:
+        name = self._name()
+        if self.kind == "<":
+            self._advance()
+            name = f"{name}<{self._name()}>"
+            self._expect(">")
+        return name
+
+    def _if(self) -> Node:
+        start = self._advance()[1]
+        children = [self._expression()]
+        self._expect("then")
+        children.extend(self._block())
+        while self.kind == "elseif":
+            self._advance()
+            children.append(self._expression())
+            self._expect("then")
+            children.extend(self._block())
+        if self.kind == "else":
+            self._advance()
+            children.extend(self._block())
+        self._expect("end")
+        return Node("If", start, self.last_end, children)
+
+    def _for(self) -> Node:
+        start = self._advance()[1]
+        names = [self._name()]
+        if self.kind == "=":
+            self._advance()
+            kind = "NumericFor"
+            children = self._expressions()
+            if not 2 <= len(children) <= 3:
+                self._error("expected 2 or 3 expressions in numeric for")
+        else:
+            kind = "GenericFor"
+            while self.kind == ",":
+                self._advance()
+                names.append(self._name())
+            self._expect("in")
+            children = self._expressions()
+        self._expect("do")
+        children.extend(self._block())
+        self._expect("end")
+        return Node(kind, start, self.last_end, children, names)
+
+    def _function_name(self) -> Node:
+        start = self.start
+        parts = [self._name()]
+        while self.kind == ".":
+            self._advance()
+            parts.append(self._name())
+        if self.kind == ":":
+            self._advance()
+            parts.append(self._name())
+        return Node("FuncName", start, self.last_end, value=parts)
+
+    def _function_body(self) -> Tuple[List[str], List[Node]]:
+        self._expect("(")
+        params: List[str] = []
+        while self.kind != ")":
+            if self.kind == "...":
+                self._advance()
+                params.append("...")
+                break
+            params.append(self._name())
+            if self.kind != ",":
+                break
+            self._advance()
+        self._expect(")")
+        body = self._block()
+        self._expect("end")
+        return params, body
+
+    def _expression_statement(self) -> Node:
+        start = self.start
+        target = self._suffixed_expression()
+        if self.kind in ("=", ","):
+            targets = [target]
+            while self.kind == ",":
+                self._advance()
+                targets.append(self._suffixed_expression())
+            self._expect("=")
+            values = self._expressions()
+            return Node("Assign", start, self.last_end, targets + values, len(targets))
+        if self.kind in _COMPOUND_ASSIGNMENTS:
+            operator = self.text[self.start:self.end]
+            self._advance()
+            value = self._expression()
+            return Node("CompoundAssign", start, self.last_end, [target, value], operator)
+        if target.kind not in ("Call", "Invoke"):
+            self._error("syntax error near statement")
+        return target
+
+    def _expressions(self) -> List[Node]:
+        expressions = [self._expression()]
+        while self.kind == ",":
+            self._advance()
+            expressions.append(self._expression())
+        return expressions
+
+    def _expression(self, limit: int = 0) -> Node:
+        if self.kind in _UNARY_OPERATORS:
+            operator, start, _ = self._advance()
+            operand = self._expression(_UNARY_PRIORITY)
+            left = Node("Unop", start, operand.end, [operand], operator)
+        else:
+            left = self._simple_expression()
+        while True:
+            priority = _BINARY_PRIORITY.get(self.kind)
+            if priority is None or priority[0] <= limit:
+                return left
+            operator = self._advance()[0]
+            right = self._expression(priority[1])
+            left = Node("Binop", left.start, right.end, [left, right], operator)
+
+    def _simple_expression(self) -> Node:
+        kind, start, end = self.kind, self.start, self.end
+        if kind == NUMBER:
+            self._advance()
+            return Node("Number", start, end, value=self.text[start:end])
+        if kind == STRING:
+            self._advance()
+            return Node("String", start, end, value=self.text[start:end])
+        if kind in ("nil", "true", "false"):
+            self._advance()
+            return Node("Constant", start, end, value=kind)
+        if kind == "...":
+            self._advance()
+            return Node("Vararg", start, end)
+        if kind == "{":
+            return self._table()
+        if kind == "function":
+            self._advance()
+            params, body = self._function_body()
+            return Node("FunctionExpr", start, self.last_end, body, params)
+        return self._suffixed_expression()
+
+    def _primary_expression(self) -> Node:
+        start = self.start
+        if self.kind == NAME:
+            return Node("Name", start, self.end, value=self._name())
+        if self.kind == "(":
+            self._advance()
+            inner = self._expression()
+            self._expect(")")
+            return Node("Paren", start, self.last_end, [inner])
+        self._error("unexpected symbol")
+
+    def _suffixed_expression(self) -> Node:
+        node = self._primary_expression()
+        while True:
+            kind = self.kind
+            if kind in (".", "?."):
+                self._advance()
+                node = Node("Field", node.start, self.end, [node], self._name())
+            elif kind in ("[", "?["):
+                self._advance()
+                key = self._expression()
+                self._expect("]")
+                node = Node("Index", node.start, self.last_end, [node, key])
+            elif kind == ":":
+                self._advance()
+                method = self._name()
+                arguments, span = self._arguments()
+                node = Node("Invoke", node.start, self.last_end, [node] + arguments, (method,) + span)
+            elif kind in ("(", STRING, "{"):
+                arguments, span = self._arguments()
+                node = Node("Call", node.start, self.last_end, [node] + arguments, span)
+            else:
+                return node
+
+    def _arguments(self) -> Tuple[List[Node], Tuple[int, int]]:
+        if self.kind == STRING:
+            argument = self._simple_expression()
+            return [argument], (argument.start, argument.end)
+        if self.kind == "{":
+            argument = self._table()
+            return [argument], (argument.start, argument.end)
+        open_end = self._expect("(")[2]
+        arguments = [] if self.kind == ")" else self._expressions()
+        close_start = self._expect(")")[1]
+        return arguments, (open_end, close_start)
+
+    def _table(self) -> Node:
+        start = self._expect("{")[1]
+        children: List[Node] = []
+        while self.kind != "}":
+            if self.kind == "[":
+                self._advance()
+                children.append(self._expression())
+                self._expect("]")
+                self._expect("=")
+            elif self.kind == NAME and self._peek() == "=":
+                self._advance()
+                self._advance()
+            children.append(self._expression())
+            if self.kind not in (",", ";"):
+                break
+            self._advance()
+        self._expect("}")
+        return Node("Table", start, self.last_end, children)
+
+
+def parse(text: str) -> Node:
+    """
+    Parse a script.
+
+    Args:
+        text (str): The script.
+
+    Returns:
+        Node: The ``Chunk`` node.
+
+    Raises:
+        LuaSyntaxError: If the script is not valid Lua.
+    """
+    return _Parser(text).chunk()
+
+
+class _TreeCache:
+    """A thread-safe LRU cache of syntax trees keyed by a hash of the script."""
+
+    def __init__(self, max_entries: int, max_chars: int):
+        self.max_entries = max_entries
+        # Trees take about 20 bytes of memory per character of source
+        self.max_chars = max_chars
+        self._trees: "OrderedDict[bytes, Tuple[Node, int]]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Node:
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self._lock:
+            entry = self._trees.get(key)
+            if entry is not None:
+                self._trees.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        # Parsed outside of the lock, two threads may parse the same script at worst
+        tree = parse(text)
+        if len(text) > self.max_chars:
+            return tree
+        with self._lock:
+            if key not in self._trees:
+                self._trees[key] = (tree, len(text))
+                self._chars += len(text)
+            while len(self._trees) > self.max_entries or self._chars > self.max_chars:
+                self._chars -= self._trees.popitem(last=False)[1][1]
+        return tree
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+            self._chars = 0
+
+
+# Trees of recently parsed scripts, so watch mode and repeated runs in one process do not re-parse
+TREE_CACHE = _TreeCache(256, 2_000_000)
+
+
+def parse_cached(text: str) -> Node:
+    """
+    Parse a script, reusing the tree of an earlier parse of the same content.
+
+    Trees must not be modified, they are shared between callers.
+
+    Args:
+        text (str): The script.
+
+    Returns:
+        Node: The ``Chunk`` node.
+
+    Raises:
+        LuaSyntaxError: If the script is not valid Lua.
+    """
+    return TREE_CACHE.get(text)
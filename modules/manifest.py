@@ -0,0 +1,189 @@
+"""
+Incremental conversion manifest.
+
+The manifest lives in the output folder and records, for every converted source
+file, its size, modification time and content hash, together with a fingerprint
+of the conversion settings. Reruns use it to skip files that did not change and
+to remove outputs whose sources are gone.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MANIFEST_NAME = ".conversion-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: str) -> str:
+    """
+    Hash the content of a file.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: The hex digest of the file content.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def settings_fingerprint(
+    patterns: List[Tuple[str, str]],
+    direction: str,
+    include_sql: bool,
+    sql_patterns: Optional[List[Tuple[str, str]]],
+    scope: Optional[Iterable[str]] = None,
+    engine: str = "text"
+) -> str:
+    """
+    Hash the settings that influence the converted output.
+
+    Args:
+        patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
+        direction (str): Conversion direction.
+        include_sql (bool): Flag to include SQL patterns.
+        sql_patterns (Optional[List[Tuple[str, str]]]): List of SQL pattern tuples.
+        scope (Optional[Iterable[str]], optional): The files selected for conversion, when not
+            all Lua files are converted. Defaults to None.
+        engine (str, optional): The rewrite engine. Defaults to "text".
+
+    Returns:
+        str: The hex digest of the settings.
+    """
+    settings = [
+        MANIFEST_VERSION, direction, include_sql, list(patterns), list(sql_patterns or []) if include_sql else []
+    ]
+    if scope is not None:
+        settings.append(sorted(scope))
+    if engine != "text":
+        settings.append(engine)
+    payload = json.dumps(settings, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ConversionManifest:
+    """The record of a previous conversion run stored in an output folder."""
+
+    def __init__(self, output_folder: str, fingerprint: str):
+        """
+        Load the manifest of an output folder.
+
+        Entries are discarded when the stored fingerprint does not match, so a change
+        of patterns, direction or SQL option reconverts everything.
+
+        Args:
+            output_folder (str): The output folder of the conversion.
+            fingerprint (str): The fingerprint of the current conversion settings.
+        """
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        self.fingerprint = fingerprint
+        self.files: Dict[str, Dict[str, object]] = {}
+        self.assets: List[str] = []
+        self._previous_assets: List[str] = []
+        self._previous_files: List[str] = []
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        self._previous_assets = list(data.get("assets", []))
+        if data.get("fingerprint") == fingerprint:
+            self.files = dict(data.get("files", {}))
+        else:
+            # Settings changed: forget the entries but remember which outputs existed
+            self._previous_files = list(data.get("files", {}))
+
+    @property
+    def previous_assets(self) -> List[str]:
+        """The mirrored files recorded by the last run."""
+        return self._previous_assets
+
+    def is_unchanged(self, rel_path: str, input_path: str, output_path: str) -> bool:
+        """
+        Check whether a source file is unchanged since the last run.
+
+        The size and modification time are compared first; the content hash is only
+        computed when they differ, so an untouched tree costs one ``stat`` per file.
+
+        Args:
+            rel_path (str): Path of the file relative to the input folder.
+            input_path (str): Path to the source file.
+            output_path (str): Path to the converted file.
+
+        Returns:
+            bool: True if the source and its output are up to date.
+        """
+        entry = self.files.get(rel_path)
+        if entry is None or not os.path.exists(output_path):
+            return False
+
+        stat = os.stat(input_path)
+        if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return True
+
+        if entry.get("size") != stat.st_size or file_digest(input_path) != entry.get("hash"):
+            return False
+
+        # Touched but identical: refresh the stat so the next run takes the fast path
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def record(self, rel_path: str, input_path: str, converted: bool):
+        """
+        Record a freshly converted source file.
+
+        Args:
+            rel_path (str): Path of the file relative to the input folder.
+            input_path (str): Path to the source file.
+            converted (bool): Whether the conversion changed the file.
+        """
+        stat = os.stat(input_path)
+        self.files[rel_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": file_digest(input_path),
+            "converted": converted,
+        }
+
+    def forget(self, rel_path: str):
+        """Drop the entry of a file, e.g. after a conversion error."""
+        self.files.pop(rel_path, None)
+
+    def stale_outputs(self, sources: List[str]) -> List[str]:
+        """
+        List outputs from earlier runs whose sources no longer exist.
+
+        Args:
+            sources (List[str]): Relative paths of every source file in this run.
+
+        Returns:
+            List[str]: Relative paths of the outputs to delete.
+        """
+        current = set(sources)
+        previous = set(self.files) | set(self._previous_files) | set(self._previous_assets)
+        return sorted(previous - current)
+
+    def prune(self, sources: List[str]):
+        """Drop the entries of files that are not part of this run."""
+        current = set(sources)
+        self.files = {rel_path: entry for rel_path, entry in self.files.items() if rel_path in current}
+
+    def save(self):
+        """Write the manifest atomically to the output folder."""
+        data = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "files": self.files,
+            "assets": sorted(self.assets),
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temp_path, self.path)
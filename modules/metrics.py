@@ -0,0 +1,160 @@
+"""
+Opt-in instrumentation of conversion runs.
+
+A ``ConversionMetrics`` object passed to ``convert_script``, ``process_file`` or
+``process_folder`` records how often every rule fires, the bytes read and written,
+and the time spent per file reading, converting and writing. The result can be
+exported as JSON or summarized in a few lines for the output console.
+"""
+import json
+from typing import Dict, Iterable, List
+
+STAGES = ("read", "convert", "write")
+
+
+def new_file_record() -> Dict[str, object]:
+    """
+    Create an empty per-file record, filled in while a file is converted.
+
+    Returns:
+        Dict[str, object]: The record with zeroed stage times, byte counts and rule hits.
+    """
+    record: Dict[str, object] = {stage: 0.0 for stage in STAGES}
+    record.update({"bytes_in": 0, "bytes_out": 0, "hits": {}})
+    return record
+
+
+class ConversionMetrics:
+    """Rule hit counters and per-file timings of one or more conversion runs."""
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self.rule_hits: Dict[str, int] = {}
+        self.rules: List[str] = []
+        self.files: Dict[str, Dict[str, object]] = {}
+
+    def set_rules(self, rules: Iterable[str]):
+        """
+        Register the patterns of the active rule set, so rules that never fire are reported.
+
+        Args:
+            rules (Iterable[str]): The patterns of the rule set.
+        """
+        for rule in rules:
+            if rule not in self.rule_hits:
+                self.rules.append(rule)
+                self.rule_hits[rule] = 0
+
+    def add_hits(self, hits: Dict[str, int]):
+        """
+        Add rule hit counts.
+
+        Args:
+            hits (Dict[str, int]): Number of matches per pattern.
+        """
+        for rule, count in hits.items():
+            if rule not in self.rule_hits:
+                self.rules.append(rule)
+                self.rule_hits[rule] = 0
+            self.rule_hits[rule] += count
+
+    def add_file(self, path: str, status: str, record: Dict[str, object]):
+        """
+        Add the record of one converted file.
+
+        Args:
+            path (str): Path to the input file.
+            status (str): The conversion status ("converted", "skipped", "prefiltered" or "error").
+            record (Dict[str, object]): The record filled in during conversion.
+        """
+        self.add_hits(record["hits"])
+        entry = {key: value for key, value in record.items() if key != "hits"}
+        entry["status"] = status
+        entry["total"] = sum(record[stage] for stage in STAGES)
+        self.files[path] = entry
+
+    def merge(self, other: "ConversionMetrics"):
+        """
+        Add the rule hits and file records of other metrics, e.g. of another resource.
+
+        Args:
+            other (ConversionMetrics): The metrics to add.
+        """
+        self.set_rules(other.rules)
+        self.add_hits(other.rule_hits)
+        self.files.update(other.files)
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Sum the per-file records.
+
+        Returns:
+            Dict[str, float]: Total files, bytes and seconds per stage.
+        """
+        totals: Dict[str, float] = {"files": len(self.files), "bytes_in": 0, "bytes_out": 0}
+        for stage in STAGES + ("total",):
+            totals[stage] = 0.0
+        for entry in self.files.values():
+            for key in ("bytes_in", "bytes_out") + STAGES + ("total",):
+                totals[key] += entry[key]
+        return totals
+
+    def dead_rules(self) -> List[str]:
+        """Return the patterns that never matched, in rule order."""
+        return [rule for rule in self.rules if self.rule_hits[rule] == 0]
+
+    def slowest_files(self, count: int = 5) -> List[str]:
+        """Return the paths of the files that took the most time, slowest first."""
+        return sorted(self.files, key=lambda path: self.files[path]["total"], reverse=True)[:count]
+
+    def to_dict(self) -> Dict[str, object]:
+        """
+        Export the metrics as JSON-serializable data.
+
+        Returns:
+            Dict[str, object]: Totals, rule hits (most frequent first), dead rules and per-file records.
+        """
+        return {
+            "totals": self.totals(),
+            "rule_hits": dict(sorted(self.rule_hits.items(), key=lambda item: item[1], reverse=True)),
+            "dead_rules": self.dead_rules(),
+            "files": self.files,
+        }
+
+    def save(self, path: str):
+        """
+        Write the metrics as JSON.
+
+        Args:
+            path (str): Path of the JSON file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def summary_lines(self, top: int = 5) -> List[str]:
+        """
+        Summarize the metrics for the output console.
+
+        Args:
+            top (int, optional): Number of rules and files to list. Defaults to 5.
+
+        Returns:
+            List[str]: The summary lines.
+        """
+        totals = self.totals()
+        lines = [
+            f"Time: read {totals['read'] * 1000:.1f} ms, convert {totals['convert'] * 1000:.1f} ms, "
+            f"write {totals['write'] * 1000:.1f} ms",
+            f"Bytes: {int(totals['bytes_in'])} in, {int(totals['bytes_out'])} out",
+        ]
+        fired = [(rule, hits) for rule, hits in self.to_dict()["rule_hits"].items() if hits]
+        if fired:
+            lines.append("Top rules: " + ", ".join(f"{rule} ({hits})" for rule, hits in fired[:top]))
+        lines.append(f"Rules that never fired: {len(self.dead_rules())} of {len(self.rules)}")
+        slowest = self.slowest_files(top)
+        if slowest:
+            lines.append("Slowest files: " + ", ".join(
+                f"{path} ({self.files[path]['total'] * 1000:.1f} ms)" for path in slowest
+            ))
+        return lines
+
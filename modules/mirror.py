@@ -0,0 +1,172 @@
+"""
+File mirroring for files that are carried over to the output folder unchanged.
+
+Streamed models, textures, fonts and untouched scripts do not need to be copied
+byte by byte through Python. Depending on the mode, a file is hard-linked,
+reflinked (copy-on-write clone), copied in the kernel with ``copy_file_range``
+or ``sendfile``, or copied normally. Files whose size and modification time
+already match at the destination are skipped.
+"""
+import errno
+import os
+import shutil
+from typing import Iterator, Tuple
+
+MIRROR_MODES = ("auto", "hardlink", "reflink", "copy_file_range", "sendfile", "copy")
+
+# FICLONE ioctl request number on Linux (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+
+# Errors meaning "this mechanism is not available here", which fall through to the next one
+_UNSUPPORTED = {errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS, errno.EPERM, errno.ENOTTY}
+
+
+def is_up_to_date(src: str, dst: str) -> bool:
+    """
+    Check whether the destination already mirrors the source.
+
+    Args:
+        src (str): Source file path.
+        dst (str): Destination file path.
+
+    Returns:
+        bool: True if the destination has the same size and modification time, or is the same file.
+    """
+    try:
+        dst_stat = os.stat(dst)
+    except OSError:
+        return False
+    src_stat = os.stat(src)
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    return src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def _reflink(src: str, dst: str):
+    import fcntl
+
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+
+
+def _copy_file_range(src: str, dst: str):
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        remaining = os.fstat(src_file.fileno()).st_size
+        while remaining > 0:
+            sent = os.copy_file_range(src_file.fileno(), dst_file.fileno(), remaining)
+            if sent == 0:
+                break
+            remaining -= sent
+
+
+def _sendfile(src: str, dst: str):
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        size = os.fstat(src_file.fileno()).st_size
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(dst_file.fileno(), src_file.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+
+
+_COPIERS = {
+    "reflink": _reflink,
+    "copy_file_range": _copy_file_range,
+    "sendfile": _sendfile,
+    "copy": shutil.copyfile,
+}
+
+# Mechanisms tried, in order, for each mode. "copy" always works and ends every chain.
+_CHAINS = {
+    "auto": ("reflink", "copy_file_range", "copy"),
+    "reflink": ("reflink", "copy"),
+    "copy_file_range": ("copy_file_range", "copy"),
+    "sendfile": ("sendfile", "copy"),
+    "copy": ("copy",),
+}
+
+
+def mirror_file(src: str, dst: str, mode: str = "auto") -> bool:
+    """
+    Mirror a file to the destination unless it is already up to date.
+
+    The destination is replaced rather than written in place, so mirroring never
+    writes through an existing hard link into the source tree.
+
+    Args:
+        src (str): Source file path.
+        dst (str): Destination file path.
+        mode (str, optional): One of ``MIRROR_MODES``. ``hardlink`` links the destination to
+            the source and falls back to a copy across file systems. ``auto`` tries a reflink,
+            then ``copy_file_range``, then a regular copy. Defaults to "auto".
+
+    Returns:
+        bool: True if the file was mirrored, False if it was already up to date.
+    """
+    if mode not in MIRROR_MODES:
+        raise ValueError(f"Unknown mirror mode: {mode}")
+
+    if is_up_to_date(src, dst):
+        return False
+
+    remove_file(dst)
+
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED and e.errno not in (errno.EMLINK, errno.EACCES):
+                raise
+        mode = "copy"
+
+    for name in _CHAINS[mode]:
+        copier = _COPIERS[name]
+        if name == "copy_file_range" and not hasattr(os, "copy_file_range"):
+            continue
+        if name == "sendfile" and not hasattr(os, "sendfile"):
+            continue
+        try:
+            copier(src, dst)
+            break
+        except OSError as e:
+            if name == "copy" or e.errno not in _UNSUPPORTED:
+                raise
+            remove_file(dst)
+
+    shutil.copystat(src, dst)
+    return True
+
+
+def remove_file(path: str):
+    """Remove a file if it exists."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def scan_tree(folder: str) -> Iterator[Tuple[str, "os.DirEntry[str]"]]:
+    """
+    Walk a folder with ``os.scandir``, yielding every file once.
+
+    Args:
+        folder (str): The folder to walk.
+
+    Yields:
+        Tuple[str, os.DirEntry]: The directory path relative to ``folder`` ("" for the root)
+        and the directory entry of a file in it.
+    """
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        subdirs = []
+        with os.scandir(os.path.join(folder, rel_dir) if rel_dir else folder) as entries:
+            for entry in sorted(entries, key=lambda item: item.name):
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(os.path.join(rel_dir, entry.name) if rel_dir else entry.name)
+                elif entry.is_file():
+                    yield rel_dir, entry
+        # Reversed so the stack pops sub-directories in name order
+        pending.extend(reversed(subdirs))
@@ -1,15 +1,241 @@
 """
 Conversion patterns module for ESX to QB-Core and QB-Core to ESX conversions.
 """
-from typing import Dict, List, Tuple
+import warnings
+from typing import Dict, List, NamedTuple, Sequence, Tuple
 
-def load_conversion_patterns() -> Dict[str, List[Tuple[str, str]]]:
+from modules.engine import REGEX_PREFIX, check_regex, is_regex_rule
+from modules.rule_packs import DIRECTION_KEYS, apply_rule_packs, find_rule_packs, load_rule_pack
+
+
+class PatternIssue(NamedTuple):
+    """A problem found while compiling a pattern table."""
+
+    kind: str
+    rule: Tuple[str, str]
+    other: Tuple[str, str]
+    message: str
+
+
+# Issue kinds that make a table ambiguous; compile_pattern_table(strict=True) rejects them
+STRICT_ISSUES = ("conflict", "overlap", "invalid", "truncated")
+# Issue kinds that corrupt converted scripts; load_conversion_patterns warns about them
+LOAD_WARNINGS = ("overlap", "truncated")
+
+
+def compile_pattern_table(
+    rules: Sequence[Tuple[str, str]],
+    check: bool = False,
+    strict: bool = False
+) -> Tuple[List[Tuple[str, str]], List[PatternIssue]]:
+    """
+    Compile a pattern table into a minimal rule set ordered by specificity.
+
+    Exact duplicates are dropped and, for a pattern listed twice with different
+    replacements, the first one is kept. Literal rules are then ordered longest
+    pattern first (keeping the table order for equal lengths), so a rule always
+    comes before any shorter rule it contains. Regex rules keep their positions:
+    they are tried in table order, so their order is their priority.
+
+    With ``check`` the table is also analysed, which is quadratic in the number of
+    rules and therefore opt-in. Reported issue kinds are:
+
+    - ``duplicate``: the same rule is listed more than once.
+    - ``conflict``: the same pattern is listed with different replacements.
+    - ``shadowed``: a shorter pattern listed earlier is contained in a longer one;
+      the specificity ordering resolves it.
+    - ``truncated``: a longer pattern contains a shorter one, but its replacement drops
+      the text the longer pattern matches before the shorter one, e.g.
+      ``"TriggerEvent('esx:x'"`` replaced by ``"QBCore:x"``. As the longest match wins,
+      that text disappears from scripts.
+    - ``overlap``: the end of one pattern is the start of another, so whichever
+      starts first in a script hides the other.
+    - ``rematch``: a replacement contains another pattern, so converting the
+      output again would change it.
+    - ``invalid``: a regex rule (see ``modules.engine.regex_rule``) does not compile or
+      cannot be combined with other rules. Regex rules are not compared with other rules.
+
+    Args:
+        rules (Sequence[Tuple[str, str]]): Ordered ``(old, new)`` pairs.
+        check (bool, optional): Analyse the table and report issues. Defaults to False.
+        strict (bool, optional): Raise ``ValueError`` on conflicts and overlaps. Implies ``check``.
+            Defaults to False.
+
+    Returns:
+        Tuple[List[Tuple[str, str]], List[PatternIssue]]: The minimal rule set and the issues found.
+    """
+    check = check or strict
+    issues: List[PatternIssue] = []
+    first: Dict[str, Tuple[str, str]] = {}
+    for old, new in rules:
+        if not old:
+            continue
+        kept = first.get(old)
+        if kept is None:
+            first[old] = (old, new)
+        elif check:
+            kind = "duplicate" if kept[1] == new else "conflict"
+            issues.append(PatternIssue(kind, (old, new), kept, f"{old!r} is already mapped to {kept[1]!r}"))
+
+    unique = list(first.values())
+    if check:
+        literals = [rule for rule in unique if not is_regex_rule(rule[0])]
+        for rule in unique:
+            if is_regex_rule(rule[0]):
+                try:
+                    check_regex(rule[0][len(REGEX_PREFIX):])
+                except ValueError as e:
+                    issues.append(PatternIssue("invalid", rule, rule, str(e)))
+        for index, rule in enumerate(literals):
+            for other_index, other in enumerate(literals):
+                if rule is other:
+                    continue
+                if rule[0] in other[0]:
+                    if index < other_index:
+                        issues.append(PatternIssue(
+                            "shadowed", rule, other, f"{rule[0]!r} is listed before the longer {other[0]!r}"
+                        ))
+                    prefix = other[0][:other[0].index(rule[0])]
+                    if not other[1].startswith(prefix):
+                        issues.append(PatternIssue(
+                            "truncated", other, rule,
+                            f"the replacement {other[1]!r} of {other[0]!r} drops {prefix!r} before {rule[0]!r}"
+                        ))
+                elif _overlaps(rule[0], other[0]):
+                    issues.append(PatternIssue(
+                        "overlap", rule, other, f"the end of {rule[0]!r} is the start of {other[0]!r}"
+                    ))
+                if other[0] in rule[1]:
+                    issues.append(PatternIssue(
+                        "rematch", rule, other, f"the replacement {rule[1]!r} contains {other[0]!r}"
+                    ))
+
+    if strict:
+        errors = [issue for issue in issues if issue.kind in STRICT_ISSUES]
+        if errors:
+            raise ValueError("; ".join(issue.message for issue in errors))
+
+    # Only literal rules are reordered; regex rules keep their table position, which is
+    # their priority. sorted() is stable, so equally long patterns keep their table order
+    ordered = iter(sorted(
+        (rule for rule in unique if not is_regex_rule(rule[0])), key=lambda rule: len(rule[0]), reverse=True
+    ))
+    return [rule if is_regex_rule(rule[0]) else next(ordered) for rule in unique], issues
+
+
+def _overlaps(left: str, right: str) -> bool:
+    """
+    Check whether a proper suffix of ``left`` is a proper prefix of ``right``.
+
+    Only suffixes of at least three characters that start a new word in ``left``
+    count, e.g. ``"a.getItem"`` and ``"getItem:x"``; single shared letters cannot
+    occur in real scripts as a boundary between two API names.
+    """
+    for size in range(3, min(len(left), len(right))):
+        start = len(left) - size
+        if left.endswith(right[:size]) and not (left[start - 1].isalnum() or left[start - 1] == "_"):
+            return True
+    return False
+
+
+# Call rewrites of the syntax-aware engine, by conversion direction. "*" matches the player
+# object, {receiver} inserts it, {args} the arguments as written and {1}, {2}, ... single ones.
+CALL_PATTERNS: Dict[str, List[Tuple[str, str]]] = {
+    "ESX to QB-Core": [
+        ("*.addInventoryItem", "exports['qb-inventory']:AddItem({receiver}.PlayerData.source, {args})"),
+        ("*.removeInventoryItem", "exports['qb-inventory']:RemoveItem({receiver}.PlayerData.source, {args})"),
+        ("*.getInventoryItem", "exports['qb-inventory']:GetItemByName({receiver}.PlayerData.source, {1})"),
+        ("*.addMoney", "{receiver}.Functions.AddMoney('cash', {args})"),
+        ("*.removeMoney", "{receiver}.Functions.RemoveMoney('cash', {args})"),
+        ("*.setMoney", "{receiver}.Functions.SetMoney('cash', {args})"),
+        ("*.getMoney", "{receiver}.PlayerData.money.cash"),
+        ("*.addAccountMoney", "{receiver}.Functions.AddMoney({args})"),
+        ("*.removeAccountMoney", "{receiver}.Functions.RemoveMoney({args})"),
+        ("*.setAccountMoney", "{receiver}.Functions.SetMoney({args})"),
+        ("*.getAccount", "{receiver}.PlayerData.money[{1}]"),
+        ("*.getJob", "{receiver}.PlayerData.job"),
+        ("*.getIdentifier", "{receiver}.PlayerData.citizenid"),
+        ("*.setJob", "{receiver}.Functions.SetJob({args})"),
+    ],
+    "QB-Core to ESX": [
+        ("*.Functions.AddItem", "{receiver}.addInventoryItem({1}, {2})"),
+        ("*.Functions.RemoveItem", "{receiver}.removeInventoryItem({1}, {2})"),
+        ("*.Functions.GetItemByName", "{receiver}.getInventoryItem({1})"),
+        ("*.Functions.AddMoney", "{receiver}.addAccountMoney({args})"),
+        ("*.Functions.RemoveMoney", "{receiver}.removeAccountMoney({args})"),
+        ("*.Functions.SetMoney", "{receiver}.setAccountMoney({args})"),
+        ("*.Functions.SetJob", "{receiver}.setJob({args})"),
+    ],
+}
+
+
+# Tables renamed in the SQL queries of scripts with the column identifying the player, ESX
+# names first. Renames only apply in SQL context (after a keyword, quoted or qualified), so
+# Lua variables and other tables with the same column names are kept.
+SQL_TABLES: List[Tuple[str, str, str, str]] = [
+    ("owned_vehicles", "player_vehicles", "owner", "citizenid"),
+    ("users", "players", "identifier", "citizenid"),
+]
+SQL_TABLE_KEYWORDS = ("FROM", "INTO", "JOIN", "UPDATE")
+
+
+def _sql_rules(tables: Sequence[Tuple[str, str, str, str]]) -> List[Tuple[str, str]]:
+    """Expand table renames into the SQL contexts they are renamed in."""
+    rules: List[Tuple[str, str]] = []
+    for old, new, old_key, new_key in tables:
+        rules.append((f"{old}.{old_key}", f"{new}.{new_key}"))
+        for quote in ("`", ""):
+            for keyword in SQL_TABLE_KEYWORDS:
+                for spelling in (keyword, keyword.lower()):
+                    table = f"{spelling} {quote}{old}{quote}"
+                    target = f"{spelling} {quote}{new}{quote}"
+                    if keyword == "FROM":
+                        for where in ("WHERE", "where"):
+                            rules.append((
+                                f"{table} {where} {quote}{old_key}{quote}",
+                                f"{target} {where} {quote}{new_key}{quote}",
+                            ))
+                    rules.append((f"{table} ", f"{target} "))
+        rules.append((f"`{old}`", f"`{new}`"))
+    return rules
+
+
+def sql_patterns_for(patterns: Dict[str, List[Tuple[str, str]]], direction: str) -> List[Tuple[str, str]]:
+    """
+    Select the SQL patterns of a conversion direction.
+
+    Args:
+        patterns (Dict[str, List[Tuple[str, str]]]): The tables from ``load_conversion_patterns``.
+        direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+
+    Returns:
+        List[Tuple[str, str]]: The SQL patterns, empty if the tables have none for the direction.
+    """
+    return patterns.get(DIRECTION_KEYS.get(direction, DIRECTION_KEYS["ESX to QB-Core"])[1], [])
+
+
+def load_conversion_patterns(
+    compiled: bool = True,
+    rule_packs: Sequence[str] = ()
+) -> Dict[str, List[Tuple[str, str]]]:
     """
     Load conversion patterns for ESX to QB-Core and QB-Core to ESX.
     Patterns are organized alphabetically within their respective categories.
 
+    Args:
+        compiled (bool, optional): Return every table as the minimal rule set built by
+            ``compile_pattern_table`` instead of as written. The tables are then checked, and
+            issues that corrupt converted scripts (``LOAD_WARNINGS``) are emitted as warnings.
+            Defaults to True.
+        rule_packs (Sequence[str], optional): YAML rule pack files, or folders of them, whose
+            rules take precedence over the bundled ones, see ``modules.rule_packs``. Defaults to ().
+
     Returns:
         Dict[str, List[Tuple[str, str]]]: A dictionary containing lists of tuples for each conversion direction and SQL patterns.
+        The SQL patterns of a direction are selected with ``sql_patterns_for``.
+
+    Raises:
+        ValueError: If a rule pack is invalid.
     """
     patterns: Dict[str, List[Tuple[str, str]]] = {
         "ESX_to_QB_Core": [
@@ -91,9 +317,9 @@ def load_conversion_patterns() -> Dict[str, List[Tuple[str, str]]]:
             ("MySQL.Async.fetchScalar", "exports.oxmysql:fetchScalar"),
             ("MySQL.Async.insert", "exports.oxmysql:insert"),
             ("MySQL.Sync.fetchAll", "exports.oxmysql:fetchAllSync"),
-            ("TriggerEvent('esx:addInventoryItem'", "QBCore:Server:AddItem"),
-            ("TriggerEvent('esx:removeInventoryItem'", "QBCore:Server:RemoveItem"),
-            ("TriggerEvent('esx:setAccountMoney'", "QBCore:Server:SetMoney"),
+            ("TriggerEvent('esx:addInventoryItem'", "TriggerEvent('QBCore:Server:AddItem'"),
+            ("TriggerEvent('esx:removeInventoryItem'", "TriggerEvent('QBCore:Server:RemoveItem'"),
+            ("TriggerEvent('esx:setAccountMoney'", "TriggerEvent('QBCore:Server:SetMoney'"),
         ],
         "QB_Core_to_ESX": [
             ("QBCore.Functions.AddItem", "xPlayer.Functions.AddItem"),
@@ -169,5 +395,28 @@ def load_conversion_patterns() -> Dict[str, List[Tuple[str, str]]]:
             ("QBCore:Client:OnJobUpdate", "esx:setJob"),
             ("QBCore:Client:OnPlayerLoaded", "esx:onPlayerLoaded"),
         ],
+        "SQL_ESX_to_QB_Core": _sql_rules(SQL_TABLES),
+        "SQL_QB_Core_to_ESX": _sql_rules([(new, old, new_key, old_key) for old, new, old_key, new_key in SQL_TABLES]),
     }
-    return patterns
+    if rule_packs:
+        patterns = apply_rule_packs(patterns, [load_rule_pack(path) for path in find_rule_packs(rule_packs)])
+    # The SQL patterns of the default direction, for callers that do not select them by direction
+    patterns["SQL_patterns"] = patterns["SQL_ESX_to_QB_Core"]
+    if not compiled:
+        return patterns
+    tables: Dict[str, List[Tuple[str, str]]] = {}
+    for key, rules in patterns.items():
+        tables[key], issues = compile_pattern_table(rules, check=True)
+        for issue in issues:
+            if issue.kind in LOAD_WARNINGS:
+                warnings.warn(f"{key}: [{issue.kind}] {issue.message}", stacklevel=2)
+    return tables
+
+
+if __name__ == "__main__":
+    # Report the issues of the bundled tables: python -m modules.patterns
+    for key, rules in load_conversion_patterns(compiled=False).items():
+        minimal, found = compile_pattern_table(rules, check=True)
+        print(f"{key}: {len(rules)} rules, {len(minimal)} after compilation, {len(found)} issues")
+        for issue in found:
+            print(f"  [{issue.kind}] {issue.message}")
@@ -0,0 +1,221 @@
+"""
+Dry-run conversion previews.
+
+Instead of materializing the output tree, a preview streams what a conversion
+would change to a text stream: either unified diffs or a compact per-file summary
+of the changed spans. Files are processed one at a time and each diff is written
+as it is generated, so at most one file is held in memory and nothing is written
+next to the input folder.
+
+SQL dumps, previewed with ``include_sql``, are converted without writing anything
+and summarized as the number of converted rows and renamed references: their rows
+are reshaped as a whole and dumps are often too large for a readable diff.
+"""
+import difflib
+import os
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from modules.converter import _read_candidate, get_rewriter, is_script
+from modules.ast_engine import AstRewriter
+from modules.engine import Rewriter
+from modules.mirror import scan_tree
+
+PREVIEW_FORMATS = ("unified", "summary")
+
+
+def iter_changes(script: str, rewriter: Union[Rewriter, AstRewriter]) -> Iterator[Tuple[int, str, str]]:
+    """
+    Iterate over the replacements a rewriter would make in a script.
+
+    Args:
+        script (str): The original script content.
+        rewriter (Union[Rewriter, AstRewriter]): The compiled rewriter.
+
+    Yields:
+        Tuple[int, str, str]: The 1-based line number, the matched text and its replacement.
+    """
+    line = 1
+    last = 0
+    for start, old, new in rewriter.iter_edits(script):
+        line += script.count("\n", last, start)
+        last = start
+        yield line, old, new
+
+
+def write_unified_diff(stream: TextIO, rel_path: str, original: str, converted: str, context: int = 3):
+    """
+    Stream the unified diff of one file.
+
+    Args:
+        stream (TextIO): Destination of the diff.
+        rel_path (str): Path of the file relative to the input folder.
+        original (str): The original script content.
+        converted (str): The converted script content.
+        context (int, optional): Number of context lines. Defaults to 3.
+    """
+    diff = difflib.unified_diff(
+        original.splitlines(keepends=True),
+        converted.splitlines(keepends=True),
+        fromfile=f"a/{rel_path}",
+        tofile=f"b/{rel_path}",
+        n=context
+    )
+    for line in diff:
+        stream.write(line)
+        if not line.endswith("\n"):
+            stream.write("\n\\ No newline at end of file\n")
+
+
+def write_summary(stream: TextIO, rel_path: str, changes: List[Tuple[int, str, str]]):
+    """
+    Write the compact summary of one file: one line per changed span.
+
+    Args:
+        stream (TextIO): Destination of the summary.
+        rel_path (str): Path of the file relative to the input folder.
+        changes (List[Tuple[int, str, str]]): The changes from ``iter_changes``.
+    """
+    stream.write(f"{rel_path}: {len(changes)} change{'s' if len(changes) != 1 else ''}\n")
+    for line, old, new in changes:
+        stream.write(f"  {line}: {old} -> {new}\n")
+
+
+def write_dump_summary(stream: TextIO, rel_path: str, hits: Dict[str, int]):
+    """
+    Write the summary of one SQL dump: one line per converted table or renamed reference.
+
+    Args:
+        stream (TextIO): Destination of the summary.
+        rel_path (str): Path of the dump relative to the input folder.
+        hits (Dict[str, int]): The counts collected by ``SqlDumpConverter``.
+    """
+    total = sum(hits.values())
+    stream.write(f"{rel_path}: SQL dump, {total} change{'s' if total != 1 else ''}\n")
+    for key, count in sorted(hits.items()):
+        stream.write(f"  {key}: {count}\n")
+
+
+def preview_dump(input_path: str, direction: str) -> Optional[Dict[str, int]]:
+    """
+    Convert an SQL dump without writing it, counting what would change.
+
+    Args:
+        input_path (str): Path to the dump.
+        direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+
+    Returns:
+        Optional[Dict[str, int]]: The converted rows and renamed references, see
+        ``SqlDumpConverter``, or None if the dump mentions no converted table.
+
+    Raises:
+        ValueError: If a statement of a converted table cannot be parsed.
+    """
+    # Imported here so Lua-only previews do not load the dump converter
+    from modules.sql_dump import _mentions_tables, convert_sql_stream
+
+    if not _mentions_tables(input_path, direction):
+        return None
+    hits: Dict[str, int] = {}
+    with open(input_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as source, \
+            open(os.devnull, "w", encoding="utf-8", errors="surrogateescape") as target:
+        convert_sql_stream(source, target, direction, hits)
+    return hits
+
+
+def preview_folder(
+    folder_path: str,
+    patterns: List[Tuple[str, str]],
+    direction: str,
+    include_sql: bool,
+    sql_patterns: List[Tuple[str, str]],
+    stream: Optional[TextIO] = None,
+    preview_format: str = "unified",
+    callback: Optional[Callable[[str], None]] = None,
+    engine: str = "text"
+) -> Dict[str, int]:
+    """
+    Preview the conversion of a folder without writing any output.
+
+    Args:
+        folder_path (str): Path to the folder containing Lua script files.
+        patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
+        direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+        include_sql (bool): Flag to include SQL patterns; SQL dumps are previewed as well.
+        sql_patterns (List[Tuple[str, str]]): List of SQL pattern tuples.
+        stream (Optional[TextIO], optional): Where the preview is written. Defaults to stdout.
+        preview_format (str, optional): "unified" for unified diffs or "summary" for one line
+            per changed span. Dumps are always summarized. Defaults to "unified".
+        callback (Optional[Callable[[str], None]], optional): Callback function for progress updates.
+            Defaults to None.
+
+    Returns:
+        Dict[str, int]: Statistics with the same keys as ``process_folder``, counting the files
+        that would be converted.
+    """
+    if preview_format not in PREVIEW_FORMATS:
+        raise ValueError(f"Unknown preview format: {preview_format}")
+    if stream is None:
+        stream = sys.stdout
+
+    stats = {
+        "total_files": 0,
+        "converted_files": 0,
+        "skipped_files": 0,
+        "error_files": 0,
+        "unchanged_files": 0,
+        "prefiltered_files": 0,
+        "unloaded_files": 0
+    }
+    rewriter = get_rewriter(patterns, include_sql, sql_patterns, direction, engine)
+
+    for rel_dir, entry in scan_tree(folder_path):
+        if not is_script(entry.name, include_sql):
+            continue
+        stats["total_files"] += 1
+        rel_path = os.path.join(rel_dir, entry.name).replace(os.sep, "/")
+
+        try:
+            if entry.name.endswith(".sql"):
+                hits = preview_dump(entry.path, direction)
+                if hits is None:
+                    stats["prefiltered_files"] += 1
+                    stats["skipped_files"] += 1
+                    continue
+                changed = bool(hits)
+                if changed:
+                    write_dump_summary(stream, rel_path, hits)
+            else:
+                raw = _read_candidate(entry.path, rewriter)
+                if raw is None:
+                    stats["prefiltered_files"] += 1
+                    stats["skipped_files"] += 1
+                    continue
+
+                # Only shown, so bytes of other encodings may be replaced
+                original = raw.decode("utf-8", "replace")
+                if preview_format == "summary":
+                    changes = list(iter_changes(original, rewriter))
+                    changed = bool(changes)
+                    if changed:
+                        write_summary(stream, rel_path, changes)
+                else:
+                    converted = rewriter.sub(original)
+                    changed = converted != original
+                    if changed:
+                        write_unified_diff(stream, rel_path, original, converted)
+        except Exception as e:
+            stats["error_files"] += 1
+            if callback:
+                callback(f"Error processing {entry.path}: {str(e)}")
+            continue
+
+        if changed:
+            stats["converted_files"] += 1
+            if callback:
+                callback(f"Would convert: {rel_path}")
+        else:
+            stats["skipped_files"] += 1
+
+    stream.flush()
+    return stats
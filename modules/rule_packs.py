@@ -0,0 +1,182 @@
+"""
+Rule packs: additional conversion rules loaded from YAML files.
+
+A pack lists rules by conversion direction, literal and regex rules mixed::
+
+    name: esx-money
+    description: Money accessors of the ESX player object
+    rules:
+      ESX to QB-Core:
+        - match: xPlayer.getName()
+          replace: xPlayer.PlayerData.charinfo.firstname
+        - regex: '(?P<player>\\w+)\\.getMoney\\(\\)'
+          replace: '\\g<player>.PlayerData.money.cash'
+        - regex: 'TriggerEvent\\(\\s*["'']esx:playerLoaded["'']'
+          replace: "TriggerEvent('QBCore:Client:OnPlayerLoaded'"
+      QB-Core to ESX: []
+    sql:
+      ESX to QB-Core:
+        - regex: 'FROM\\s+`?jobs`?\\b'
+          replace: FROM jobs_qb
+
+Pack rules come before the bundled rules of their direction, so they take precedence
+over them. All rules of a direction, from every pack, are compiled into the same single
+expression as the bundled rules (see ``modules.engine``); regex rules do not add passes.
+"""
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Pattern, Tuple
+
+from modules.engine import check_regex, regex_rule
+
+# The keys of the pattern tables of every direction: (code rules, SQL rules)
+DIRECTION_KEYS: Dict[str, Tuple[str, str]] = {
+    "ESX to QB-Core": ("ESX_to_QB_Core", "SQL_ESX_to_QB_Core"),
+    "QB-Core to ESX": ("QB_Core_to_ESX", "SQL_QB_Core_to_ESX"),
+}
+RULE_PACK_EXTENSIONS = (".yml", ".yaml")
+
+
+class RulePack(NamedTuple):
+    """The rules of one rule pack file."""
+
+    name: str
+    path: str
+    description: str
+    rules: Dict[str, List[Tuple[str, str]]]
+    sql_rules: Dict[str, List[Tuple[str, str]]]
+
+
+def _parse_rules(path: str, section: str, value: object) -> Dict[str, List[Tuple[str, str]]]:
+    """Validate one section of a pack and convert its entries into ``(old, new)`` rules."""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"{path}: '{section}' must map conversion directions to rule lists")
+    rules: Dict[str, List[Tuple[str, str]]] = {}
+    for direction, entries in value.items():
+        if direction not in DIRECTION_KEYS:
+            raise ValueError(
+                f"{path}: unknown direction {direction!r} in '{section}', expected one of {sorted(DIRECTION_KEYS)}"
+            )
+        if not isinstance(entries, list):
+            raise ValueError(f"{path}: '{section}' rules of {direction} must be a list")
+        parsed: List[Tuple[str, str]] = []
+        for index, entry in enumerate(entries or [], 1):
+            where = f"{path}: {section}, {direction}, rule {index}"
+            if not isinstance(entry, dict) or "replace" not in entry or ("match" in entry) == ("regex" in entry):
+                raise ValueError(f"{where}: needs 'replace' and either 'match' or 'regex'")
+            replace = entry["replace"]
+            if not isinstance(replace, str):
+                raise ValueError(f"{where}: 'replace' must be a string")
+            if "match" in entry:
+                if not isinstance(entry["match"], str) or not entry["match"]:
+                    raise ValueError(f"{where}: 'match' must be a non-empty string")
+                parsed.append((entry["match"], replace))
+                continue
+            if not isinstance(entry["regex"], str):
+                raise ValueError(f"{where}: 'regex' must be a string")
+            try:
+                _check_template(check_regex(entry["regex"]), replace)
+            except ValueError as e:
+                raise ValueError(f"{where}: {e}") from e
+            parsed.append(regex_rule(entry["regex"], replace))
+        rules[direction] = parsed
+    return rules
+
+
+def _check_template(compiled: Pattern[str], template: str):
+    """Raise if a replacement template refers to a group the expression does not have."""
+    for match in re.finditer(r"\\g<([^>]*)>|\\([0-9]+)", template):
+        group = match.group(1) if match.group(1) is not None else match.group(2)
+        if group.isdigit():
+            if int(group) > compiled.groups:
+                raise ValueError(f"the replacement refers to group {group}, the regex has {compiled.groups}")
+        elif group not in compiled.groupindex:
+            raise ValueError(f"the replacement refers to the unknown group {group!r}")
+
+
+def load_rule_pack(path: str) -> RulePack:
+    """
+    Load and validate a rule pack.
+
+    Args:
+        path (str): Path to the YAML file.
+
+    Returns:
+        RulePack: The pack; its name defaults to the file name.
+
+    Raises:
+        ValueError: If the file is not a valid rule pack; the message names the file and rule.
+    """
+    # Imported here so conversions without rule packs do not load PyYAML
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as file:
+        try:
+            data = yaml.safe_load(file)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: invalid YAML: {e}") from e
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: a rule pack must be a mapping")
+    unknown = set(data) - {"name", "description", "rules", "sql"}
+    if unknown:
+        raise ValueError(f"{path}: unknown keys {sorted(unknown)}")
+    name = os.path.splitext(os.path.basename(path))[0]
+    return RulePack(
+        str(data.get("name") or name),
+        path,
+        str(data.get("description") or ""),
+        _parse_rules(path, "rules", data.get("rules")),
+        _parse_rules(path, "sql", data.get("sql")),
+    )
+
+
+def find_rule_packs(paths: Iterable[str]) -> List[str]:
+    """
+    Expand folders into the rule pack files they hold.
+
+    Args:
+        paths (Iterable[str]): Rule pack files and folders of them.
+
+    Returns:
+        List[str]: The files, folders expanded to their ``.yml``/``.yaml`` files in name order.
+    """
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith(RULE_PACK_EXTENSIONS) and os.path.isfile(os.path.join(path, name))
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def apply_rule_packs(
+    patterns: Dict[str, List[Tuple[str, str]]],
+    packs: Iterable[RulePack]
+) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    Add the rules of rule packs to pattern tables.
+
+    Args:
+        patterns (Dict[str, List[Tuple[str, str]]]): The tables from ``load_conversion_patterns``.
+        packs (Iterable[RulePack]): The packs, highest priority first.
+
+    Returns:
+        Dict[str, List[Tuple[str, str]]]: New tables with the pack rules before the bundled rules.
+    """
+    added: Dict[str, List[Tuple[str, str]]] = {}
+    for pack in packs:
+        for direction, (key, sql_key) in DIRECTION_KEYS.items():
+            added.setdefault(key, []).extend(pack.rules.get(direction, []))
+            added.setdefault(sql_key, []).extend(pack.sql_rules.get(direction, []))
+    combined = dict(patterns)
+    for key, rules in added.items():
+        if rules:
+            combined[key] = rules + list(patterns.get(key, []))
+    return combined
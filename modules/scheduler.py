@@ -0,0 +1,187 @@
+"""
+Whole-server conversions of a ``resources/`` directory.
+
+Resources are found by their ``fxmanifest.lua`` or ``__resource.lua``, also inside
+``[category]`` folders, and converted into the same layout under one output folder.
+Every resource is a ``ConversionJob``; all jobs feed one shared process pool, the
+largest resources first. Files are submitted in small chunks and idle workers take
+the next queued chunk of any resource, so a few large resources do not leave the
+other workers waiting while the small ones are done early.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules.converter import create_pool, get_output_folder
+from modules.fxmanifest import find_resources
+from modules.job import FINISHED, ConversionJob, ProgressEvent
+from modules.metrics import ConversionMetrics
+from modules.sinks import OutputSink
+from modules.tracing import span
+
+
+def _cpu_seconds() -> Optional[float]:
+    """CPU time of this process and its finished children, or None where unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(item.ru_utime + item.ru_stime for item in usage)
+
+
+def convert_resources(
+    root: str,
+    patterns: List[Tuple[str, str]],
+    direction: str,
+    include_sql: bool,
+    sql_patterns: List[Tuple[str, str]],
+    callback: Optional[Callable[[str], None]] = None,
+    output_prefix: str = "qb-",
+    workers: int = 1,
+    incremental: bool = False,
+    mirror_mode: str = "auto",
+    output_folder: Optional[str] = None,
+    metrics: Optional[ConversionMetrics] = None,
+    on_event: Optional[Callable[[str, ProgressEvent], None]] = None,
+    loaded_only: bool = False,
+    engine: str = "text",
+    sink: Optional[OutputSink] = None
+) -> Dict[str, object]:
+    """
+    Convert every resource below a folder on a shared worker pool.
+
+    Only resource folders are written to the output; files outside of resources are ignored.
+
+    Args:
+        root (str): The folder holding the resources.
+        patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
+        direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+        include_sql (bool): Flag to include SQL patterns.
+        sql_patterns (List[Tuple[str, str]]): List of SQL pattern tuples.
+        callback (Optional[Callable[[str], None]], optional): Callback function for progress updates,
+            with the messages of ``process_folder``. Calls are serialized. Defaults to None.
+        output_prefix (str, optional): Prefix for the output folder. Defaults to "qb-".
+        workers (int, optional): Number of worker processes shared by all resources. Defaults to 1.
+        incremental (bool, optional): Keep a manifest per resource and only convert changed files.
+            Defaults to False.
+        mirror_mode (str, optional): How unchanged files are mirrored. Defaults to "auto".
+        output_folder (Optional[str], optional): Explicit output folder. Defaults to the root
+            folder's name with ``output_prefix``, next to the root folder.
+        metrics (Optional[ConversionMetrics], optional): Collects rule hits and timings of all
+            resources. Defaults to None.
+        on_event (Optional[Callable[[str, ProgressEvent], None]], optional): Called with the
+            resource path and every progress event. Calls are serialized. Defaults to None.
+        loaded_only (bool, optional): Only convert the Lua files each resource's manifest loads.
+            Defaults to False.
+        engine (str, optional): The rewrite engine, one of ``ENGINES``. Defaults to "text".
+        sink (Optional[OutputSink], optional): Write every resource into this sink instead of the
+            output folder, see ``process_folder``. Defaults to None.
+
+    Returns:
+        Dict[str, object]: The report: ``resources`` maps every resource to its statistics,
+        ``total`` sums them, and ``wall_seconds``, ``cpu_seconds`` and ``workers`` describe the run.
+    """
+    if output_folder is None:
+        output_folder = get_output_folder(root, output_prefix)
+    workers = max(1, workers)
+    started = time.perf_counter()
+    cpu_started = _cpu_seconds()
+
+    jobs: Dict[str, ConversionJob] = {}
+    resource_metrics: Dict[str, ConversionMetrics] = {}
+    for rel_path in find_resources(root):
+        if metrics is not None:
+            resource_metrics[rel_path] = ConversionMetrics()
+        jobs[rel_path] = ConversionJob(
+            os.path.normpath(os.path.join(root, rel_path)), patterns, direction, include_sql, sql_patterns,
+            workers=workers, incremental=incremental, mirror_mode=mirror_mode,
+            output_folder=os.path.normpath(os.path.join(output_folder, rel_path)),
+            metrics=resource_metrics.get(rel_path), loaded_only=loaded_only, engine=engine, sink=sink
+        )
+    # A resource that cannot be scanned fails on its own, like one that fails to convert
+    scan_errors: Dict[str, str] = {}
+    for rel_path, job in jobs.items():
+        try:
+            job.scan()
+        except Exception as e:
+            scan_errors[rel_path] = str(e)
+    # Largest first, so the longest resources are not started last
+    order = sorted(jobs, key=lambda rel_path: (-jobs[rel_path].work_bytes, rel_path))
+
+    lock = threading.Lock()
+    report: Dict[str, Dict[str, object]] = {}
+
+    def run_job(rel_path: str):
+        job = jobs[rel_path]
+
+        def emit(event: ProgressEvent):
+            with lock:
+                if on_event:
+                    on_event(rel_path, event)
+                if callback and event.kind != FINISHED:
+                    callback(event.message)
+
+        job_started = time.perf_counter()
+        error = scan_errors.get(rel_path)
+        if error is None:
+            try:
+                with span("resource", resource=rel_path):
+                    stats = dict(job.run(emit if callback or on_event else None))
+                stats["error"] = None
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            stats = dict(job.stats)
+            stats["error"] = error
+            if callback:
+                with lock:
+                    callback(f"Error converting resource {rel_path}: {error}")
+        stats["bytes"] = job.total_bytes
+        stats["seconds"] = round(time.perf_counter() - job_started, 6)
+        report[rel_path] = stats
+
+    if workers == 1 or len(jobs) < 2:
+        for rel_path in order:
+            run_job(rel_path)
+    else:
+        # Imported here so sequential runs do not pay for it
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = create_pool(
+            workers, patterns, direction, include_sql, sql_patterns, mirror_mode, metrics is not None, engine,
+            sink is not None
+        )
+        try:
+            for job in jobs.values():
+                job.executor = pool
+            # One feeding thread per worker; each keeps a few chunks of its resource queued
+            with ThreadPoolExecutor(max_workers=workers) as feeders:
+                list(feeders.map(run_job, order))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    if metrics is not None:
+        for rel_path in sorted(resource_metrics):
+            metrics.merge(resource_metrics[rel_path])
+
+    total: Dict[str, int] = {}
+    for stats in report.values():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key != "seconds":
+                total[key] = total.get(key, 0) + value
+    total["resources"] = len(report)
+    total["failed_resources"] = sum(1 for stats in report.values() if stats["error"])
+
+    cpu_finished = _cpu_seconds()
+    return {
+        "root": os.path.abspath(root),
+        "output_folder": os.path.abspath(output_folder),
+        "workers": workers,
+        "order": order,
+        "resources": {rel_path: report[rel_path] for rel_path in sorted(report)},
+        "total": total,
+        "wall_seconds": round(time.perf_counter() - started, 6),
+        "cpu_seconds": None if cpu_started is None else round(cpu_finished - cpu_started, 6),
+    }
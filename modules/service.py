@@ -0,0 +1,439 @@
+"""
+HTTP conversion service.
+
+Converts zipped resources uploaded over HTTP and answers with the converted zip:
+
+    python -m modules.service --port 8000 --workers 4
+    curl -F file=@esx_resource.zip "http://127.0.0.1:8000/convert?direction=esx-to-qb" -o qb_resource.zip
+
+The upload is streamed to disk while it is hashed, extracted, and converted on
+process pools shared by all requests straight into a zip archive (see
+``modules.sinks``); no output folder is written. The statistics of the conversion
+come in the ``X-Conversion-Stats`` header as JSON, and with ``GET /results/{key}``.
+
+Results are kept by a hash of the upload and the conversion settings, so a repeated
+submission is answered from the result cache without converting anything. The cache
+folder is ``service`` in the rewriter cache folder (see ``modules.cache``).
+"""
+import argparse
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import zipfile
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+
+from modules.ast_engine import ENGINES
+from modules.cache import get_cache_dir
+from modules.cli import DIRECTIONS
+from modules.converter import create_pool
+from modules.job import ConversionJob
+from modules.manifest import settings_fingerprint
+from modules.patterns import load_conversion_patterns, sql_patterns_for
+from modules.sinks import ZipSink
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Uploads larger than this are rejected
+MAX_UPLOAD_BYTES = 512 << 20
+# Limits of the extracted upload, against zip bombs
+MAX_EXTRACTED_BYTES = 2 << 30
+MAX_ARCHIVE_FILES = 50000
+# Conversions running at the same time, across all requests
+MAX_CONCURRENT_CONVERSIONS = 2
+# Results kept in the cache; the least recently used are deleted first
+MAX_CACHED_RESULTS = 256
+_CHUNK_SIZE = 1 << 20
+
+
+class ConversionService:
+    """Converts uploaded archives on shared worker pools and caches the results."""
+
+    def __init__(
+        self,
+        workers: int = 1,
+        max_concurrent: int = MAX_CONCURRENT_CONVERSIONS,
+        results_dir: Optional[str] = None,
+        max_results: int = MAX_CACHED_RESULTS,
+        rule_packs: Sequence[str] = ()
+    ):
+        """
+        Args:
+            workers (int, optional): Worker processes of each pool. Defaults to 1.
+            max_concurrent (int, optional): Conversions running at the same time; further
+                requests wait for a slot. Defaults to ``MAX_CONCURRENT_CONVERSIONS``.
+            results_dir (Optional[str], optional): Folder of the result cache. Defaults to
+                ``service`` in the rewriter cache folder, or a temporary folder if caching is disabled.
+            max_results (int, optional): Results kept in the cache. Defaults to ``MAX_CACHED_RESULTS``.
+            rule_packs (Sequence[str], optional): Rule pack files or folders, see ``modules.rule_packs``.
+                Defaults to ().
+
+        Raises:
+            ValueError: If a rule pack is invalid.
+        """
+        if results_dir is None:
+            cache_dir = get_cache_dir()
+            results_dir = (
+                os.path.join(cache_dir, "service") if cache_dir else tempfile.mkdtemp(prefix="fivem-converter-")
+            )
+        os.makedirs(results_dir, exist_ok=True)
+        self.results_dir = results_dir
+        self.workers = max(1, workers)
+        self.max_results = max_results
+        self.patterns = load_conversion_patterns(rule_packs=rule_packs)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        # One pool per settings, its workers are initialized with the rules
+        self._pools: Dict[Tuple[str, bool, str], "ProcessPoolExecutor"] = {}
+        self._lock = threading.Lock()
+        # Result key -> responses streaming its archive, which pruning leaves alone
+        self._serving: Dict[str, int] = {}
+
+    def _settings(self, direction: str) -> Tuple[str, List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """Get the direction label, patterns and SQL patterns of a CLI direction name."""
+        label, pattern_key = DIRECTIONS[direction]
+        return label, self.patterns[pattern_key], sql_patterns_for(self.patterns, label)
+
+    def result_key(self, digest: str, direction: str, include_sql: bool, engine: str, loaded_only: bool) -> str:
+        """
+        Get the cache key of an upload converted with the given settings.
+
+        Args:
+            digest (str): The hex digest of the uploaded archive.
+            direction (str): The CLI direction name, a key of ``DIRECTIONS``.
+            include_sql (bool): Flag to include SQL patterns.
+            engine (str): The rewrite engine, one of ``ENGINES``.
+            loaded_only (bool): Only convert the scripts the resource manifests load.
+
+        Returns:
+            str: The key.
+        """
+        label, patterns, sql_patterns = self._settings(direction)
+        fingerprint = settings_fingerprint(patterns, label, include_sql, sql_patterns, engine=engine)
+        payload = json.dumps([digest, fingerprint, loaded_only])
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def result_paths(self, key: str) -> Tuple[str, str]:
+        """Get the archive and statistics files of a result."""
+        return os.path.join(self.results_dir, f"{key}.zip"), os.path.join(self.results_dir, f"{key}.json")
+
+    def cached(self, key: str) -> Optional[Dict[str, object]]:
+        """
+        Get the statistics of a cached result, marking it as recently used.
+
+        Args:
+            key (str): The result key.
+
+        Returns:
+            Optional[Dict[str, object]]: The statistics, or None if the result is not cached.
+        """
+        archive_path, stats_path = self.result_paths(key)
+        try:
+            with open(stats_path, "r", encoding="utf-8") as file:
+                stats = json.load(file)
+            os.utime(archive_path)
+        except (OSError, ValueError):
+            return None
+        return stats
+
+    def acquire(self, key: str):
+        """Protect a result from pruning while its archive is being sent; see ``release``."""
+        with self._lock:
+            self._serving[key] = self._serving.get(key, 0) + 1
+
+    def release(self, key: str):
+        """Let a result be pruned again once its archive has been sent."""
+        with self._lock:
+            self._serving[key] -= 1
+            if not self._serving[key]:
+                del self._serving[key]
+
+    def _pool(self, direction: str, include_sql: bool, engine: str) -> "ProcessPoolExecutor":
+        with self._lock:
+            pool = self._pools.get((direction, include_sql, engine))
+            if pool is None:
+                label, patterns, sql_patterns = self._settings(direction)
+                pool = self._pools[direction, include_sql, engine] = create_pool(
+                    self.workers, patterns, label, include_sql, sql_patterns, engine=engine, capture=True
+                )
+            return pool
+
+    def convert(
+        self,
+        upload_path: str,
+        key: str,
+        direction: str,
+        include_sql: bool = False,
+        engine: str = "text",
+        loaded_only: bool = False
+    ) -> Dict[str, object]:
+        """
+        Convert an uploaded archive into the result cache. Blocks while all slots are busy.
+
+        Args:
+            upload_path (str): The uploaded zip archive.
+            key (str): The result key from ``result_key``.
+            direction (str): The CLI direction name, a key of ``DIRECTIONS``.
+            include_sql (bool, optional): Flag to include SQL patterns. Defaults to False.
+            engine (str, optional): The rewrite engine, one of ``ENGINES``. Defaults to "text".
+            loaded_only (bool, optional): Only convert the scripts the resource manifests load.
+                Defaults to False.
+
+        Returns:
+            Dict[str, object]: The statistics of ``process_folder``.
+
+        Raises:
+            ValueError: If the upload is not a zip archive or exceeds the limits.
+        """
+        label, patterns, sql_patterns = self._settings(direction)
+        archive_path, stats_path = self.result_paths(key)
+        with self._slots, tempfile.TemporaryDirectory(dir=self.results_dir, prefix=".work-") as work_dir:
+            source = os.path.join(work_dir, "source")
+            # Never created, it only names the files in the archive
+            output_folder = os.path.join(work_dir, "output")
+            extract_archive(upload_path, source)
+            handle, temp_path = tempfile.mkstemp(prefix=".", suffix=".part", dir=self.results_dir)
+            try:
+                with open(handle, "wb") as file, ZipSink(file, output_folder) as sink:
+                    job = ConversionJob(
+                        source, patterns, label, include_sql, sql_patterns, workers=self.workers,
+                        output_folder=output_folder, executor=self._pool(direction, include_sql, engine),
+                        loaded_only=loaded_only, engine=engine, sink=sink
+                    )
+                    stats = job.run()
+                os.replace(temp_path, archive_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        with open(stats_path, "w", encoding="utf-8") as file:
+            json.dump(stats, file)
+        self._prune()
+        return stats
+
+    def _prune(self):
+        """Delete the least recently used results beyond ``max_results``, except those being sent."""
+        results = []
+        for entry in os.scandir(self.results_dir):
+            if entry.name.endswith(".zip") and not entry.name.startswith("."):
+                try:
+                    results.append((entry.stat().st_mtime, entry.name[:-len(".zip")]))
+                except OSError:
+                    continue
+        results.sort(reverse=True)
+        for _, key in results[self.max_results:]:
+            with self._lock:
+                if key in self._serving:
+                    continue
+            for path in self.result_paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def close(self):
+        """Shut the worker pools down."""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+            self._pools.clear()
+
+
+def extract_archive(archive_path: str, folder: str):
+    """
+    Extract an uploaded zip archive, refusing unsafe or oversized content.
+
+    Args:
+        archive_path (str): The zip archive.
+        folder (str): The folder to extract into.
+
+    Raises:
+        ValueError: If the file is not a zip archive, has members outside of the folder or
+            links, or exceeds ``MAX_ARCHIVE_FILES`` or ``MAX_EXTRACTED_BYTES``.
+    """
+    try:
+        archive = zipfile.ZipFile(archive_path)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"The upload is not a zip archive: {e}") from e
+    with archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) > MAX_ARCHIVE_FILES:
+            raise ValueError(f"The archive has more than {MAX_ARCHIVE_FILES} files")
+        if sum(info.file_size for info in members) > MAX_EXTRACTED_BYTES:
+            raise ValueError(f"The archive holds more than {MAX_EXTRACTED_BYTES} bytes")
+        root = os.path.abspath(folder)
+        for info in members:
+            target = os.path.abspath(os.path.join(root, *info.filename.split("/")))
+            if not target.startswith(root + os.sep):
+                raise ValueError(f"Unsafe path in the archive: {info.filename}")
+            if stat.S_ISLNK(info.external_attr >> 16):
+                raise ValueError(f"Links are not supported: {info.filename}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            written = 0
+            with archive.open(info) as source, open(target, "wb") as file:
+                # The sizes in the directory are not trusted, the content is counted as well
+                for chunk in iter(lambda: source.read(_CHUNK_SIZE), b""):
+                    written += len(chunk)
+                    if written > info.file_size:
+                        raise ValueError(f"The size of {info.filename} does not match the archive directory")
+                    file.write(chunk)
+
+
+def save_upload(stream: BinaryIO, path: str) -> str:
+    """
+    Copy an upload to a file while hashing it.
+
+    Args:
+        stream (BinaryIO): The uploaded content.
+        path (str): The file to write.
+
+    Returns:
+        str: The hex digest of the content.
+
+    Raises:
+        ValueError: If the upload is larger than ``MAX_UPLOAD_BYTES``.
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    size = 0
+    with open(path, "wb") as file:
+        for chunk in iter(lambda: stream.read(_CHUNK_SIZE), b""):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise ValueError(f"Uploads are limited to {MAX_UPLOAD_BYTES} bytes")
+            digest.update(chunk)
+            file.write(chunk)
+    return digest.hexdigest()
+
+
+def create_app(service: Optional[ConversionService] = None) -> FastAPI:
+    """
+    Create the FastAPI application of a conversion service.
+
+    Args:
+        service (Optional[ConversionService], optional): The service. Defaults to one with
+            the default settings.
+
+    Returns:
+        FastAPI: The application; its pools are shut down with it.
+    """
+    service = service or ConversionService()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        yield
+        service.close()
+
+    app = FastAPI(title="ESX/QB-Core Converter", lifespan=lifespan)
+    app.state.service = service
+
+    def result_response(key: str, stats: Dict[str, object], cache: str) -> FileResponse:
+        archive_path, _ = service.result_paths(key)
+        # Released once the archive has been sent, so pruning cannot delete it meanwhile
+        service.acquire(key)
+        return FileResponse(
+            archive_path,
+            media_type="application/zip",
+            filename=f"converted-{key}.zip",
+            headers={"X-Result-Key": key, "X-Cache": cache, "X-Conversion-Stats": json.dumps(stats)},
+            background=BackgroundTask(service.release, key)
+        )
+
+    @app.post("/convert")
+    async def convert(
+        file: UploadFile = File(..., description="The zipped resource."),
+        direction: str = Query("esx-to-qb", description=f"One of {', '.join(sorted(DIRECTIONS))}."),
+        sql: bool = Query(False, description="Include SQL patterns and convert SQL dumps."),
+        engine: str = Query("text", description=f"One of {', '.join(ENGINES)}."),
+        loaded_only: bool = Query(False, description="Only convert the scripts the manifests load.")
+    ) -> FileResponse:
+        """Convert a zipped resource and answer with the converted zip."""
+        if direction not in DIRECTIONS:
+            raise HTTPException(400, f"Unknown direction {direction!r}, expected one of {sorted(DIRECTIONS)}")
+        if engine not in ENGINES:
+            raise HTTPException(400, f"Unknown engine {engine!r}, expected one of {list(ENGINES)}")
+        handle, upload_path = tempfile.mkstemp(prefix=".upload-", suffix=".zip", dir=service.results_dir)
+        os.close(handle)
+        try:
+            # File writes block, they run on the thread pool rather than on the event loop
+            try:
+                digest = await run_in_threadpool(save_upload, file.file, upload_path)
+            except ValueError as e:
+                raise HTTPException(413, str(e)) from e
+
+            key = service.result_key(digest, direction, sql, engine, loaded_only)
+            stats = await run_in_threadpool(service.cached, key)
+            if stats is not None:
+                return result_response(key, stats, "hit")
+            try:
+                stats = await run_in_threadpool(service.convert, upload_path, key, direction, sql, engine, loaded_only)
+            except ValueError as e:
+                raise HTTPException(400, str(e)) from e
+            return result_response(key, stats, "miss")
+        finally:
+            os.remove(upload_path)
+
+    @app.get("/results/{key}")
+    async def result(key: str) -> Dict[str, object]:
+        """Get the statistics of a cached result."""
+        stats = service.cached(key) if key.isalnum() else None
+        if stats is None:
+            raise HTTPException(404, "Unknown result")
+        return {"key": key, "stats": stats}
+
+    @app.get("/results/{key}/archive")
+    async def result_archive(key: str) -> FileResponse:
+        """Download the converted zip of a cached result."""
+        stats = service.cached(key) if key.isalnum() else None
+        if stats is None:
+            raise HTTPException(404, "Unknown result")
+        return result_response(key, stats, "hit")
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Run the service with uvicorn.
+
+    Args:
+        argv (Optional[List[str]], optional): Command line arguments. Defaults to ``sys.argv[1:]``.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m modules.service", description="Serve ESX/QB-Core conversions over HTTP."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000).")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="Worker processes of each conversion pool, 0 for one per CPU (default: 1)."
+    )
+    parser.add_argument(
+        "--max-concurrent", type=int, default=MAX_CONCURRENT_CONVERSIONS,
+        help=f"Conversions running at the same time (default: {MAX_CONCURRENT_CONVERSIONS})."
+    )
+    parser.add_argument("--results-dir", help="Folder of the result cache.")
+    parser.add_argument(
+        "--rules", action="append", default=[], metavar="PATH",
+        help="Add the rules of a YAML rule pack, or of every pack in a folder. Repeatable."
+    )
+    args = parser.parse_args(argv)
+
+    # Imported here so the application can be embedded without uvicorn
+    import uvicorn
+
+    service = ConversionService(
+        args.workers if args.workers > 0 else (os.cpu_count() or 1), args.max_concurrent, args.results_dir,
+        rule_packs=args.rules
+    )
+    uvicorn.run(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Output sinks: write a conversion straight into an archive or memory instead of a folder.
+
+A conversion normally writes the output folder file by file. Given a sink,
+``ConversionJob`` (and ``process_folder`` and ``convert_resources``) hands every
+output file to the sink instead, so a deployable ``.zip`` or ``.tar.zst`` is produced
+in one pass, without a temporary tree:
+
+    with open_archive("qb-resource.zip", output_folder) as sink:
+        process_folder(folder, patterns, direction, False, [], output_folder=output_folder, sink=sink)
+
+Converted scripts come from the pool workers as bytes; unchanged scripts and assets
+are streamed from their source files. Zip archives store files that are compressed
+already, such as textures and audio, without compressing them again.
+
+Sinks are thread-safe, so resources converted in parallel can share one.
+"""
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, Optional, Union
+
+# Archive formats of ``open_archive`` by file extension
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.zst", ".tzst")
+# Files in these formats are compressed already; zip archives store them as they are
+STORED_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ogg", ".mp3", ".m4a", ".webm", ".mp4",
+    ".woff", ".woff2", ".zip", ".gz", ".7z", ".rar", ".zst",
+    # GTA V resources, compressed RSC7 containers and audio
+    ".ytd", ".ydr", ".ydd", ".yft", ".ybn", ".ycd", ".ymap", ".ytyp", ".ynv", ".awc", ".rpf",
+})
+# Streamed files larger than this are spooled to disk until their size is known
+_SPOOL_SIZE = 16 << 20
+
+
+class OutputSink:
+    """
+    Base class of the output sinks.
+
+    Output files are named by their path relative to the output folder, with ``/``
+    separators and below ``root``. Subclasses implement ``_write``, ``_copy`` and
+    ``_open``; the public methods serialize them.
+    """
+
+    def __init__(self, output_folder: str, root: str = ""):
+        """
+        Args:
+            output_folder (str): The output folder the conversion would write, which
+                the paths handed to the sink are relative to.
+            root (str, optional): Folder inside the sink holding the files. Defaults to "".
+        """
+        self.output_folder = os.path.abspath(output_folder)
+        self.root = root.strip("/")
+        self.files = 0
+        self._lock = threading.RLock()
+
+    def name(self, output_path: str) -> str:
+        """Get the name in the sink of an output file."""
+        rel_path = os.path.relpath(os.path.abspath(output_path), self.output_folder)
+        if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+            raise ValueError(f"{output_path} is outside of the output folder {self.output_folder}")
+        rel_path = rel_path.replace(os.sep, "/")
+        return f"{self.root}/{rel_path}" if self.root else rel_path
+
+    def write(self, output_path: str, data: bytes, source: str):
+        """
+        Add a converted file.
+
+        Args:
+            output_path (str): The path the file would have in the output folder.
+            data (bytes): The content.
+            source (str): The source file, whose permissions and modification time are kept.
+        """
+        with self._lock:
+            self._write(self.name(output_path), data, os.stat(source))
+            self.files += 1
+
+    def copy(self, output_path: str, source: str):
+        """
+        Add an unchanged file, streamed from its source.
+
+        Args:
+            output_path (str): The path the file would have in the output folder.
+            source (str): The source file.
+        """
+        with self._lock:
+            self._copy(self.name(output_path), source)
+            self.files += 1
+
+    @contextmanager
+    def open(self, output_path: str, source: str) -> Iterator[BinaryIO]:
+        """
+        Add a file by writing it to a stream, e.g. a converted SQL dump.
+
+        The sink is locked until the stream is closed.
+
+        Args:
+            output_path (str): The path the file would have in the output folder.
+            source (str): The source file, whose permissions and modification time are kept.
+
+        Yields:
+            BinaryIO: The stream receiving the content.
+        """
+        with self._lock:
+            with self._open(self.name(output_path), os.stat(source)) as stream:
+                yield stream
+            self.files += 1
+
+    def close(self):
+        """Finish the sink. Nothing can be added afterwards."""
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, name: str, data: bytes, stat: os.stat_result):
+        raise NotImplementedError
+
+    def _copy(self, name: str, source: str):
+        raise NotImplementedError
+
+    def _open(self, name: str, stat: os.stat_result):
+        raise NotImplementedError
+
+
+class ZipSink(OutputSink):
+    """Writes the output into a zip archive, also to unseekable streams such as pipes."""
+
+    def __init__(
+        self, file: Union[str, BinaryIO], output_folder: str, root: str = "", compresslevel: Optional[int] = None
+    ):
+        """
+        Args:
+            file (Union[str, BinaryIO]): Path of the archive, or a binary stream such as ``io.BytesIO``.
+            output_folder (str): The output folder the paths handed to the sink are relative to.
+            root (str, optional): Folder inside the archive holding the files. Defaults to "".
+            compresslevel (Optional[int], optional): Deflate level, 0 to 9. Defaults to zlib's default.
+        """
+        super().__init__(output_folder, root)
+        self.archive = zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+
+    def _info(self, name: str, stat: os.stat_result) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name, _zip_time(stat.st_mtime))
+        info.external_attr = (stat.st_mode & 0xFFFF) << 16
+        stored = os.path.splitext(name)[1].lower() in STORED_EXTENSIONS
+        info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+        info.file_size = stat.st_size
+        return info
+
+    def _write(self, name: str, data: bytes, stat: os.stat_result):
+        info = self._info(name, stat)
+        info.file_size = len(data)
+        self.archive.writestr(info, data)
+
+    def _copy(self, name: str, source: str):
+        with open(source, "rb") as file:
+            info = self._info(name, os.fstat(file.fileno()))
+            with self.archive.open(info, "w", force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) as target:
+                shutil.copyfileobj(file, target, 1 << 20)
+
+    @contextmanager
+    def _open(self, name: str, stat: os.stat_result) -> Iterator[BinaryIO]:
+        info = self._info(name, stat)
+        # The final size is unknown, so always leave room for Zip64 sizes
+        with self.archive.open(info, "w", force_zip64=True) as target:
+            yield target
+
+    def close(self):
+        with self._lock:
+            self.archive.close()
+
+
+class TarSink(OutputSink):
+    """Writes the output into a tar archive, plain, gzip or Zstandard compressed."""
+
+    def __init__(self, file: Union[str, BinaryIO], output_folder: str, root: str = "", compression: str = ""):
+        """
+        Args:
+            file (Union[str, BinaryIO]): Path of the archive, or a binary stream.
+            output_folder (str): The output folder the paths handed to the sink are relative to.
+            root (str, optional): Folder inside the archive holding the files. Defaults to "".
+            compression (str, optional): "", "gz" or "zst". Defaults to "".
+
+        Raises:
+            ValueError: For an unknown compression, or "zst" without the ``zstandard`` package.
+        """
+        super().__init__(output_folder, root)
+        if compression not in ("", "gz", "zst"):
+            raise ValueError(f"Unknown tar compression: {compression}")
+        zstandard = None
+        if compression == "zst":
+            try:
+                # Imported here so the other formats do not require zstandard
+                import zstandard
+            except ImportError as e:
+                raise ValueError("tar.zst archives need the zstandard package (pip install zstandard)") from e
+        self._file = open(file, "wb") if isinstance(file, str) else file
+        self._owns_file = isinstance(file, str)
+        self._compressor = None
+        stream = self._file
+        if zstandard is not None:
+            self._compressor = stream = zstandard.ZstdCompressor().stream_writer(self._file, closefd=False)
+        # Stream mode: members are written one after the other, without seeking
+        self.archive = tarfile.open(fileobj=stream, mode="w|gz" if compression == "gz" else "w|")
+
+    def _info(self, name: str, stat: os.stat_result, size: int) -> tarfile.TarInfo:
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(stat.st_mtime)
+        info.mode = stat.st_mode & 0o7777
+        return info
+
+    def _write(self, name: str, data: bytes, stat: os.stat_result):
+        self.archive.addfile(self._info(name, stat, len(data)), io.BytesIO(data))
+
+    def _copy(self, name: str, source: str):
+        with open(source, "rb") as file:
+            stat = os.fstat(file.fileno())
+            self.archive.addfile(self._info(name, stat, stat.st_size), file)
+
+    @contextmanager
+    def _open(self, name: str, stat: os.stat_result) -> Iterator[BinaryIO]:
+        # Tar headers come first and hold the size, so the content is spooled until it is complete
+        with tempfile.SpooledTemporaryFile(_SPOOL_SIZE) as spool:
+            yield spool
+            size = spool.tell()
+            spool.seek(0)
+            self.archive.addfile(self._info(name, stat, size), spool)
+
+    def close(self):
+        with self._lock:
+            self.archive.close()
+            if self._compressor is not None:
+                self._compressor.close()
+            if self._owns_file:
+                self._file.close()
+
+
+class MemorySink(OutputSink):
+    """Keeps the output in memory, e.g. for services returning the converted files."""
+
+    def __init__(self, output_folder: str, root: str = ""):
+        """
+        Args:
+            output_folder (str): The output folder the paths handed to the sink are relative to.
+            root (str, optional): Prefix of the file names. Defaults to "".
+        """
+        super().__init__(output_folder, root)
+        # File name -> content
+        self.contents: Dict[str, bytes] = {}
+
+    def _write(self, name: str, data: bytes, stat: os.stat_result):
+        self.contents[name] = bytes(data)
+
+    def _copy(self, name: str, source: str):
+        with open(source, "rb") as file:
+            self.contents[name] = file.read()
+
+    @contextmanager
+    def _open(self, name: str, stat: os.stat_result) -> Iterator[BinaryIO]:
+        buffer = io.BytesIO()
+        yield buffer
+        self.contents[name] = buffer.getvalue()
+
+
+def _zip_time(timestamp: float):
+    """Convert a timestamp to a zip date; zip archives cannot hold dates before 1980."""
+    date_time = time.localtime(timestamp)[:6]
+    return date_time if date_time[0] >= 1980 else (1980, 1, 1, 0, 0, 0)
+
+
+def open_archive(path: str, output_folder: str, root: Optional[str] = None) -> OutputSink:
+    """
+    Open an archive sink, picking the format from the file extension.
+
+    Args:
+        path (str): Path of the archive, one of ``ARCHIVE_EXTENSIONS``.
+        output_folder (str): The output folder the conversion would write.
+        root (Optional[str], optional): Folder inside the archive holding the files. Defaults to
+            the name of the output folder, as if the folder itself had been archived.
+
+    Returns:
+        OutputSink: The sink. The caller closes it.
+
+    Raises:
+        ValueError: If the extension is not an archive format, or tar.zst is not available.
+    """
+    if root is None:
+        root = os.path.basename(os.path.normpath(output_folder))
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        return ZipSink(path, output_folder, root)
+    if lower.endswith((".tar.zst", ".tzst")):
+        return TarSink(path, output_folder, root, "zst")
+    if lower.endswith((".tar.gz", ".tgz")):
+        return TarSink(path, output_folder, root, "gz")
+    if lower.endswith(".tar"):
+        return TarSink(path, output_folder, root)
+    raise ValueError(f"Unknown archive format of {path}, expected one of {', '.join(ARCHIVE_EXTENSIONS)}")
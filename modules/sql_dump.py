@@ -0,0 +1,823 @@
+"""
+Streaming conversion of SQL dumps between the ESX and QB-Core database schemas.
+
+Dumps are read in bounded chunks and written as they are converted, so memory use
+depends on the longest row, not on the size of the dump. ``CREATE TABLE`` statements
+of the converted tables (ESX ``users`` and ``owned_vehicles``, QB-Core ``players``
+and ``player_vehicles``) are replaced with the schema of the other framework, their
+rows are reshaped column by column, JSON columns included, and every other
+reference to the tables is renamed. All other statements are copied unchanged.
+
+Rows of a converted table are matched to its columns by the ``INSERT`` column list
+or, for dumps without column lists, by the ``CREATE TABLE`` statement found earlier
+in the dump.
+"""
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Callable, Dict, List, NamedTuple, Optional, TextIO, Tuple
+
+from modules.engine import Rewriter, compile_rules
+from modules.mirror import mirror_file, remove_file
+
+# Input is read at most this many characters at a time
+_READ_SIZE = 1 << 20
+# Largest row, or CREATE TABLE statement, of a converted table
+_MAX_STATEMENT = 64 << 20
+# Statement headers naming a converted table fit into this many characters
+_MAX_HEADER = 4096
+
+# SQL keywords followed by a table name, for renaming references to a converted table
+TABLE_KEYWORDS = ("EXISTS", "FROM", "INTO", "JOIN", "REFERENCES", "TABLE", "TABLES", "UPDATE")
+
+
+class Raw(str):
+    """An unquoted SQL value, such as a number, kept as written."""
+
+
+class TableConversion(NamedTuple):
+    """How the rows of one table are converted into another table."""
+
+    source: str
+    target: str
+    create: str
+    columns: Tuple[str, ...]
+    convert_row: Callable[[Dict[str, object], "CitizenIds"], Tuple[object, ...]]
+
+
+# Helpers for the row conversions
+def _decode(value: object) -> object:
+    """Decode a JSON column, returning None for NULL and invalid JSON."""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def _json(value: object, default: object) -> object:
+    """Decode a JSON column, returning ``default`` unless it holds a value of the same type."""
+    decoded = _decode(value)
+    return decoded if isinstance(decoded, type(default)) else default
+
+
+def _number(value: object, default: float = 0) -> float:
+    """Read a numeric column or JSON value, returning ``default`` if it is not a number."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return default
+        return int(number) if number.is_integer() else number
+    return default
+
+
+def _text(value: object) -> str:
+    return "" if value is None else str(value)
+
+
+_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def split_identifier(identifier: str) -> Tuple[int, str]:
+    """
+    Split an ESX identifier into the character number and the license hash.
+
+    Args:
+        identifier (str): ``hash``, ``license:hash`` or the multicharacter ``charN:hash``.
+
+    Returns:
+        Tuple[int, str]: The character number, 1 without a ``charN:`` prefix, and the hash.
+    """
+    match = re.match(r"char(\d+):(.*)", identifier, re.DOTALL)
+    if match:
+        return int(match.group(1)), match.group(2)
+    if identifier.startswith("license:"):
+        return 1, identifier[len("license:"):]
+    return 1, identifier
+
+
+def citizen_id(identifier: str, attempt: int = 0) -> str:
+    """
+    Derive a QB-Core citizen ID (three letters and five digits) from an ESX identifier.
+
+    The ID is a hash of the identifier, so the users of a dump and their vehicles get the
+    same citizen ID, also when they are converted separately. There are only about 1.8
+    billion IDs, so different identifiers can collide; ``CitizenIds`` derives another ID
+    with the next ``attempt`` then.
+    """
+    key = identifier if attempt == 0 else f"{identifier}#{attempt}"
+    digest = blake2b(key.encode("utf-8"), digest_size=8).digest()
+    letters = "".join(chr(65 + byte % 26) for byte in digest[:3])
+    return f"{letters}{int.from_bytes(digest[3:], 'big') % 100000:05d}"
+
+
+class CitizenIds:
+    """
+    The citizen IDs issued while converting one dump, unique per ESX identifier.
+
+    ``citizenid`` is the primary key of QB-Core ``players``, so an identifier whose ID is
+    taken already by another one gets the ID of its next attempt. Users and vehicles in
+    the same dump share the IDs, whichever comes first. Memory grows by one entry per
+    player.
+    """
+
+    def __init__(self):
+        # ESX identifier -> citizen ID, and back
+        self.issued: Dict[str, str] = {}
+        self._owners: Dict[str, str] = {}
+
+    def get(self, identifier: str) -> str:
+        """Get the citizen ID of an ESX identifier, issuing it on first use."""
+        issued = self.issued.get(identifier)
+        if issued is not None:
+            return issued
+        attempt = 0
+        issued = citizen_id(identifier)
+        while issued in self._owners:
+            attempt += 1
+            issued = citizen_id(identifier, attempt)
+        self.issued[identifier] = issued
+        self._owners[issued] = identifier
+        return issued
+
+
+def _esx_items(inventory: object, loadout: object) -> List[Dict[str, object]]:
+    """Build a QB-Core inventory from ESX items (name to count) and weapons."""
+    items: List[Dict[str, object]] = []
+    if isinstance(inventory, dict):
+        for name, count in inventory.items():
+            amount = _number(count.get("count") if isinstance(count, dict) else count)
+            if amount > 0:
+                items.append({"name": name, "amount": amount, "info": {}, "type": "item"})
+    elif isinstance(inventory, list):
+        for item in inventory:
+            if isinstance(item, dict) and item.get("name"):
+                amount = _number(item.get("count", item.get("amount", 1)), 1)
+                items.append({"name": item["name"], "amount": amount, "info": item.get("metadata") or {}, "type": "item"})
+
+    weapons = loadout.items() if isinstance(loadout, dict) else (
+        (weapon.get("name"), weapon) for weapon in loadout if isinstance(weapon, dict)
+    ) if isinstance(loadout, list) else ()
+    for name, weapon in weapons:
+        if not name:
+            continue
+        weapon = weapon if isinstance(weapon, dict) else {}
+        items.append({
+            "name": str(name).lower(),
+            "amount": 1,
+            "info": {"ammo": _number(weapon.get("ammo")), "attachments": []},
+            "type": "weapon",
+        })
+    for slot, item in enumerate(items, 1):
+        item["slot"] = slot
+    return items
+
+
+def _esx_user_to_qb(row: Dict[str, object], ids: CitizenIds) -> Tuple[object, ...]:
+    identifier = _text(row.get("identifier"))
+    cid, license_hash = split_identifier(identifier)
+    accounts = _json(row.get("accounts"), {})
+    position = _json(row.get("position"), {})
+    firstname, lastname = _text(row.get("firstname")), _text(row.get("lastname"))
+    job_name = _text(row.get("job")) or "unemployed"
+    grade = _number(row.get("job_grade"))
+    metadata: Dict[str, object] = {"isdead": bool(_number(row.get("is_dead")))}
+    black_money = _number(accounts.get("black_money"))
+    if black_money:
+        metadata["black_money"] = black_money
+
+    return (
+        ids.get(identifier),
+        cid,
+        f"license:{license_hash}",
+        f"{firstname} {lastname}".strip() or license_hash,
+        _dumps({
+            "cash": _number(accounts.get("money", row.get("money"))),
+            "bank": _number(accounts.get("bank", row.get("bank"))),
+            "crypto": 0,
+        }),
+        _dumps({
+            "firstname": firstname,
+            "lastname": lastname,
+            "birthdate": _text(row.get("dateofbirth")),
+            "gender": 0 if _text(row.get("sex")).lower() in ("m", "male", "0") else 1,
+            "nationality": "",
+            "phone": _text(row.get("phone_number")),
+            "account": "",
+        }),
+        _dumps({
+            "name": job_name,
+            "label": job_name.capitalize(),
+            "payment": 0,
+            "onduty": True,
+            "isboss": False,
+            "grade": {"name": str(grade), "level": grade},
+        }),
+        _dumps({"name": "none", "label": "No Gang Affiliation", "isboss": False, "grade": {"name": "none", "level": 0}}),
+        _dumps({axis: _number(position.get(axis)) for axis in ("x", "y", "z")}),
+        _dumps(metadata),
+        _dumps(_esx_items(_decode(row.get("inventory")), _decode(row.get("loadout")))),
+    )
+
+
+def _esx_vehicle_to_qb(row: Dict[str, object], ids: CitizenIds) -> Tuple[object, ...]:
+    owner = _text(row.get("owner"))
+    props = _json(row.get("vehicle"), {})
+    model = props.get("model")
+    return (
+        f"license:{split_identifier(owner)[1]}",
+        ids.get(owner),
+        # ESX only stores the model hash, the spawn name is not known
+        None if model is None else str(model),
+        None if model is None else str(model),
+        row.get("vehicle"),
+        row.get("plate"),
+        row.get("parking", row.get("garage")),
+        _number(props.get("fuelLevel"), 100),
+        _number(props.get("engineHealth"), 1000),
+        _number(props.get("bodyHealth"), 1000),
+        1 if _number(row.get("stored")) else 0,
+    )
+
+
+def _qb_identifier(license_id: str, cid: object = 1) -> str:
+    """Build the ESX identifier of a QB-Core character; further characters get a ``charN:`` prefix."""
+    license_hash = split_identifier(license_id)[1]
+    cid = _number(cid, 1)
+    return license_hash if cid in (0, 1) else f"char{cid}:{license_hash}"
+
+
+def _qb_player_to_esx(row: Dict[str, object], ids: CitizenIds) -> Tuple[object, ...]:
+    money = _json(row.get("money"), {})
+    charinfo = _json(row.get("charinfo"), {})
+    job = _json(row.get("job"), {})
+    position = _json(row.get("position"), {})
+    metadata = _json(row.get("metadata"), {})
+    grade = job.get("grade")
+
+    inventory: Dict[str, float] = {}
+    loadout: Dict[str, object] = {}
+    for item in _json(row.get("inventory"), []):
+        if not isinstance(item, dict) or not item.get("name"):
+            continue
+        if item.get("type") == "weapon":
+            info = item.get("info") if isinstance(item.get("info"), dict) else {}
+            loadout[str(item["name"]).upper()] = {"ammo": _number(info.get("ammo")), "components": [], "tintIndex": 0}
+        else:
+            inventory[item["name"]] = inventory.get(item["name"], 0) + _number(item.get("amount"), 1)
+
+    return (
+        _qb_identifier(_text(row.get("license")), row.get("cid")),
+        _dumps({
+            "money": _number(money.get("cash")),
+            "bank": _number(money.get("bank")),
+            "black_money": _number(metadata.get("black_money")),
+        }),
+        "user",
+        _dumps(inventory),
+        job.get("name") or "unemployed",
+        _number(grade.get("level") if isinstance(grade, dict) else grade),
+        _dumps(loadout),
+        _dumps({**{axis: _number(position.get(axis)) for axis in ("x", "y", "z")}, "heading": 0.0}),
+        charinfo.get("firstname"),
+        charinfo.get("lastname"),
+        charinfo.get("birthdate"),
+        "m" if _number(charinfo.get("gender")) == 0 else "f",
+        1 if metadata.get("isdead") else 0,
+        charinfo.get("phone") or None,
+    )
+
+
+def _qb_vehicle_to_esx(row: Dict[str, object], ids: CitizenIds) -> Tuple[object, ...]:
+    props = _json(row.get("mods"), {})
+    if row.get("hash") is not None:
+        props["model"] = _number(row["hash"], props.get("model"))
+    if row.get("plate") is not None:
+        props["plate"] = row["plate"]
+    return (
+        # The character number is not stored with QB-Core vehicles
+        _qb_identifier(_text(row.get("license"))),
+        row.get("plate"),
+        _dumps(props),
+        "car",
+        1 if _number(row.get("state")) == 1 else 0,
+    )
+
+
+_QB_PLAYERS = """CREATE TABLE IF NOT EXISTS `players` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `citizenid` varchar(50) NOT NULL,
+  `cid` int(11) DEFAULT NULL,
+  `license` varchar(255) NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `money` text NOT NULL,
+  `charinfo` text DEFAULT NULL,
+  `job` text NOT NULL,
+  `gang` text DEFAULT NULL,
+  `position` text NOT NULL,
+  `metadata` text NOT NULL,
+  `inventory` longtext DEFAULT NULL,
+  `last_updated` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`citizenid`),
+  KEY `id` (`id`),
+  KEY `last_updated` (`last_updated`),
+  KEY `license` (`license`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"""
+
+_QB_PLAYER_VEHICLES = """CREATE TABLE IF NOT EXISTS `player_vehicles` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `license` varchar(50) DEFAULT NULL,
+  `citizenid` varchar(50) DEFAULT NULL,
+  `vehicle` varchar(50) DEFAULT NULL,
+  `hash` varchar(50) DEFAULT NULL,
+  `mods` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin DEFAULT NULL,
+  `plate` varchar(50) NOT NULL,
+  `fakeplate` varchar(50) DEFAULT NULL,
+  `garage` varchar(50) DEFAULT NULL,
+  `fuel` int(11) DEFAULT 100,
+  `engine` float DEFAULT 1000,
+  `body` float DEFAULT 1000,
+  `state` int(11) DEFAULT 1,
+  `depotprice` int(11) NOT NULL DEFAULT 0,
+  `drivingdistance` int(50) DEFAULT NULL,
+  `status` text DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `plate` (`plate`),
+  KEY `citizenid` (`citizenid`),
+  KEY `license` (`license`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"""
+
+_ESX_USERS = """CREATE TABLE IF NOT EXISTS `users` (
+  `identifier` varchar(60) NOT NULL,
+  `accounts` longtext DEFAULT NULL,
+  `group` varchar(50) DEFAULT 'user',
+  `inventory` longtext DEFAULT NULL,
+  `job` varchar(20) DEFAULT 'unemployed',
+  `job_grade` int(11) DEFAULT 0,
+  `loadout` longtext DEFAULT NULL,
+  `position` longtext DEFAULT NULL,
+  `firstname` varchar(16) DEFAULT NULL,
+  `lastname` varchar(16) DEFAULT NULL,
+  `dateofbirth` varchar(10) DEFAULT NULL,
+  `sex` varchar(1) DEFAULT NULL,
+  `height` int(11) DEFAULT NULL,
+  `skin` longtext DEFAULT NULL,
+  `status` longtext DEFAULT NULL,
+  `is_dead` tinyint(1) DEFAULT 0,
+  `phone_number` varchar(20) DEFAULT NULL,
+  PRIMARY KEY (`identifier`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"""
+
+_ESX_OWNED_VEHICLES = """CREATE TABLE IF NOT EXISTS `owned_vehicles` (
+  `owner` varchar(60) NOT NULL,
+  `plate` varchar(12) NOT NULL,
+  `vehicle` longtext DEFAULT NULL,
+  `type` varchar(20) NOT NULL DEFAULT 'car',
+  `stored` tinyint(1) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`plate`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"""
+
+
+# Converted tables by conversion direction
+TABLE_CONVERSIONS: Dict[str, List[TableConversion]] = {
+    "ESX to QB-Core": [
+        TableConversion(
+            "users", "players", _QB_PLAYERS,
+            ("citizenid", "cid", "license", "name", "money", "charinfo", "job", "gang", "position", "metadata",
+             "inventory"),
+            _esx_user_to_qb,
+        ),
+        TableConversion(
+            "owned_vehicles", "player_vehicles", _QB_PLAYER_VEHICLES,
+            ("license", "citizenid", "vehicle", "hash", "mods", "plate", "garage", "fuel", "engine", "body", "state"),
+            _esx_vehicle_to_qb,
+        ),
+    ],
+    "QB-Core to ESX": [
+        TableConversion(
+            "players", "users", _ESX_USERS,
+            ("identifier", "accounts", "group", "inventory", "job", "job_grade", "loadout", "position", "firstname",
+             "lastname", "dateofbirth", "sex", "is_dead", "phone_number"),
+            _qb_player_to_esx,
+        ),
+        TableConversion(
+            "player_vehicles", "owned_vehicles", _ESX_OWNED_VEHICLES,
+            ("owner", "plate", "vehicle", "type", "stored"),
+            _qb_vehicle_to_esx,
+        ),
+    ],
+}
+
+
+# SQL literals
+_STRING = r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\""
+_TUPLE = re.compile(rf"(\s*)\(((?:{_STRING}|[^'\"()])*)\)", re.DOTALL)
+_VALUE = re.compile(rf"\s*({_STRING}|[^,'\"]+?)\s*(?:,|\Z)", re.DOTALL)
+_SEPARATOR = re.compile(r"\s*([,;])")
+_UNESCAPE = re.compile(r"\\(.)|''|\"\"", re.DOTALL)
+_UNESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+_ESCAPE = re.compile(r"[\\\0\n\r\x1a'\"]")
+# Backslashes first, the other escapes add them
+_ESCAPES = (("\\", "\\\\"), ("\0", "\\0"), ("\n", "\\n"), ("\r", "\\r"), ("\x1a", "\\Z"), ("'", "\\'"), ('"', '\\"'))
+_COLUMN = re.compile(r"\s*`([^`]+)`")
+
+_NAME = r"`?([A-Za-z0-9_$]+)`?"
+_STATEMENT = re.compile(
+    rf"[ \t]*(?:(?P<insert>(?:INSERT(?:\s+IGNORE)?|REPLACE)\s+INTO)\s+{_NAME}\s*(?:\((?P<columns>[^)]*)\))?\s*VALUES"
+    rf"|(?P<create>CREATE\s+TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+{_NAME}"
+    rf"|(?P<alter>ALTER\s+TABLE)\s+{_NAME})",
+    re.IGNORECASE
+)
+
+
+def _unescape(match: "re.Match[str]") -> str:
+    escaped = match.group(1)
+    return _UNESCAPES.get(escaped, escaped) if escaped is not None else match.group(0)[0]
+
+
+def parse_values(row: str) -> List[object]:
+    """
+    Parse the values of one row of an ``INSERT`` statement.
+
+    Args:
+        row (str): The text between the parentheses of the row.
+
+    Returns:
+        List[object]: Strings unescaped as ``str``, NULL as None and any other value
+        as ``Raw`` text.
+
+    Raises:
+        ValueError: If the row is not a list of SQL literals.
+    """
+    values: List[object] = []
+    position = 0
+    while position < len(row):
+        match = _VALUE.match(row, position)
+        if match is None:
+            raise ValueError(f"Cannot parse row values: {row[:80]!r}")
+        token = match.group(1)
+        if token[0] in "'\"":
+            text = token[1:-1]
+            if "\\" in text or token[0] in text:
+                text = _UNESCAPE.sub(_unescape, text)
+            values.append(text)
+        elif token.upper() == "NULL":
+            values.append(None)
+        else:
+            values.append(Raw(token))
+        position = match.end()
+    return values
+
+
+def format_value(value: object) -> str:
+    """Write a value as an SQL literal, escaped like ``mysqldump``."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, Raw):
+        return value
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value)
+    if _ESCAPE.search(text):
+        for char, escaped in _ESCAPES:
+            text = text.replace(char, escaped)
+    return "'" + text + "'"
+
+
+@lru_cache(maxsize=None)
+def table_renamer(direction: str) -> Rewriter:
+    """
+    Build the rewriter renaming references to the converted tables of a direction.
+
+    Names are only renamed quoted (``\\`users\\```) or after one of ``TABLE_KEYWORDS``,
+    so columns and data that happen to contain a table's name are kept.
+    """
+    rules: List[Tuple[str, str]] = []
+    for conversion in TABLE_CONVERSIONS.get(direction, []):
+        rules.append((f"`{conversion.source}`", f"`{conversion.target}`"))
+        for keyword in TABLE_KEYWORDS:
+            for spelling in (keyword, keyword.lower()):
+                rules.append((f"{spelling} {conversion.source} ", f"{spelling} {conversion.target} "))
+                rules.append((f"{spelling} {conversion.source}(", f"{spelling} {conversion.target}("))
+                rules.append((f"{spelling} {conversion.source};", f"{spelling} {conversion.target};"))
+    return compile_rules(rules)
+
+
+class _StreamRenamer:
+    """Applies a rewriter to text arriving in pieces, holding back what a rule may still match."""
+
+    def __init__(self, rewriter: Rewriter, hits: Optional[Dict[str, int]] = None):
+        self.rewriter = rewriter
+        self.hits = hits
+        self.keep = max((len(old) for old in rewriter.table), default=1) - 1
+        self.pending = ""
+        self.changed = False
+
+    def feed(self, text: str, final: bool = False) -> str:
+        text = self.pending + text
+        # Patterns hold no line breaks, so nothing before the last one can match later
+        if final or text.endswith("\n") or self.keep <= 0:
+            cut = len(text)
+        else:
+            cut = max(text.rfind("\n") + 1, len(text) - self.keep)
+        self.pending = text[cut:]
+        if not cut:
+            return ""
+        head = text[:cut]
+        if not any(anchor in head for anchor in self.rewriter.anchors):
+            return head
+        converted = self.rewriter.sub(head, self.hits)
+        self.changed = self.changed or converted != head
+        return converted
+
+
+class SqlDumpConverter:
+    """
+    Converts an SQL dump fed in pieces of any size.
+
+    ``feed`` and ``close`` return the converted text for everything they were given so
+    far; text that may still be part of a pattern or a row is held back until later.
+    """
+
+    def __init__(self, direction: str, hits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+            hits (Optional[Dict[str, int]], optional): Receives the number of renamed
+                references by pattern and of converted rows by ``"source -> target"``.
+                Defaults to None.
+        """
+        self.conversions = {conversion.source.lower(): conversion for conversion in TABLE_CONVERSIONS.get(direction, [])}
+        self.hits = hits
+        self.renamer = _StreamRenamer(table_renamer(direction), hits)
+        self.columns: Dict[str, List[str]] = {}
+        self.rows = 0
+        self.citizen_ids = CitizenIds()
+        self._changed = False
+        self._line_start = True
+        self._state: Optional[str] = None
+        self._buffer = ""
+        self._conversion: Optional[TableConversion] = None
+        self._source_columns: List[str] = []
+        self._expect_row = True
+        self._statement: List[str] = []
+        self._statement_size = 0
+        self._statement_line = ""
+        self._head = ""
+
+    @property
+    def changed(self) -> bool:
+        """Whether anything was converted so far."""
+        return self._changed or self.renamer.changed
+
+    def feed(self, text: str) -> str:
+        """Convert the next piece of the dump."""
+        out: List[str] = []
+        text = self._head + text
+        self._head = ""
+        while text:
+            if self._state == "insert":
+                text = self._feed_insert(text, out)
+                continue
+            if self._state is not None:
+                text = self._feed_statement(text, out)
+                continue
+            if self._line_start:
+                if "\n" not in text and len(text) < _MAX_HEADER:
+                    # Wait for the whole header before deciding on the statement
+                    self._head = text
+                    break
+                rest = self._start_statement(text, out)
+                if rest is not None:
+                    text = rest
+                    continue
+            newline = text.find("\n") + 1 or len(text)
+            out.append(self.renamer.feed(text[:newline]))
+            self._line_start = text[newline - 1] == "\n"
+            text = text[newline:]
+        return "".join(out)
+
+    def close(self) -> str:
+        """
+        Finish the dump.
+
+        Raises:
+            ValueError: If the dump ends inside a statement of a converted table.
+        """
+        if self._state is not None:
+            table = self._conversion.source if self._conversion else "a converted table"
+            raise ValueError(f"The dump ends inside a statement of `{table}`")
+        head, self._head = self._head, ""
+        return self.renamer.feed(head, final=True)
+
+    def _start_statement(self, text: str, out: List[str]) -> Optional[str]:
+        """Begin a statement on a converted table, returning the rest of ``text``, or None."""
+        match = _STATEMENT.match(text)
+        if match is None:
+            return None
+        table = match.group(2) or match.group(5) or match.group(7)
+        conversion = self.conversions.get(table.lower())
+        if conversion is None:
+            return None
+
+        out.append(self.renamer.feed("", final=True))
+        self._conversion = conversion
+        self._changed = True
+        if match.group("insert"):
+            if match.group("columns") is not None:
+                self._source_columns = [column.strip().strip("`") for column in match.group("columns").split(",")]
+            elif table.lower() in self.columns:
+                self._source_columns = self.columns[table.lower()]
+            else:
+                raise ValueError(
+                    f"The columns of `{table}` are unknown: the dump needs its CREATE TABLE statement "
+                    "or INSERT statements with column lists"
+                )
+            columns = ", ".join(f"`{column}`" for column in conversion.columns)
+            out.append(f"{match.group('insert')} `{conversion.target}` ({columns}) VALUES")
+            self._state = "insert"
+            self._expect_row = True
+        else:
+            self._state = "create" if match.group("create") else "alter"
+            self._statement = [text[:match.end()]]
+            self._statement_size = match.end()
+            self._statement_line = text[:match.end()]
+        return text[match.end():]
+
+    def _feed_statement(self, text: str, out: List[str]) -> str:
+        """Collect a CREATE TABLE or ALTER TABLE statement up to the end of its last line."""
+        newline = text.find("\n") + 1 or len(text)
+        line, rest = text[:newline], text[newline:]
+        self._statement.append(line)
+        self._statement_size += len(line)
+        if self._statement_size > _MAX_STATEMENT:
+            raise ValueError(f"The statement on `{self._conversion.source}` is too large")
+        self._statement_line += line
+        if not line.endswith("\n"):
+            return rest
+        last_line, self._statement_line = self._statement_line, ""
+        if not last_line.rstrip().endswith(";"):
+            return rest
+
+        statement = "".join(self._statement)
+        self._statement = []
+        conversion = self._conversion
+        if self._state == "create":
+            self.columns[conversion.source.lower()] = [
+                match.group(1) for match in map(_COLUMN.match, statement.splitlines()[1:]) if match
+            ]
+            out.append(conversion.create + "\n")
+        else:
+            # The new schema has its own keys, the source table's ones do not apply
+            out.append(f"-- ALTER TABLE of `{conversion.source}` dropped, `{conversion.target}` is created with its keys\n")
+        self._state = None
+        self._line_start = True
+        return rest
+
+    def _feed_insert(self, text: str, out: List[str]) -> str:
+        """Convert the rows of an INSERT statement as they become complete."""
+        buffer = self._buffer + text
+        position = 0
+        conversion = self._conversion
+        while True:
+            if self._expect_row:
+                match = _TUPLE.match(buffer, position)
+                if match is None:
+                    if buffer[position:].lstrip() and not buffer[position:].lstrip().startswith("("):
+                        raise ValueError(f"Cannot parse a row of `{conversion.source}`: {buffer[position:position + 80]!r}")
+                    break
+                values = parse_values(match.group(2))
+                if len(values) != len(self._source_columns):
+                    raise ValueError(
+                        f"A row of `{conversion.source}` has {len(values)} values for {len(self._source_columns)} columns"
+                    )
+                converted = conversion.convert_row(dict(zip(self._source_columns, values)), self.citizen_ids)
+                out.append(f"{match.group(1)}({','.join(format_value(value) for value in converted)})")
+                self.rows += 1
+                if self.hits is not None:
+                    key = f"{conversion.source} -> {conversion.target}"
+                    self.hits[key] = self.hits.get(key, 0) + 1
+                position = match.end()
+                self._expect_row = False
+            else:
+                match = _SEPARATOR.match(buffer, position)
+                if match is None:
+                    if buffer[position:].strip():
+                        raise ValueError(f"Cannot parse the rows of `{conversion.source}`: {buffer[position:position + 80]!r}")
+                    break
+                out.append(match.group(0))
+                position = match.end()
+                if match.group(1) == ";":
+                    self._state = None
+                    self._line_start = False
+                    self._buffer = ""
+                    return buffer[position:]
+                self._expect_row = True
+
+        self._buffer = buffer[position:]
+        if len(self._buffer) > _MAX_STATEMENT:
+            raise ValueError(f"A row of `{conversion.source}` is too large")
+        return ""
+
+
+def convert_sql_stream(
+    source: TextIO,
+    target: TextIO,
+    direction: str,
+    hits: Optional[Dict[str, int]] = None
+) -> bool:
+    """
+    Convert an SQL dump from one open file to another.
+
+    Args:
+        source (TextIO): The dump, opened with ``newline=""`` to keep its line breaks.
+        target (TextIO): Receives the converted dump.
+        direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+        hits (Optional[Dict[str, int]], optional): Receives renamed references and converted
+            rows, see ``SqlDumpConverter``. Defaults to None.
+
+    Returns:
+        bool: True if anything was converted.
+
+    Raises:
+        ValueError: If a statement of a converted table cannot be parsed.
+    """
+    converter = SqlDumpConverter(direction, hits)
+    for chunk in iter(lambda: source.readline(_READ_SIZE), ""):
+        target.write(converter.feed(chunk))
+    target.write(converter.close())
+    return converter.changed
+
+
+def _mentions_tables(input_path: str, direction: str) -> bool:
+    """Check the raw bytes of a dump for the name of any converted table."""
+    names = [conversion.source.encode("ascii") for conversion in TABLE_CONVERSIONS.get(direction, [])]
+    with open(input_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return any(view.find(name) != -1 for name in names)
+
+
+def convert_sql_file(
+    input_path: str,
+    output_path: str,
+    direction: str,
+    mirror_mode: str = "auto",
+    hits: Optional[Dict[str, int]] = None
+) -> str:
+    """
+    Convert an SQL dump file, streaming it to a temporary file next to the output.
+
+    Args:
+        input_path (str): Path to the dump.
+        output_path (str): Path of the converted dump.
+        direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+        mirror_mode (str, optional): How a dump without converted tables is mirrored.
+            Defaults to "auto".
+        hits (Optional[Dict[str, int]], optional): Receives renamed references and converted
+            rows, see ``SqlDumpConverter``. Defaults to None.
+
+    Returns:
+        str: "converted" if the dump changed, "skipped" if nothing was converted, or
+        "prefiltered" if it does not mention any converted table.
+
+    Raises:
+        ValueError: If a statement of a converted table cannot be parsed.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if not _mentions_tables(input_path, direction):
+        mirror_file(input_path, output_path, mirror_mode)
+        return "prefiltered"
+
+    handle, temp_path = tempfile.mkstemp(
+        prefix=".", suffix=".part", dir=os.path.dirname(output_path) or "."
+    )
+    try:
+        with open(input_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as source, \
+                open(handle, "w", encoding="utf-8", errors="surrogateescape", newline="") as target:
+            changed = convert_sql_stream(source, target, direction, hits)
+        if changed:
+            shutil.copymode(input_path, temp_path)
+            # Replace rather than overwrite, the output may be a hard link to the source
+            remove_file(output_path)
+            os.replace(temp_path, output_path)
+            return "converted"
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    mirror_file(input_path, output_path, mirror_mode)
+    return "skipped"
@@ -0,0 +1,407 @@
+"""
+Index of the framework API call sites of a resources tree.
+
+Before converting a server it helps to know where every ESX and QB-Core API is
+used, and which of those uses no conversion rule covers. ``SymbolIndex`` scans the
+Lua files of a tree once, on several processes, and keeps an inverted index from
+framework symbols to the lines using them:
+
+    index = SymbolIndex("resources")
+    index.update(workers=4)
+    index.save()
+    index.lookup("ESX.GetPlayerFromId")     # [("esx_jobs/server.lua", 12), ...]
+    index.unmapped(patterns["ESX_to_QB_Core"], "ESX to QB-Core")
+
+Indexed symbols are the members of ``ESX``, ``xPlayer``, ``QBCore.Functions`` and
+``Player.Functions``, ``MySQL`` calls and ``esx:``/``QBCore:`` event names. The index
+is saved as JSON in the rewriter cache folder (see ``modules.cache``) by default, so
+it is not mirrored into conversion outputs, with the size and modification time of
+every file; later updates only rescan changed files.
+
+From the command line, ``python -m modules.symbols resources --unmapped`` updates
+the index and ranks the symbols the ESX to QB-Core rules do not convert.
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from modules.cache import get_cache_dir
+from modules.engine import compile_rules
+from modules.mirror import scan_tree
+
+INDEX_NAME = ".symbol-index.json"
+# Bump when the indexed symbols or the layout of the index change
+INDEX_VERSION = 1
+
+# One expression per framework prefix: an expression starting with a literal is
+# searched for with a fast substring search, a combined one is tried at every byte
+SYMBOL_REGEXES = tuple(re.compile(pattern) for pattern in (
+    rb"ESX(?:\.[A-Za-z_]\w*)+",
+    rb"xPlayer[.:][A-Za-z_]\w*",
+    rb"QBCore\.Functions\.[A-Za-z_]\w*",
+    rb"Player\.Functions\.[A-Za-z_]\w*",
+    rb"MySQL(?:\.[A-Za-z_]\w*)+",
+    rb"esx:[A-Za-z_][\w:]*",
+    rb"QBCore:[A-Za-z_][\w:]*",
+))
+# Symbols are not part of a longer name, nor of a file path such as "@oxmysql/lib/MySQL.lua"
+_NOT_BEFORE = frozenset(b"/_0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+# Framework of a symbol by its first characters; "any" symbols belong to both
+FRAMEWORKS = (("ESX", "esx"), ("xPlayer", "esx"), ("esx:", "esx"), ("MySQL", "any"))
+# Members of QB-Core player objects; scripts often name those ``xPlayer`` too
+QB_PLAYER_MEMBERS = frozenset(("PlayerData", "Functions", "citizenid"))
+# The frameworks whose symbols each conversion direction converts
+DIRECTION_FRAMEWORKS: Dict[str, Tuple[str, ...]] = {
+    "ESX to QB-Core": ("esx", "any"),
+    "QB-Core to ESX": ("qb", "any"),
+}
+
+
+def symbol_framework(symbol: str) -> str:
+    """
+    Get the framework of an indexed symbol.
+
+    Args:
+        symbol (str): The symbol, e.g. "ESX.GetPlayerFromId" or "QBCore:Notify".
+
+    Returns:
+        str: "esx", "qb", or "any" for the ``MySQL`` APIs both frameworks use. ``xPlayer``
+        members of ``QB_PLAYER_MEMBERS`` are "qb".
+    """
+    if symbol.startswith("xPlayer") and symbol[len("xPlayer") + 1:] in QB_PLAYER_MEMBERS:
+        return "qb"
+    for prefix, framework in FRAMEWORKS:
+        if symbol.startswith(prefix):
+            return framework
+    return "qb"
+
+
+def default_index_path(folder: str) -> str:
+    """
+    Get the default index file of a folder.
+
+    Args:
+        folder (str): The indexed folder.
+
+    Returns:
+        str: A file in the cache folder keyed by the absolute path of the folder, or
+        ``INDEX_NAME`` in the folder itself if caching is disabled.
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return os.path.join(folder, INDEX_NAME)
+    key = hashlib.blake2b(os.path.abspath(folder).encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(cache_dir, f"symbols-{key}.json")
+
+
+def scan_symbols(path: str) -> Dict[str, List[int]]:
+    """
+    Find the framework symbols used in a file.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        Dict[str, List[int]]: The line numbers, in order and without duplicates, of every symbol.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    found = sorted(
+        (match.start(), match.group())
+        for regex in SYMBOL_REGEXES
+        for match in regex.finditer(data)
+        if match.start() == 0 or data[match.start() - 1] not in _NOT_BEFORE
+    )
+    symbols: Dict[str, List[int]] = {}
+    line = 1
+    position = 0
+    for start, symbol in found:
+        line += data.count(b"\n", position, start)
+        position = start
+        lines = symbols.setdefault(symbol.decode("ascii"), [])
+        if not lines or lines[-1] != line:
+            lines.append(line)
+    return symbols
+
+
+def _scan_entry(entry: Tuple[str, str]) -> Tuple[str, Optional[Dict[str, List[int]]]]:
+    """Scan one ``(rel_path, path)`` entry in a pool worker; unreadable files give None."""
+    rel_path, path = entry
+    try:
+        return rel_path, scan_symbols(path)
+    except OSError:
+        return rel_path, None
+
+
+class SymbolIndex:
+    """The inverted index of the framework symbols of a folder, kept in sync by ``update``."""
+
+    def __init__(self, folder: str, path: Optional[str] = None):
+        """
+        Load the index of a folder, if it has been saved before.
+
+        Args:
+            folder (str): The indexed folder, e.g. a ``resources/`` directory.
+            path (Optional[str], optional): The index file. Defaults to ``default_index_path(folder)``.
+        """
+        self.folder = folder
+        self.path = path or default_index_path(folder)
+        # Relative file path -> {"size", "mtime_ns", "symbols"}
+        self.files: Dict[str, Dict[str, object]] = {}
+        # Symbol -> relative file path -> line numbers
+        self.symbols: Dict[str, Dict[str, List[int]]] = {}
+        self._sorted: Optional[List[str]] = None
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.files = dict(data.get("files", {}))
+            self.symbols = dict(data.get("symbols", {}))
+
+    def _remove(self, rel_path: str):
+        """Drop the postings of a file."""
+        entry = self.files.pop(rel_path, None)
+        if entry is None:
+            return
+        for symbol in entry["symbols"]:
+            postings = self.symbols.get(symbol, {})
+            postings.pop(rel_path, None)
+            if not postings:
+                self.symbols.pop(symbol, None)
+
+    def update(self, workers: int = 1) -> Dict[str, int]:
+        """
+        Bring the index in sync with the folder.
+
+        Files whose size and modification time match the index are not read again;
+        changed and new files are scanned, in parallel with ``workers`` > 1, and the
+        postings of deleted files are dropped.
+
+        Args:
+            workers (int, optional): Number of worker processes. Defaults to 1.
+
+        Returns:
+            Dict[str, int]: The number of files scanned, unchanged, removed and failed.
+        """
+        stats = {"files": 0, "scanned_files": 0, "unchanged_files": 0, "removed_files": 0, "error_files": 0}
+        stamps: Dict[str, Tuple[int, int]] = {}
+        for rel_dir, entry in scan_tree(self.folder):
+            if not entry.name.endswith(".lua"):
+                continue
+            rel_path = f"{rel_dir}/{entry.name}".replace(os.sep, "/") if rel_dir else entry.name
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            stamps[rel_path] = (stat.st_size, stat.st_mtime_ns)
+        stats["files"] = len(stamps)
+
+        for rel_path in [rel_path for rel_path in self.files if rel_path not in stamps]:
+            self._remove(rel_path)
+            stats["removed_files"] += 1
+        changed = []
+        for rel_path, (size, mtime_ns) in stamps.items():
+            entry = self.files.get(rel_path)
+            if entry is not None and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+                stats["unchanged_files"] += 1
+            else:
+                changed.append((rel_path, os.path.join(self.folder, *rel_path.split("/"))))
+
+        if workers > 1 and len(changed) > 1:
+            # Imported here so sequential updates do not pay for multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunksize = max(1, len(changed) // (workers * 4))
+                results = list(executor.map(_scan_entry, changed, chunksize=chunksize))
+        else:
+            results = [_scan_entry(entry) for entry in changed]
+
+        for rel_path, symbols in results:
+            self._remove(rel_path)
+            if symbols is None:
+                stats["error_files"] += 1
+                continue
+            size, mtime_ns = stamps[rel_path]
+            # The stat taken before reading: a file changed meanwhile is rescanned next time
+            self.files[rel_path] = {"size": size, "mtime_ns": mtime_ns, "symbols": sorted(symbols)}
+            for symbol, lines in symbols.items():
+                self.symbols.setdefault(symbol, {})[rel_path] = lines
+            stats["scanned_files"] += 1
+        self._sorted = None
+        return stats
+
+    def save(self):
+        """Write the index atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = {"version": INDEX_VERSION, "files": self.files, "symbols": self.symbols}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+    def lookup(self, symbol: str) -> List[Tuple[str, int]]:
+        """
+        Find the uses of a symbol.
+
+        Args:
+            symbol (str): The symbol, e.g. "xPlayer.addMoney".
+
+        Returns:
+            List[Tuple[str, int]]: The relative file path and line number of every use, in file order.
+        """
+        postings = self.symbols.get(symbol, {})
+        return [(rel_path, line) for rel_path in sorted(postings) for line in postings[rel_path]]
+
+    def count(self, symbol: str) -> int:
+        """Get the number of lines using a symbol."""
+        return sum(len(lines) for lines in self.symbols.get(symbol, {}).values())
+
+    def search(self, prefix: str = "") -> List[str]:
+        """
+        List the indexed symbols starting with a prefix.
+
+        Args:
+            prefix (str, optional): The prefix, e.g. "ESX.Game.". Defaults to "", all symbols.
+
+        Returns:
+            List[str]: The symbols in name order.
+        """
+        if self._sorted is None:
+            self._sorted = sorted(self.symbols)
+        start = bisect.bisect_left(self._sorted, prefix)
+        end = start
+        while end < len(self._sorted) and self._sorted[end].startswith(prefix):
+            end += 1
+        return self._sorted[start:end]
+
+    def unmapped(self, patterns: Sequence[Tuple[str, str]], direction: str) -> List[Tuple[str, int, int]]:
+        """
+        Rank the symbols a conversion would leave unchanged.
+
+        Only the symbols of the framework converted from are considered (and ``MySQL``
+        APIs, which both use). A symbol is mapped when a rule matches in its text, so
+        regex rules that need context after the symbol, such as the call parentheses,
+        are not seen.
+
+        Args:
+            patterns (Sequence[Tuple[str, str]]): The rules of the direction, e.g. from
+                ``load_conversion_patterns``.
+            direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+
+        Returns:
+            List[Tuple[str, int, int]]: The symbol, number of lines and number of files using it,
+            most used first.
+
+        Raises:
+            ValueError: For an unknown direction.
+        """
+        if direction not in DIRECTION_FRAMEWORKS:
+            raise ValueError(f"Unknown conversion direction: {direction}")
+        frameworks = DIRECTION_FRAMEWORKS[direction]
+        regex = compile_rules(patterns).regex if patterns else None
+        unmapped = [
+            (symbol, self.count(symbol), len(postings))
+            for symbol, postings in self.symbols.items()
+            if symbol_framework(symbol) in frameworks and (regex is None or regex.search(symbol) is None)
+        ]
+        unmapped.sort(key=lambda item: (-item[1], -item[2], item[0]))
+        return unmapped
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Update the index of a folder and answer queries, printing JSON.
+
+    Args:
+        argv (Optional[List[str]], optional): Command line arguments. Defaults to ``sys.argv[1:]``.
+
+    Returns:
+        int: The process exit code.
+    """
+    # Imported here so the index can be used without loading the CLI and its converter
+    from modules.cli import DIRECTIONS, EXIT_OK, EXIT_USAGE
+    from modules.patterns import load_conversion_patterns
+
+    parser = argparse.ArgumentParser(
+        prog="python -m modules.symbols",
+        description="Index the ESX/QB-Core API uses of a resources tree and find those without a conversion rule."
+    )
+    parser.add_argument("folder", help="Folder to index, e.g. a resources/ directory.")
+    parser.add_argument("--index", help="Index file (default: one per folder in the rewriter cache folder).")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="Number of worker processes scanning changed files, 0 for one per CPU (default: 1)."
+    )
+    parser.add_argument(
+        "--find", action="append", default=[], metavar="SYMBOL",
+        help="List the file:line uses of a symbol; a trailing * matches every symbol with that prefix. Repeatable."
+    )
+    parser.add_argument(
+        "--unmapped", action="store_true",
+        help="Rank the symbols of the source framework that no conversion rule matches, most used first."
+    )
+    parser.add_argument(
+        "-d", "--direction", choices=sorted(DIRECTIONS), default="esx-to-qb",
+        help="Conversion direction of --unmapped (default: esx-to-qb)."
+    )
+    parser.add_argument(
+        "--rules", action="append", default=[], metavar="PATH",
+        help="YAML rule pack, or folder of packs, counted as mappings by --unmapped. Repeatable."
+    )
+    parser.add_argument("--limit", type=int, default=50, help="Unmapped symbols listed, 0 for all (default: 50).")
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_OK if e.code == 0 else EXIT_USAGE
+
+    if not os.path.isdir(args.folder):
+        print(f"Error: {args.folder} is not a valid directory", file=sys.stderr)
+        return EXIT_USAGE
+
+    start = time.perf_counter()
+    index = SymbolIndex(args.folder, args.index)
+    stats = index.update(args.workers if args.workers > 0 else (os.cpu_count() or 1))
+    index.save()
+    result: Dict[str, object] = {
+        "folder": os.path.abspath(args.folder),
+        "index": os.path.abspath(index.path),
+        "symbols": len(index.symbols),
+        "stats": stats,
+    }
+
+    if args.find:
+        found: Dict[str, List[str]] = {}
+        for query in args.find:
+            for symbol in index.search(query[:-1]) if query.endswith("*") else [query]:
+                found[symbol] = [f"{rel_path}:{line}" for rel_path, line in index.lookup(symbol)]
+        result["found"] = found
+    if args.unmapped:
+        direction, pattern_key = DIRECTIONS[args.direction]
+        try:
+            patterns = load_conversion_patterns(rule_packs=args.rules)
+        except (OSError, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return EXIT_USAGE
+        unmapped = index.unmapped(patterns[pattern_key], direction)
+        result["direction"] = direction
+        result["unmapped"] = [
+            {"symbol": symbol, "lines": lines, "files": files}
+            for symbol, lines, files in (unmapped[:args.limit] if args.limit > 0 else unmapped)
+        ]
+    result["elapsed_seconds"] = round(time.perf_counter() - start, 6)
+    print(json.dumps(result, indent=2))
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Opt-in tracing of conversion stages in Chrome trace-event format.
+
+While tracing is started, the stages of a conversion (the directory scan, reading,
+prefiltering, converting and writing every file, mirroring assets, ...) record
+spans. Pool workers record their own spans and send them back with their results,
+so a parallel run shows one track per worker. Saved traces open in
+chrome://tracing and https://ui.perfetto.dev:
+
+    tracer = start_tracing()
+    process_folder(folder, patterns, direction, False, [], workers=4)
+    stop_tracing().save("trace.json")
+
+With ``memory``, every span also records the peak memory allocated by Python during
+the span, measured with ``tracemalloc``, in its ``peak_bytes`` argument. The peak is
+per process, so spans of threads running at the same time see each other's memory.
+Tracing memory slows the conversion down noticeably.
+
+All processes share the monotonic clock of ``time.perf_counter``, so the spans of
+the workers line up with those of the main process.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Dict, Iterable, List, Optional
+
+# The tracer of this process, None while tracing is off
+_active: Optional["Tracer"] = None
+
+
+class _NullSpan:
+    """The span of a process that is not tracing, it records nothing."""
+
+    def __enter__(self) -> Dict[str, object]:
+        return {}
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """A span being recorded; its arguments can be added to until it ends."""
+
+    __slots__ = ("tracer", "name", "args", "start", "peak")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict[str, object]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.peak = 0
+
+    def __enter__(self) -> Dict[str, object]:
+        if self.tracer.memory:
+            stack = self.tracer._stack()
+            if stack:
+                # The enclosing span keeps the peak so far, the counter is reset for this one
+                stack[-1].peak = max(stack[-1].peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self.args
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter_ns()
+        if self.tracer.memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            self.args["peak_bytes"] = self.peak
+            stack = self.tracer._stack()
+            stack.pop()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+        if exc_type is not None:
+            self.args["error"] = str(exc_value)
+        self.tracer.events.append({
+            "name": self.name, "cat": "stage", "ph": "X", "ts": self.start / 1000,
+            "dur": (end - self.start) / 1000, "pid": self.tracer.pid, "tid": threading.get_native_id(),
+            "args": self.args,
+        })
+        return None
+
+
+class Tracer:
+    """The trace events recorded by one process."""
+
+    def __init__(self, memory: bool = True, process_name: str = "converter"):
+        """
+        Args:
+            memory (bool, optional): Record the ``tracemalloc`` peak of every span. Defaults to True.
+            process_name (str, optional): Name of the process track. Defaults to "converter".
+        """
+        self.memory = memory
+        self.pid = os.getpid()
+        # Whether tracemalloc was started for this tracer, and is stopped with it
+        self.owns_tracemalloc = False
+        self.events: List[Dict[str, object]] = [
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": f"{process_name} {self.pid}"}}
+        ]
+        self._local = threading.local()
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def drain(self) -> List[Dict[str, object]]:
+        """Remove and return the events recorded so far."""
+        events, self.events = self.events, []
+        return events
+
+    def save(self, path: str):
+        """
+        Write the trace as Chrome trace-event JSON.
+
+        Args:
+            path (str): Path to the JSON file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+
+def start_tracing(memory: bool = True, process_name: str = "converter") -> Tracer:
+    """
+    Start tracing in this process.
+
+    Args:
+        memory (bool, optional): Record the ``tracemalloc`` peak of every span. Defaults to True.
+        process_name (str, optional): Name of the process track. Defaults to "converter".
+
+    Returns:
+        Tracer: The tracer receiving the events.
+    """
+    global _active
+    _active = Tracer(memory, process_name)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _active.owns_tracemalloc = True
+    return _active
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """
+    Stop tracing in this process.
+
+    Returns:
+        Optional[Tracer]: The tracer with the recorded events, or None if tracing was off.
+    """
+    global _active
+    tracer, _active = _active, None
+    if tracer is not None and tracer.owns_tracemalloc:
+        tracemalloc.stop()
+    return tracer
+
+
+def active_tracer() -> Optional[Tracer]:
+    """Get the tracer of this process, or None while tracing is off."""
+    return _active
+
+
+def span(name: str, **args: object):
+    """
+    Record a span around a stage, if tracing is on.
+
+    Used as ``with span("read", path=path) as args:``; the body may add to ``args``.
+
+    Args:
+        name (str): Name of the stage.
+        **args (object): Arguments shown with the span.
+
+    Returns:
+        A context manager yielding the arguments of the span.
+    """
+    if _active is None:
+        return _NULL_SPAN
+    return _Span(_active, name, args)
+
+
+def add_events(events: Iterable[Dict[str, object]]):
+    """
+    Add events recorded by another process, e.g. a pool worker, to the trace.
+
+    Args:
+        events (Iterable[Dict[str, object]]): The events.
+    """
+    if _active is not None:
+        _active.events.extend(events)
+
+
+def _reset_after_fork():
+    # A forked pool worker starts without the trace of its parent
+    global _active
+    if _active is not None and _active.owns_tracemalloc:
+        tracemalloc.stop()
+    _active = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
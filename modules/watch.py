@@ -0,0 +1,289 @@
+"""
+Watch mode: keep a converted output folder in sync with its sources.
+
+After an initial incremental conversion, file system events are collected with
+``watchfiles`` and applied in debounced batches. Only the touched files are
+handled: Lua scripts are reconverted, other files are mirrored and deleted
+sources have their outputs removed. The incremental manifest is kept up to date,
+so a later ``process_folder(..., incremental=True)`` run has nothing to redo.
+"""
+import os
+import shutil
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from modules.converter import (
+    _manifest_key, _remove_output, _run_task, get_output_folder, get_rewriter, is_script,
+    process_folder
+)
+from modules.manifest import MANIFEST_NAME, ConversionManifest, settings_fingerprint
+from modules.mirror import mirror_file, scan_tree
+
+
+class FolderWatcher:
+    """Applies batches of changed source paths to the output folder of a conversion."""
+
+    def __init__(
+        self,
+        folder_path: str,
+        patterns: List[Tuple[str, str]],
+        direction: str,
+        include_sql: bool,
+        sql_patterns: List[Tuple[str, str]],
+        callback: Optional[Callable[[str], None]] = None,
+        output_folder: Optional[str] = None,
+        output_prefix: str = "qb-",
+        mirror_mode: str = "auto",
+        engine: str = "text"
+    ):
+        """
+        Prepare the watcher. Nothing is converted until ``sync`` or ``apply`` is called.
+
+        Args:
+            folder_path (str): Path to the folder containing Lua script files.
+            patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
+            direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+            include_sql (bool): Flag to include SQL patterns.
+            sql_patterns (List[Tuple[str, str]]): List of SQL pattern tuples.
+            callback (Optional[Callable[[str], None]], optional): Callback function for progress updates.
+                Receives the same messages as with ``process_folder``. Defaults to None.
+            output_folder (Optional[str], optional): Explicit output folder. Defaults to the input
+                folder's name with ``output_prefix``, next to the input folder.
+            output_prefix (str, optional): Prefix for the output folder. Defaults to "qb-".
+            mirror_mode (str, optional): How unchanged files are mirrored, one of ``MIRROR_MODES``.
+                Defaults to "auto".
+            engine (str, optional): The rewrite engine, one of ``ENGINES``. Syntax trees of the
+                "ast" engine are cached by content, so saving an unchanged file is not re-parsed.
+                Defaults to "text".
+        """
+        self.folder_path = os.path.abspath(folder_path)
+        self.output_folder = os.path.abspath(output_folder or get_output_folder(folder_path, output_prefix))
+        self.patterns = list(patterns)
+        self.direction = direction
+        self.include_sql = include_sql
+        self.sql_patterns = list(sql_patterns or [])
+        self.callback = callback
+        self.mirror_mode = mirror_mode
+        self.engine = engine
+        self.stats = {
+            "batches": 0,
+            "converted_files": 0,
+            "skipped_files": 0,
+            "error_files": 0,
+            "copied_files": 0,
+            "removed_files": 0
+        }
+        self._settings = (
+            self.patterns, direction, include_sql, self.sql_patterns, mirror_mode, False, engine, False
+        )
+        self._manifest: Optional[ConversionManifest] = None
+
+    def sync(self, workers: int = 1) -> Dict[str, int]:
+        """
+        Bring the output folder up to date with an incremental conversion.
+
+        Args:
+            workers (int, optional): Number of worker processes. Defaults to 1.
+
+        Returns:
+            Dict[str, int]: The statistics of ``process_folder``.
+        """
+        stats = process_folder(
+            self.folder_path, self.patterns, self.direction, self.include_sql, self.sql_patterns,
+            self.callback, workers=workers, incremental=True, mirror_mode=self.mirror_mode,
+            output_folder=self.output_folder, engine=self.engine
+        )
+        self._manifest = None
+        return stats
+
+    @property
+    def manifest(self) -> ConversionManifest:
+        """The incremental manifest of the output folder, loaded on first use."""
+        if self._manifest is None:
+            self._manifest = ConversionManifest(
+                self.output_folder,
+                settings_fingerprint(
+                    self.patterns, self.direction, self.include_sql, self.sql_patterns, engine=self.engine
+                )
+            )
+            # Compile before the first event so it is not part of the turnaround
+            get_rewriter(self.patterns, self.include_sql, self.sql_patterns, self.direction, self.engine)
+        return self._manifest
+
+    def is_source(self, path: str) -> bool:
+        """Check whether a path belongs to the watched sources (and not to the output folder)."""
+        path = os.path.abspath(path)
+        if path == self.output_folder or path.startswith(self.output_folder + os.sep):
+            return False
+        return path.startswith(self.folder_path + os.sep)
+
+    def apply(self, paths: Iterable[str]):
+        """
+        Apply one batch of changed paths.
+
+        A path that exists is (re)converted or mirrored; a directory is handled as all of
+        the files below it. A path that is gone has its output removed. The event kinds are
+        not needed, which keeps coalesced events such as "added then deleted" correct.
+
+        Args:
+            paths (Iterable[str]): Source paths that were added, modified or deleted.
+        """
+        manifest = self.manifest
+        assets = set(manifest.assets)
+        for path in sorted({os.path.abspath(path) for path in paths if self.is_source(path)}):
+            rel_path = _manifest_key(self.folder_path, path)
+            output_path = os.path.join(self.output_folder, *rel_path.split("/"))
+            if os.path.isdir(path):
+                for rel_dir, entry in scan_tree(path):
+                    self._update_file(entry.path, os.path.join(output_path, rel_dir, entry.name), assets)
+            elif os.path.exists(path):
+                self._update_file(path, output_path, assets)
+            else:
+                self._remove(rel_path, output_path, assets)
+
+        manifest.assets = sorted(assets)
+        manifest.save()
+        self.stats["batches"] += 1
+
+    def _update_file(self, input_path: str, output_path: str, assets: set):
+        """Reconvert a Lua script or SQL dump, or mirror any other file."""
+        rel_path = _manifest_key(self.folder_path, input_path)
+        if os.path.basename(input_path) == MANIFEST_NAME:
+            return
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        if not is_script(input_path, self.include_sql):
+            try:
+                copied = mirror_file(input_path, output_path, self.mirror_mode)
+            except Exception as e:
+                self.stats["error_files"] += 1
+                if self.callback:
+                    self.callback(f"Error copying {input_path}: {str(e)}")
+                return
+            assets.add(rel_path)
+            if copied:
+                self.stats["copied_files"] += 1
+                if self.callback:
+                    self.callback(f"Copied: {output_path}")
+            elif self.callback:
+                self.callback(f"Up to date: {output_path}")
+            return
+
+        status, error, _, _ = _run_task((input_path, output_path), self._settings)
+        if error is not None:
+            self.stats["error_files"] += 1
+            self.manifest.forget(rel_path)
+            if self.callback:
+                self.callback(f"Error processing {input_path}: {error}")
+            return
+
+        self.manifest.record(rel_path, input_path, status == "converted")
+        if status == "converted":
+            self.stats["converted_files"] += 1
+            if self.callback:
+                self.callback(f"Converted: {output_path}")
+        else:
+            self.stats["skipped_files"] += 1
+            if self.callback:
+                self.callback(f"No changes needed: {output_path}")
+
+    def _remove(self, rel_path: str, output_path: str, assets: set):
+        """Remove the output of a deleted source file or directory."""
+        if os.path.isdir(output_path):
+            shutil.rmtree(output_path, ignore_errors=True)
+            prefix = rel_path + "/"
+            for key in [key for key in self.manifest.files if key.startswith(prefix)]:
+                self.manifest.forget(key)
+            assets.difference_update({key for key in assets if key.startswith(prefix)})
+            self.stats["removed_files"] += 1
+            if self.callback:
+                self.callback(f"Removed: {output_path}")
+            return
+
+        self.manifest.forget(rel_path)
+        assets.discard(rel_path)
+        if not os.path.exists(output_path):
+            return
+        try:
+            _remove_output(self.output_folder, rel_path)
+        except OSError as e:
+            if self.callback:
+                self.callback(f"Error removing {output_path}: {str(e)}")
+            return
+        self.stats["removed_files"] += 1
+        if self.callback:
+            self.callback(f"Removed: {output_path}")
+
+
+def watch_folder(
+    folder_path: str,
+    patterns: List[Tuple[str, str]],
+    direction: str,
+    include_sql: bool,
+    sql_patterns: List[Tuple[str, str]],
+    callback: Optional[Callable[[str], None]] = None,
+    output_prefix: str = "qb-",
+    output_folder: Optional[str] = None,
+    mirror_mode: str = "auto",
+    workers: int = 1,
+    initial_sync: bool = True,
+    debounce_ms: int = 200,
+    step_ms: int = 20,
+    stop_event: Optional[threading.Event] = None,
+    engine: str = "text"
+) -> Dict[str, int]:
+    """
+    Convert a folder, then keep its output in sync until stopped.
+
+    Args:
+        folder_path (str): Path to the folder containing Lua script files.
+        patterns (List[Tuple[str, str]]): List of tuples containing old and new patterns.
+        direction (str): Conversion direction ("ESX to QB-Core" or "QB-Core to ESX").
+        include_sql (bool): Flag to include SQL patterns.
+        sql_patterns (List[Tuple[str, str]]): List of SQL pattern tuples.
+        callback (Optional[Callable[[str], None]], optional): Callback function for progress updates.
+            Defaults to None.
+        output_prefix (str, optional): Prefix for the output folder. Defaults to "qb-".
+        output_folder (Optional[str], optional): Explicit output folder. Defaults to None.
+        mirror_mode (str, optional): How unchanged files are mirrored. Defaults to "auto".
+        workers (int, optional): Number of worker processes for the initial sync. Defaults to 1.
+        initial_sync (bool, optional): Run an incremental conversion before watching. Defaults to True.
+        debounce_ms (int, optional): Longest time a burst of events is grouped into one batch.
+            Defaults to 200.
+        step_ms (int, optional): Quiet time after the last event before a batch is applied; this
+            bounds the delay between a save and its conversion. Defaults to 20.
+        stop_event (Optional[threading.Event], optional): Stops watching when set. Ctrl+C also
+            stops watching. Defaults to None.
+        engine (str, optional): The rewrite engine, one of ``ENGINES``. Defaults to "text".
+
+    Returns:
+        Dict[str, int]: Statistics about the watch session.
+    """
+    # Imported here so the converter does not require watchfiles unless watching
+    from watchfiles import DefaultFilter, watch
+
+    watcher = FolderWatcher(
+        folder_path, patterns, direction, include_sql, sql_patterns, callback,
+        output_folder=output_folder, output_prefix=output_prefix, mirror_mode=mirror_mode, engine=engine
+    )
+    if initial_sync:
+        watcher.sync(workers)
+
+    default_filter = DefaultFilter()
+
+    def watch_filter(change, path: str) -> bool:
+        return default_filter(change, path) and watcher.is_source(path)
+
+    if callback:
+        callback(f"Watching {watcher.folder_path} for changes...")
+    for changes in watch(
+        watcher.folder_path,
+        watch_filter=watch_filter,
+        debounce=debounce_ms,
+        step=step_ms,
+        stop_event=stop_event,
+        raise_interrupt=False
+    ):
+        watcher.apply(path for _, path in changes)
+
+    return watcher.stats
@@ -0,0 +1,76 @@
+import pytest
+
+from modules.ast_engine import compile_ast_rules
+from modules.lua_ast import TREE_CACHE, LuaSyntaxError, parse, parse_cached
+
+RULES = [("ESX.GetPlayerFromId", "QBCore.Functions.GetPlayer"), ("esx:playerLoaded", "QBCore:Server:PlayerLoaded")]
+CALLS = [
+    ("*.addMoney", "{receiver}.Functions.AddMoney('cash', {args})"),
+    ("*.getJob", "{receiver}.PlayerData.job"),
+]
+STRINGS = [("`users`", "`players`")]
+
+
+@pytest.fixture
+def rewriter():
+    return compile_ast_rules(RULES, CALLS, STRINGS)
+
+
+def test_calls_are_rewritten(rewriter):
+    script = "local xPlayer = ESX.GetPlayerFromId(source)\nxPlayer.addMoney(100)\nlocal job = data.player.getJob()\n"
+    assert rewriter.sub(script) == (
+        "local xPlayer = QBCore.Functions.GetPlayer(source)\n"
+        "xPlayer.Functions.AddMoney('cash', 100)\n"
+        "local job = data.player.PlayerData.job\n"
+    )
+
+
+def test_call_arguments_are_rewritten_too(rewriter):
+    script = "xPlayer.addMoney(target.getJob().grade, ESX.GetPlayerFromId(id))\n"
+    hits = {}
+    assert rewriter.sub(script, hits) == (
+        "xPlayer.Functions.AddMoney('cash', target.PlayerData.job.grade, QBCore.Functions.GetPlayer(id))\n"
+    )
+    assert hits == {"*.addMoney": 1, "*.getJob": 1, "ESX.GetPlayerFromId": 1}
+
+
+def test_comments_and_strings_are_left_alone(rewriter):
+    script = (
+        "-- ESX.GetPlayerFromId(source).addMoney(1)\n"
+        "--[[ xPlayer.getJob() ]]\n"
+        "print('call ESX.GetPlayerFromId here')\n"
+        "RegisterNetEvent('esx:playerLoaded')\n"
+        "MySQL.query('SELECT * FROM `users`')\n"
+    )
+    assert rewriter.sub(script) == (
+        "-- ESX.GetPlayerFromId(source).addMoney(1)\n"
+        "--[[ xPlayer.getJob() ]]\n"
+        "print('call ESX.GetPlayerFromId here')\n"
+        "RegisterNetEvent('QBCore:Server:PlayerLoaded')\n"
+        "MySQL.query('SELECT * FROM `players`')\n"
+    )
+
+
+def test_parse_failure_falls_back_to_the_text_engine(rewriter):
+    script = "local xPlayer = ESX.GetPlayerFromId(source\n-- ESX.GetPlayerFromId\n"
+    with pytest.raises(LuaSyntaxError):
+        parse(script)
+    assert rewriter.edits(script) is None
+    # The text engine rewrites comments as well
+    assert rewriter.sub(script) == rewriter.fallback.sub(script) == (
+        "local xPlayer = QBCore.Functions.GetPlayer(source\n-- QBCore.Functions.GetPlayer\n"
+    )
+
+
+def test_tree_cache_reuses_trees():
+    TREE_CACHE.clear()
+    hits, misses = TREE_CACHE.hits, TREE_CACHE.misses
+    script = "local value = ESX.GetPlayerFromId(1)\n"
+
+    tree = parse_cached(script)
+    assert parse_cached(script) is tree
+    assert parse_cached(script + "\n") is not tree
+    assert (TREE_CACHE.hits - hits, TREE_CACHE.misses - misses) == (1, 2)
+
+    TREE_CACHE.clear()
+    assert parse_cached(script) is not tree
@@ -0,0 +1,35 @@
+import modules.cli
+from modules.cli import EXIT_FAILURE, main
+
+
+def _resource(tmp_path):
+    source = tmp_path / "resource"
+    source.mkdir()
+    (source / "client.lua").write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+    return source
+
+
+def test_failed_conversion_deletes_partial_archive(tmp_path, monkeypatch):
+    source = _resource(tmp_path)
+    archive = tmp_path / "out.zip"
+
+    def failing_process_folder(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(modules.cli, "process_folder", failing_process_folder)
+    assert main([str(source), "--archive", str(archive)]) == EXIT_FAILURE
+    assert not archive.exists()
+
+
+def test_trace_write_error_keeps_exit_code(tmp_path, monkeypatch, capsys):
+    source = _resource(tmp_path)
+
+    def failing_process_folder(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(modules.cli, "process_folder", failing_process_folder)
+    trace_file = tmp_path / "missing" / "trace.json"
+    assert main([str(source), "-o", str(tmp_path / "out"), "--trace-file", str(trace_file)]) == EXIT_FAILURE
+    errors = capsys.readouterr().err
+    assert "boom" in errors
+    assert "could not write the trace" in errors
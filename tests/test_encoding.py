@@ -0,0 +1,48 @@
+import pytest
+
+import modules.converter
+from modules.converter import _rewrite_source, get_rewriter
+
+RULES = [("ESX.GetPlayerData", "QBCore.Functions.GetPlayerData")]
+# A rule outside of ASCII takes the decoding path of the text engine
+UNICODE_RULES = RULES + [("'Métier'", "'Job'")]
+
+SOURCES = {
+    "latin-1": (
+        "-- Caf\xe9 \xe0 l'entr\xe9e\nlocal data = ESX.GetPlayerData()\n".encode("latin-1"),
+        "-- Caf\xe9 \xe0 l'entr\xe9e\nlocal data = QBCore.Functions.GetPlayerData()\n".encode("latin-1"),
+    ),
+    "utf-8 bom": (
+        "\ufefflocal data = ESX.GetPlayerData() -- données\n".encode("utf-8"),
+        "\ufefflocal data = QBCore.Functions.GetPlayerData() -- données\n".encode("utf-8"),
+    ),
+    "crlf": (
+        b"local data = ESX.GetPlayerData()\r\nprint(data)\r\n\r\n",
+        b"local data = QBCore.Functions.GetPlayerData()\r\nprint(data)\r\n\r\n",
+    ),
+    "mixed": (
+        b"\xef\xbb\xbflocal a = ESX.GetPlayerData()\r\n-- \xe9t\xe9\nlocal b = ESX.GetPlayerData()",
+        b"\xef\xbb\xbflocal a = QBCore.Functions.GetPlayerData()\r\n-- \xe9t\xe9\n"
+        b"local b = QBCore.Functions.GetPlayerData()",
+    ),
+}
+
+
+@pytest.mark.parametrize("mmap_threshold", [1 << 20, 0], ids=["bytes", "mmap"])
+@pytest.mark.parametrize("engine, rules", [
+    ("text", RULES), ("text", UNICODE_RULES), ("ast", RULES)
+], ids=["text-bytes", "text-decoded", "ast"])
+@pytest.mark.parametrize("name", SOURCES)
+def test_rewrite_keeps_bytes_outside_of_matches(tmp_path, monkeypatch, name, engine, rules, mmap_threshold):
+    monkeypatch.setattr(modules.converter, "_MMAP_THRESHOLD", mmap_threshold)
+    source, expected = SOURCES[name]
+    path = tmp_path / "client.lua"
+    path.write_bytes(source)
+    rewriter = get_rewriter(rules, False, [], "ESX to QB-Core", engine)
+
+    assert _rewrite_source(str(path), rewriter) == ("converted", expected)
+
+
+def test_ascii_rules_rewrite_raw_bytes():
+    assert get_rewriter(RULES, False, [], "ESX to QB-Core").bytes_regex is not None
+    assert get_rewriter(UNICODE_RULES, False, [], "ESX to QB-Core").bytes_regex is None
@@ -0,0 +1,43 @@
+import pytest
+
+from modules.converter import convert_script, manual_replace
+from modules.patterns import load_conversion_patterns
+
+
+@pytest.fixture(scope="module")
+def patterns():
+    return load_conversion_patterns()
+
+
+@pytest.mark.parametrize("event, converted", [
+    ("esx:addInventoryItem", "QBCore:Server:AddItem"),
+    ("esx:removeInventoryItem", "QBCore:Server:RemoveItem"),
+    ("esx:setAccountMoney", "QBCore:Server:SetMoney"),
+])
+def test_trigger_event_rules_keep_the_call(patterns, event, converted):
+    script = f"TriggerEvent('{event}', 'bread', 1)\n"
+    assert convert_script(script, patterns["ESX_to_QB_Core"]) == f"TriggerEvent('{converted}', 'bread', 1)\n"
+
+
+def _sequential(script, rules, direction="ESX to QB-Core"):
+    # The conversion before the single-pass engine: every rule in table order
+    script = manual_replace(script, direction)
+    for old, new in rules:
+        script = script.replace(old, new)
+    return script
+
+
+OVERLAPPING = """\
+TriggerEvent('esx:addInventoryItem', 'bread', 1)
+TriggerEvent('esx:removeInventoryItem', 'water', 2)
+TriggerEvent('esx:setAccountMoney', 'bank', 100)
+RegisterNetEvent('esx:addInventoryItem')
+AddEventHandler('esx:setAccountMoney', function() end)
+exports.ghmattimysql.execute('SELECT 1')
+local player = ESX.GetPlayerFromId(source)
+"""
+
+
+def test_longest_match_agrees_with_sequential_rules(patterns):
+    rules = load_conversion_patterns(compiled=False)["ESX_to_QB_Core"]
+    assert convert_script(OVERLAPPING, patterns["ESX_to_QB_Core"]) == _sequential(OVERLAPPING, rules)
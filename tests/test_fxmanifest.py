@@ -0,0 +1,107 @@
+import pytest
+
+from modules.fxmanifest import find_resources, glob_regex, parse_manifest_text, unloaded_scripts
+from modules.job import ConversionJob
+
+RULES = [("ESX.GetPlayerData", "QBCore.Functions.GetPlayerData")]
+
+SHOP_MANIFEST = """\
+fx_version 'cerulean'
+game 'gta5'
+
+-- client_script 'disabled.lua'
+--[[
+server_scripts { 'old/*.lua' }
+]]
+shared_scripts {
+    '@es_extended/imports.lua',
+    '@utils/shared/*.lua',
+    'config.lua',
+}
+client_scripts {
+    "client/**.lua",
+}
+server_script 'server/main.lua'
+files { 'html/**/*.lua' }
+"""
+
+UTILS_MANIFEST = """\
+fx_version "cerulean"
+shared_script [[shared/init.lua]]
+"""
+
+FILES = {
+    "[shops]/shop/fxmanifest.lua": SHOP_MANIFEST,
+    "[shops]/shop/config.lua": "Config = {}\n",
+    "[shops]/shop/disabled.lua": "ESX.GetPlayerData()\n",
+    "[shops]/shop/old/legacy.lua": "ESX.GetPlayerData()\n",
+    "[shops]/shop/client/main.lua": "ESX.GetPlayerData()\n",
+    "[shops]/shop/client/menus/buy.lua": "ESX.GetPlayerData()\n",
+    "[shops]/shop/server/main.lua": "ESX.GetPlayerData()\n",
+    "[shops]/shop/server/unused.lua": "ESX.GetPlayerData()\n",
+    "[shops]/shop/html/js/data.lua": "return {}\n",
+    "utils/fxmanifest.lua": UTILS_MANIFEST,
+    "utils/shared/init.lua": "ESX.GetPlayerData()\n",
+    "utils/shared/math.lua": "return {}\n",
+    "utils/shared/deep/table.lua": "return {}\n",
+    "loose.lua": "ESX.GetPlayerData()\n",
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "resources"
+    for rel_path, content in FILES.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    return root
+
+
+def test_parse_manifest_text_skips_comments():
+    assert parse_manifest_text(SHOP_MANIFEST) == {
+        "shared": ["@es_extended/imports.lua", "@utils/shared/*.lua", "config.lua"],
+        "client": ["client/**.lua"],
+        "server": ["server/main.lua"],
+        "files": ["html/**/*.lua"],
+    }
+    assert parse_manifest_text(UTILS_MANIFEST) == {"shared": ["shared/init.lua"]}
+
+
+@pytest.mark.parametrize("pattern, path, matches", [
+    ("client/*.lua", "client/main.lua", True),
+    ("client/*.lua", "client/menus/buy.lua", False),
+    ("client/**.lua", "client/menus/buy.lua", True),
+    ("html/**/*.lua", "html/data.lua", True),
+    ("html/**/*.lua", "html/js/deep/data.lua", True),
+    ("server/?ain.lua", "Server/Main.lua", True),
+    ("server/?ain.lua", "server/main.luac", False),
+])
+def test_glob_regex(pattern, path, matches):
+    assert bool(glob_regex(pattern).match(path)) == matches
+
+
+def test_unloaded_scripts(tree):
+    lua_files = list(FILES)
+    assert find_resources(str(tree)) == ["[shops]/shop", "utils"]
+    assert unloaded_scripts(str(tree), lua_files) == {
+        "[shops]/shop/fxmanifest.lua",
+        "[shops]/shop/disabled.lua",
+        "[shops]/shop/old/legacy.lua",
+        "[shops]/shop/server/unused.lua",
+        "utils/fxmanifest.lua",
+        "utils/shared/deep/table.lua",
+    }
+
+
+def test_loaded_only_mirrors_unloaded_scripts(tree, tmp_path):
+    output = tmp_path / "output"
+    job = ConversionJob(str(tree), RULES, "ESX to QB-Core", False, [], output_folder=str(output), loaded_only=True)
+    stats = job.run()
+
+    assert stats["unloaded_files"] == 6
+    assert stats["converted_files"] == 5
+    for rel_path in ("[shops]/shop/client/menus/buy.lua", "utils/shared/init.lua", "loose.lua"):
+        assert (output / rel_path).read_text(encoding="utf-8") == "QBCore.Functions.GetPlayerData()\n"
+    for rel_path in ("[shops]/shop/disabled.lua", "[shops]/shop/server/unused.lua"):
+        assert (output / rel_path).read_text(encoding="utf-8") == "ESX.GetPlayerData()\n"
@@ -0,0 +1,94 @@
+import modules.job
+from modules.job import ConversionJob
+
+RULES = [("ESX.GetPlayerData", "QBCore.Functions.GetPlayerData")]
+
+
+def _run(source, output):
+    job = ConversionJob(
+        str(source), RULES, "ESX to QB-Core", False, [], incremental=True, output_folder=str(output)
+    )
+    return job.run()
+
+
+def test_failed_asset_keeps_its_output(tmp_path, monkeypatch):
+    source = tmp_path / "resource"
+    source.mkdir()
+    (source / "client.lua").write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+    (source / "logo.png").write_bytes(b"png")
+    output = tmp_path / "output"
+    _run(source, output)
+    assert (output / "logo.png").read_bytes() == b"png"
+
+    (source / "logo.png").write_bytes(b"new png")
+
+    def failing_mirror(src, dst, mode="auto"):
+        raise OSError("disk busy")
+
+    monkeypatch.setattr(modules.job, "mirror_file", failing_mirror)
+    _run(source, output)
+    assert (output / "logo.png").read_bytes() == b"png"
+
+    monkeypatch.undo()
+    (source / "logo.png").unlink()
+    _run(source, output)
+    assert not (output / "logo.png").exists()
+
+
+def _tree(tmp_path):
+    source = tmp_path / "resource"
+    source.mkdir()
+    (source / "client.lua").write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+    (source / "server.lua").write_text("print('server')\n", encoding="utf-8")
+    return source, tmp_path / "output"
+
+
+def test_incremental_rerun_skips_unchanged_files(tmp_path):
+    source, output = _tree(tmp_path)
+    stats = _run(source, output)
+    assert (stats["converted_files"], stats["skipped_files"], stats["unchanged_files"]) == (1, 1, 0)
+
+    stats = _run(source, output)
+    assert (stats["converted_files"], stats["skipped_files"], stats["unchanged_files"]) == (0, 0, 2)
+
+
+def test_incremental_rerun_converts_edited_files(tmp_path):
+    source, output = _tree(tmp_path)
+    _run(source, output)
+
+    (source / "server.lua").write_text("ESX.GetPlayerData()\nprint('server')\n", encoding="utf-8")
+    stats = _run(source, output)
+    assert (stats["converted_files"], stats["unchanged_files"]) == (1, 1)
+    assert (output / "server.lua").read_text(encoding="utf-8").startswith("QBCore.Functions.GetPlayerData()")
+
+
+def test_incremental_rerun_removes_outputs_of_deleted_files(tmp_path):
+    source, output = _tree(tmp_path)
+    _run(source, output)
+
+    (source / "server.lua").unlink()
+    stats = _run(source, output)
+    assert stats["total_files"] == 1
+    assert not (output / "server.lua").exists()
+    assert (output / "client.lua").exists()
+
+
+def test_settings_change_reconverts_everything(tmp_path):
+    source, output = _tree(tmp_path)
+    _run(source, output)
+
+    job = ConversionJob(
+        str(source), RULES + [("print", "Print")], "ESX to QB-Core", False, [],
+        incremental=True, output_folder=str(output)
+    )
+    stats = job.run()
+    assert (stats["converted_files"], stats["unchanged_files"]) == (2, 0)
+    assert (output / "server.lua").read_text(encoding="utf-8") == "Print('server')\n"
+
+
+def test_full_conversion_ignores_the_manifest(tmp_path):
+    source, output = _tree(tmp_path)
+    _run(source, output)
+
+    stats = ConversionJob(str(source), RULES, "ESX to QB-Core", False, [], output_folder=str(output)).run()
+    assert (stats["converted_files"], stats["unchanged_files"]) == (1, 0)
@@ -0,0 +1,58 @@
+import os
+
+from modules.manifest import ConversionManifest, settings_fingerprint
+
+RULES = [("ESX.GetPlayerData", "QBCore.Functions.GetPlayerData")]
+
+
+def _fingerprint(rules=RULES):
+    return settings_fingerprint(rules, "ESX to QB-Core", False, [])
+
+
+def test_recorded_file_is_unchanged_until_edited(tmp_path):
+    source, output = tmp_path / "client.lua", tmp_path / "out.lua"
+    source.write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+    output.write_text("converted\n", encoding="utf-8")
+
+    manifest = ConversionManifest(str(tmp_path), _fingerprint())
+    manifest.record("client.lua", str(source), True)
+    manifest.save()
+
+    manifest = ConversionManifest(str(tmp_path), _fingerprint())
+    assert manifest.is_unchanged("client.lua", str(source), str(output))
+
+    # Touched without a change of content: still up to date
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert manifest.is_unchanged("client.lua", str(source), str(output))
+
+    source.write_text("ESX.GetPlayerData(1)\n", encoding="utf-8")
+    assert not manifest.is_unchanged("client.lua", str(source), str(output))
+
+    output.unlink()
+    source.write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+    assert not manifest.is_unchanged("client.lua", str(source), str(output))
+
+
+def test_settings_change_forgets_entries_but_not_outputs(tmp_path):
+    source = tmp_path / "client.lua"
+    source.write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+    manifest = ConversionManifest(str(tmp_path), _fingerprint())
+    manifest.record("client.lua", str(source), True)
+    manifest.assets = ["logo.png"]
+    manifest.save()
+
+    changed = ConversionManifest(str(tmp_path), _fingerprint(RULES + [("ESX", "QBCore")]))
+    assert changed.files == {}
+    assert changed.previous_assets == ["logo.png"]
+    assert changed.stale_outputs([]) == ["client.lua", "logo.png"]
+    assert changed.stale_outputs(["client.lua"]) == ["logo.png"]
+
+
+def test_fingerprint_covers_the_settings():
+    assert _fingerprint() == _fingerprint()
+    assert _fingerprint() != settings_fingerprint(RULES, "QB-Core to ESX", False, [])
+    assert _fingerprint() != settings_fingerprint(RULES, "ESX to QB-Core", False, [], engine="ast")
+    # SQL patterns only count when they are included
+    assert _fingerprint() == settings_fingerprint(RULES, "ESX to QB-Core", False, [("a", "b")])
+    assert _fingerprint() != settings_fingerprint(RULES, "ESX to QB-Core", True, [("a", "b")])
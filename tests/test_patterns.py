@@ -0,0 +1,54 @@
+import pytest
+
+from modules.engine import compile_rules
+from modules.patterns import compile_pattern_table, load_conversion_patterns
+
+PACK = r"""
+name: precedence
+rules:
+  ESX to QB-Core:
+    - regex: 'xPlayer\.getMoney\(\)'
+      replace: xPlayer.PlayerData.money.cash
+    - regex: '(?P<p>\w+)\.get(?P<f>[A-Z]\w*)\(\)'
+      replace: '\g<p>.PlayerData.\g<f>'
+"""
+
+
+def test_pack_regex_rules_keep_their_order(tmp_path):
+    pack = tmp_path / "precedence.yml"
+    pack.write_text(PACK, encoding="utf-8")
+    for compiled in (True, False):
+        patterns = load_conversion_patterns(compiled=compiled, rule_packs=[str(pack)])
+        rewriter = compile_rules(patterns["ESX_to_QB_Core"])
+        assert rewriter.sub("local cash = xPlayer.getMoney()") == "local cash = xPlayer.PlayerData.money.cash"
+        assert rewriter.sub("local job = xPlayer.getJob()") == "local job = xPlayer.PlayerData.Job"
+
+
+def test_literal_rules_are_ordered_longest_first():
+    rules = [("regex:b+", "B"), ("a", "1"), ("regex:c", "C"), ("aaa", "3")]
+    minimal, _ = compile_pattern_table(rules)
+    assert minimal == [("regex:b+", "B"), ("aaa", "3"), ("regex:c", "C"), ("a", "1")]
+
+
+def test_truncated_replacement_is_reported():
+    rules = [("esx:addInventoryItem", "QBCore:Server:AddItem"),
+             ("TriggerEvent('esx:addInventoryItem'", "QBCore:Server:AddItem")]
+    _, issues = compile_pattern_table(rules, check=True)
+    assert [issue.kind for issue in issues if issue.kind == "truncated"] == ["truncated"]
+    with pytest.raises(ValueError):
+        compile_pattern_table(rules, strict=True)
+
+
+def test_bundled_tables_load_without_warnings(recwarn):
+    load_conversion_patterns()
+    assert not [warning for warning in recwarn if "truncated" in str(warning.message)]
+
+
+def test_truncating_pack_rule_warns_at_load(tmp_path):
+    pack = tmp_path / "broken.yml"
+    pack.write_text(
+        "rules:\n  ESX to QB-Core:\n    - match: \"TriggerEvent('esx:useItem'\"\n      replace: QBCore:Server:UseItem\n",
+        encoding="utf-8"
+    )
+    with pytest.warns(UserWarning, match="truncated"):
+        load_conversion_patterns(rule_packs=[str(pack)])
@@ -0,0 +1,39 @@
+import io
+
+from modules.preview import preview_folder
+
+RULES = [("ESX.GetPlayerData", "QBCore.Functions.GetPlayerData")]
+
+DUMP = """\
+INSERT INTO `users` (`identifier`, `accounts`, `firstname`, `lastname`) VALUES
+('char1:abc123', '{"money":150,"bank":2000}', 'John', 'Doe');
+"""
+
+
+def _preview(folder, include_sql, preview_format="unified"):
+    stream = io.StringIO()
+    stats = preview_folder(str(folder), RULES, "ESX to QB-Core", include_sql, [], stream, preview_format)
+    return stats, stream.getvalue()
+
+
+def test_sql_dumps_are_previewed_with_include_sql(tmp_path):
+    (tmp_path / "client.lua").write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+    (tmp_path / "users.sql").write_text(DUMP, encoding="utf-8")
+    (tmp_path / "other.sql").write_text("INSERT INTO `items` VALUES ('bread');\n", encoding="utf-8")
+
+    stats, output = _preview(tmp_path, True)
+    assert (stats["total_files"], stats["converted_files"], stats["prefiltered_files"]) == (3, 2, 1)
+    assert "+QBCore.Functions.GetPlayerData()" in output
+    assert "users.sql: SQL dump, 1 change\n  users -> players: 1\n" in output
+    assert not (tmp_path / "qb-users.sql").exists()
+
+    stats, output = _preview(tmp_path, True, "summary")
+    assert "users.sql: SQL dump" in output
+
+
+def test_sql_dumps_are_ignored_without_include_sql(tmp_path):
+    (tmp_path / "users.sql").write_text(DUMP, encoding="utf-8")
+
+    stats, output = _preview(tmp_path, False)
+    assert stats["total_files"] == 0
+    assert output == ""
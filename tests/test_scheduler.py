@@ -0,0 +1,33 @@
+from modules.job import ConversionJob
+from modules.scheduler import convert_resources
+
+RULES = [("ESX.GetPlayerData", "QBCore.Functions.GetPlayerData")]
+
+
+def test_scan_error_fails_only_its_resource(tmp_path, monkeypatch):
+    root = tmp_path / "resources"
+    for name in ("broken", "shop"):
+        (root / name).mkdir(parents=True)
+        (root / name / "fxmanifest.lua").write_text("client_script 'client.lua'\n", encoding="utf-8")
+        (root / name / "client.lua").write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+
+    scan = ConversionJob.scan
+
+    def failing_scan(job):
+        if job.folder_path.endswith("broken"):
+            raise OSError("permission denied")
+        return scan(job)
+
+    monkeypatch.setattr(ConversionJob, "scan", failing_scan)
+    messages = []
+    report = convert_resources(
+        str(root), RULES, "ESX to QB-Core", False, [], messages.append, output_folder=str(tmp_path / "output")
+    )
+
+    assert report["resources"]["broken"]["error"] == "permission denied"
+    assert report["resources"]["shop"]["error"] is None
+    assert report["total"]["failed_resources"] == 1
+    assert "Error converting resource broken: permission denied" in messages
+    assert (tmp_path / "output" / "shop" / "client.lua").read_text(encoding="utf-8") == (
+        "QBCore.Functions.GetPlayerData()\n"
+    )
@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from modules.service import ConversionService, create_app
+
+
+def _zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def service(tmp_path):
+    return ConversionService(results_dir=str(tmp_path / "results"), max_results=1)
+
+
+@pytest.fixture
+def client(service):
+    with TestClient(create_app(service)) as client:
+        yield client
+
+
+UPLOAD = _zip({"resource/client.lua": "local data = ESX.GetPlayerData()\n", "resource/logo.png": "png"})
+
+
+def test_convert_then_cache_hit(client):
+    first = client.post("/convert", files={"file": ("resource.zip", UPLOAD, "application/zip")})
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "miss"
+    with zipfile.ZipFile(io.BytesIO(first.content)) as archive:
+        script = archive.read("resource/client.lua").decode("utf-8")
+        assert archive.read("resource/logo.png") == b"png"
+    assert "QBCore.Functions.GetPlayerData" in script
+    assert json.loads(first.headers["X-Conversion-Stats"])["converted_files"] == 1
+
+    second = client.post("/convert", files={"file": ("resource.zip", UPLOAD, "application/zip")})
+    assert second.status_code == 200
+    assert second.headers["X-Cache"] == "hit"
+    assert second.headers["X-Result-Key"] == first.headers["X-Result-Key"]
+    assert second.content == first.content
+
+    key = first.headers["X-Result-Key"]
+    assert client.get(f"/results/{key}").json()["stats"]["converted_files"] == 1
+    assert client.get(f"/results/{key}/archive").content == first.content
+
+
+def test_invalid_zip_is_rejected(client):
+    response = client.post("/convert", files={"file": ("resource.zip", b"not a zip", "application/zip")})
+    assert response.status_code == 400
+
+
+def test_invalid_direction_is_rejected(client):
+    response = client.post(
+        "/convert", params={"direction": "sideways"}, files={"file": ("resource.zip", UPLOAD, "application/zip")}
+    )
+    assert response.status_code == 400
+
+
+def test_results_being_sent_are_not_pruned(service, client):
+    first = client.post("/convert", files={"file": ("resource.zip", UPLOAD, "application/zip")})
+    key = first.headers["X-Result-Key"]
+    archive_path, _ = service.result_paths(key)
+
+    service.acquire(key)
+    other = _zip({"other/client.lua": "ESX.GetPlayerData()\n"})
+    assert client.post("/convert", files={"file": ("other.zip", other, "application/zip")}).status_code == 200
+    assert os.path.exists(archive_path)
+
+    service.release(key)
+    service._prune()
+    assert not os.path.exists(archive_path)
@@ -0,0 +1,114 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from modules.job import ConversionJob
+from modules.sinks import MemorySink, TarSink, ZipSink
+
+RULES = [("ESX.GetPlayerData", "QBCore.Functions.GetPlayerData")]
+
+DUMP = """\
+INSERT INTO `users` (`identifier`, `accounts`, `firstname`, `lastname`) VALUES
+('char1:abc123', '{"money":150,"bank":2000}', 'John', 'Doe');
+"""
+
+
+class Unseekable(io.RawIOBase):
+    """A write-only stream without seek or tell, like a pipe or a socket."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    source = tmp_path / "resource"
+    (source / "client").mkdir(parents=True)
+    (source / "client" / "main.lua").write_bytes(b"local data = ESX.GetPlayerData()\r\n")
+    (source / "server.lua").write_bytes(b"print('unchanged')\n")
+    (source / "logo.png").write_bytes(bytes(range(256)) * 64)
+    (source / "users.sql").write_text(DUMP, encoding="utf-8")
+    return source
+
+
+def _convert(source, output, sink=None):
+    job = ConversionJob(str(source), RULES, "ESX to QB-Core", True, [], output_folder=str(output), sink=sink)
+    stats = job.run()
+    assert stats["error_files"] == 0
+    return stats
+
+
+def _expected(source, tmp_path):
+    """Convert the tree into a folder, the reference for every sink."""
+    output = tmp_path / "folder"
+    _convert(source, output)
+    files = {}
+    for folder, _, names in os.walk(output):
+        for name in names:
+            path = os.path.join(folder, name)
+            files[os.path.relpath(path, output).replace(os.sep, "/")] = open(path, "rb").read()
+    return files
+
+
+def test_zip_sink_round_trip(tree, tmp_path):
+    expected = _expected(tree, tmp_path)
+    buffer = io.BytesIO()
+    with ZipSink(buffer, str(tmp_path / "output")) as sink:
+        _convert(tree, tmp_path / "output", sink)
+
+    with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as archive:
+        assert {name: archive.read(name) for name in archive.namelist()} == expected
+        assert archive.getinfo("logo.png").compress_type == zipfile.ZIP_STORED
+    assert expected["client/main.lua"] == b"local data = QBCore.Functions.GetPlayerData()\r\n"
+    assert b"INSERT INTO `players`" in expected["users.sql"]
+    assert not (tmp_path / "output").exists()
+
+
+def test_zip_sink_to_an_unseekable_stream(tree, tmp_path):
+    expected = _expected(tree, tmp_path)
+    stream = Unseekable()
+    with ZipSink(stream, str(tmp_path / "output"), root="qb-resource") as sink:
+        _convert(tree, tmp_path / "output", sink)
+
+    with zipfile.ZipFile(io.BytesIO(stream.buffer.getvalue())) as archive:
+        assert {name: archive.read(name) for name in archive.namelist()} == {
+            f"qb-resource/{name}": content for name, content in expected.items()
+        }
+
+
+@pytest.mark.parametrize("compression", ["", "gz", "zst"])
+def test_tar_sink_round_trip_in_stream_mode(tree, tmp_path, compression):
+    if compression == "zst":
+        zstandard = pytest.importorskip("zstandard")
+    expected = _expected(tree, tmp_path)
+    stream = Unseekable()
+    with TarSink(stream, str(tmp_path / "output"), compression=compression) as sink:
+        _convert(tree, tmp_path / "output", sink)
+
+    data = stream.buffer.getvalue()
+    if compression == "zst":
+        data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    contents = {}
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r|*") as archive:
+        for member in archive:
+            contents[member.name] = archive.extractfile(member).read()
+    assert contents == expected
+
+
+def test_memory_sink_round_trip(tree, tmp_path):
+    expected = _expected(tree, tmp_path)
+    with MemorySink(str(tmp_path / "output"), root="qb-resource") as sink:
+        stats = _convert(tree, tmp_path / "output", sink)
+
+    assert sink.contents == {f"qb-resource/{name}": content for name, content in expected.items()}
+    assert sink.files == len(expected)
+    assert stats["converted_files"] == 2
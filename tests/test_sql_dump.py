@@ -0,0 +1,70 @@
+import io
+import json
+import re
+
+from modules import sql_dump
+from modules.sql_dump import CitizenIds, citizen_id, convert_sql_stream, parse_values
+
+DUMP = """\
+INSERT INTO `users` (`identifier`, `accounts`, `firstname`, `lastname`, `job`, `job_grade`, `inventory`) VALUES
+('char1:abc123', '{"money":150,"bank":2000,"black_money":5}', 'John', 'Doe', 'police', 2, '{"bread":3}'),
+('char2:abc123', '{"money":0,"bank":10}', 'Jane', 'Doe', 'ambulance', 0, '{}');
+INSERT INTO `owned_vehicles` (`owner`, `plate`, `vehicle`, `stored`) VALUES
+('char2:abc123', 'ABC 123', '{"model":1234,"fuelLevel":55.0}', 1);
+"""
+
+
+def _convert(dump):
+    target = io.StringIO()
+    assert convert_sql_stream(io.StringIO(dump), target, "ESX to QB-Core")
+    return target.getvalue()
+
+
+def _rows(output, table):
+    statement = re.search(rf"INSERT INTO `{table}` \(([^)]*)\) VALUES\s*(.*?);\n", output, re.S)
+    columns = [column.strip(" `") for column in statement.group(1).split(",")]
+    # The converter writes one row per line
+    rows = statement.group(2).rstrip().split("),\n(")
+    return [dict(zip(columns, parse_values(row.strip("()")))) for row in rows]
+
+
+def test_users_become_players():
+    players = _rows(_convert(DUMP), "players")
+
+    assert [player["citizenid"] for player in players] == [citizen_id("char1:abc123"), citizen_id("char2:abc123")]
+    assert [player["cid"] for player in players] == ["1", "2"]
+    assert players[0]["license"] == "license:abc123"
+    assert players[0]["name"] == "John Doe"
+    assert json.loads(players[0]["money"]) == {"cash": 150, "bank": 2000, "crypto": 0}
+    assert json.loads(players[0]["metadata"])["black_money"] == 5
+    assert json.loads(players[0]["job"])["grade"]["level"] == 2
+    assert json.loads(players[0]["charinfo"])["lastname"] == "Doe"
+    assert [item["name"] for item in json.loads(players[0]["inventory"])] == ["bread"]
+
+
+def test_owned_vehicles_get_the_citizen_id_of_their_owner():
+    output = _convert(DUMP)
+    owners = {int(player["cid"]): player["citizenid"] for player in _rows(output, "players")}
+    vehicle, = _rows(output, "player_vehicles")
+
+    assert vehicle["citizenid"] == owners[2]
+    assert vehicle["license"] == "license:abc123"
+    assert vehicle["plate"] == "ABC 123"
+    assert vehicle["state"] == "1"
+
+
+def test_colliding_identifiers_get_distinct_citizen_ids(monkeypatch):
+    derive = sql_dump.citizen_id
+    # Every identifier hashes to the same ID on the first attempt
+    monkeypatch.setattr(sql_dump, "citizen_id", lambda identifier, attempt=0: derive("x" if attempt == 0 else identifier, attempt))
+
+    ids = CitizenIds()
+    first, second = ids.get("char1:abc123"), ids.get("char2:abc123")
+    assert first != second
+    assert ids.get("char2:abc123") == second
+
+    output = _convert(DUMP)
+    players = _rows(output, "players")
+    vehicle, = _rows(output, "player_vehicles")
+    assert len({player["citizenid"] for player in players}) == 2
+    assert vehicle["citizenid"] == players[1]["citizenid"]
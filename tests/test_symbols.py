@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from modules.symbols import SymbolIndex, symbol_framework
+
+RULES = [("ESX.GetPlayerFromId", "QBCore.Functions.GetPlayer"), ("xPlayer.getJob()", "xPlayer.PlayerData.job")]
+QB_RULES = [("QBCore.Functions.GetPlayer", "ESX.GetPlayerFromId")]
+
+SERVER = """\
+local xPlayer = ESX.GetPlayerFromId(source)
+xPlayer.addMoney(100)
+xPlayer.addMoney(5) xPlayer.addMoney(6)
+MySQL.query.await('SELECT 1')
+"""
+QB_SERVER = """\
+local xPlayer = QBCore.Functions.GetPlayer(source)
+local id = xPlayer.PlayerData.citizenid
+xPlayer.Functions.AddMoney('cash', 100)
+TriggerClientEvent('QBCore:Notify', source, id)
+"""
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / "resources"
+    (root / "shop").mkdir(parents=True)
+    (root / "shop" / "server.lua").write_text(SERVER, encoding="utf-8")
+    (root / "qb_shop").mkdir()
+    (root / "qb_shop" / "server.lua").write_text(QB_SERVER, encoding="utf-8")
+    return root
+
+
+def _index(folder, tmp_path):
+    return SymbolIndex(str(folder), str(tmp_path / "index.json"))
+
+
+def test_update_and_lookup(folder, tmp_path):
+    index = _index(folder, tmp_path)
+    assert index.update()["scanned_files"] == 2
+
+    assert index.lookup("ESX.GetPlayerFromId") == [("shop/server.lua", 1)]
+    assert index.lookup("xPlayer.addMoney") == [("shop/server.lua", 2), ("shop/server.lua", 3)]
+    assert index.count("xPlayer.addMoney") == 2
+    assert index.lookup("MySQL.query.await") == [("shop/server.lua", 4)]
+    assert index.search("xPlayer.") == ["xPlayer.Functions", "xPlayer.PlayerData", "xPlayer.addMoney"]
+    assert index.search("QBCore") == ["QBCore.Functions.GetPlayer", "QBCore:Notify"]
+
+
+def test_qb_player_members_are_not_esx():
+    assert symbol_framework("xPlayer.addMoney") == "esx"
+    assert symbol_framework("xPlayer.PlayerData") == "qb"
+    assert symbol_framework("xPlayer.Functions") == "qb"
+    assert symbol_framework("xPlayer.citizenid") == "qb"
+    assert symbol_framework("MySQL.query") == "any"
+
+
+def test_unmapped(folder, tmp_path):
+    index = _index(folder, tmp_path)
+    index.update()
+
+    assert index.unmapped(RULES, "ESX to QB-Core") == [("xPlayer.addMoney", 2, 1), ("MySQL.query.await", 1, 1)]
+    assert index.unmapped(QB_RULES, "QB-Core to ESX") == [
+        ("MySQL.query.await", 1, 1), ("QBCore:Notify", 1, 1), ("xPlayer.Functions", 1, 1),
+        ("xPlayer.PlayerData", 1, 1),
+    ]
+    with pytest.raises(ValueError):
+        index.unmapped(RULES, "ESX to vRP")
+
+
+def test_incremental_rescan(folder, tmp_path):
+    index = _index(folder, tmp_path)
+    index.update()
+    index.save()
+
+    server = folder / "shop" / "server.lua"
+    server.write_text(SERVER.replace("xPlayer.addMoney(5) xPlayer.addMoney(6)\n", ""), encoding="utf-8")
+    stat = os.stat(server)
+    os.utime(server, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    (folder / "qb_shop" / "server.lua").unlink()
+
+    index = _index(folder, tmp_path)
+    assert index.count("xPlayer.addMoney") == 2
+    stats = index.update()
+    assert (stats["scanned_files"], stats["unchanged_files"], stats["removed_files"]) == (1, 0, 1)
+    assert index.lookup("xPlayer.addMoney") == [("shop/server.lua", 2)]
+    assert index.lookup("QBCore:Notify") == []
+    assert index.search("xPlayer.") == ["xPlayer.addMoney"]
+
+    (folder / "extra.lua").write_text("ESX.ShowNotification('hi')\n", encoding="utf-8")
+    stats = index.update()
+    assert (stats["scanned_files"], stats["unchanged_files"]) == (1, 1)
+    assert index.lookup("ESX.ShowNotification") == [("extra.lua", 1)]
@@ -0,0 +1,34 @@
+from modules.watch import FolderWatcher
+
+RULES = [("ESX.GetPlayerData", "QBCore.Functions.GetPlayerData")]
+
+
+def _watcher(tmp_path):
+    source = tmp_path / "resource"
+    source.mkdir()
+    (source / "client.lua").write_text("ESX.GetPlayerData()\n", encoding="utf-8")
+    (source / "logo.png").write_bytes(b"png")
+    watcher = FolderWatcher(str(source), RULES, "ESX to QB-Core", False, [], output_folder=str(tmp_path / "output"))
+    watcher.sync()
+    return source, watcher
+
+
+def test_up_to_date_assets_are_not_counted_as_copied(tmp_path):
+    source, watcher = _watcher(tmp_path)
+    watcher.apply([str(source / "logo.png")])
+    assert watcher.stats["copied_files"] == 0
+
+    (source / "logo.png").write_bytes(b"new png")
+    watcher.apply([str(source / "logo.png")])
+    assert watcher.stats["copied_files"] == 1
+
+
+def test_removed_source_is_forgotten_without_output(tmp_path):
+    source, watcher = _watcher(tmp_path)
+    (source / "client.lua").unlink()
+    (source / "logo.png").unlink()
+    (tmp_path / "output" / "client.lua").unlink()
+    (tmp_path / "output" / "logo.png").unlink()
+    watcher.apply([str(source / "client.lua"), str(source / "logo.png")])
+    assert "client.lua" not in watcher.manifest.files
+    assert "logo.png" not in watcher.manifest.assets